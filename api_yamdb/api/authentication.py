@@ -0,0 +1,120 @@
+from django.conf import settings
+from django.utils.functional import cached_property
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.cache import get_cache
+from users.models import TOKEN_CLAIMS, RoleMixin, User
+
+TOKEN_VERSION_KEY = 'auth:token_version:{}'
+CLAIMS = (*TOKEN_CLAIMS, 'token_version')
+
+
+class RoleAccessToken(AccessToken):
+    """Access-токен с ролью и версией токенов пользователя в claims."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim in CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
+
+
+def get_token_version(user_id):
+    """Текущая версия токенов активного пользователя или None.
+
+    Значение живет в кеше API_CACHE['AUTH_TIMEOUT'] секунд, поэтому
+    проверка токена обычно обходится без запроса к базе.
+    """
+    cache = get_cache()
+    key = TOKEN_VERSION_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = User.objects.filter(
+            pk=user_id, is_active=True
+        ).values_list('token_version', flat=True).first()
+        cache.set(key, -1 if version is None else version,
+                  settings.API_CACHE['AUTH_TIMEOUT'])
+    return None if version == -1 else version
+
+
+def forget_user(user_id):
+    """Сбрасывает закешированную версию токенов пользователя."""
+    get_cache().delete(TOKEN_VERSION_KEY.format(user_id))
+
+
+class ClaimsUser(RoleMixin, TokenUser):
+    """Пользователь, собранный из claims токена без запроса к базе.
+
+    Подходит для проверок прав и как автор новых объектов (to_model);
+    полную модель из базы возвращает get_full_user.
+    """
+
+    @cached_property
+    def role(self):
+        return self.token['role']
+
+    def __eq__(self, other):
+        if isinstance(other, (ClaimsUser, User)):
+            return self.pk == other.pk
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def to_model(self):
+        """User только с полями из claims, без запроса к базе.
+
+        Годится для внешних ключей и сериализации username, но не для
+        сохранения: остальные поля не заполнены.
+        """
+        user = User(
+            pk=self.pk, **{claim: self.token[claim] for claim in CLAIMS}
+        )
+        user._state.adding = False
+        user._state.db = User.objects.db
+        return user
+
+    @cached_property
+    def full_user(self):
+        return User.objects.get(pk=self.pk)
+
+
+def get_full_user(user):
+    """Модель User из базы для request.user любого вида."""
+    if isinstance(user, ClaimsUser):
+        return user.full_user
+    return user
+
+
+def get_author(user):
+    """User для поля author; у ClaimsUser собирается из claims токена."""
+    if isinstance(user, ClaimsUser):
+        return user.to_model()
+    return user
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """Аутентификация по claims без загрузки пользователя из базы.
+
+    Токены без claims роли, выданные до RoleAccessToken, проверяются
+    по-старому, с загрузкой пользователя.
+    """
+
+    def get_user(self, validated_token):
+        if any(claim not in validated_token for claim in CLAIMS):
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user id')
+        if get_token_version(user_id) != validated_token['token_version']:
+            raise AuthenticationFailed(
+                'Token has been revoked', code='token_not_valid'
+            )
+        return ClaimsUser(validated_token)
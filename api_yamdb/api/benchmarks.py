@@ -0,0 +1,463 @@
+import asyncio
+import math
+import random
+import time
+import tracemalloc
+from collections import namedtuple
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.tokens import default_token_generator
+from django.db import connection, transaction
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from api.async_views import async_read_view, rendered
+from api.authentication import RoleAccessToken
+from api.cache import get_cache
+from api.lean import get_plan
+from api.serializers import (CommentSerializer, ReviewSerializer,
+                             TitleSerializerGET)
+from api.views import CommentViewSet, ReviewViewSet, TitleViewSet
+from reviews.models import Category, Comment, Genre, Review, Title
+from users.models import User
+
+API = '/api/v1'
+SAMPLE_SIZE = 500
+PAGES = 5
+LATENCY_METRICS = ('p50_ms', 'p95_ms', 'p99_ms')
+QUERY_TOLERANCE = 0.01
+
+BenchRequest = namedtuple('BenchRequest', 'method path data user')
+
+
+def get(path, user=None):
+    return BenchRequest('get', path, None, user)
+
+
+def post(path, data, user=None):
+    return BenchRequest('post', path, data, user)
+
+
+def percentile(values, share):
+    """Процентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(share * len(ordered)) - 1)]
+
+
+def summarize(timings, elapsed):
+    return {
+        'requests': len(timings),
+        'p50_ms': round(percentile(timings, 0.5) * 1000, 3),
+        'p95_ms': round(percentile(timings, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(timings, 0.99) * 1000, 3),
+        'rps': round(len(timings) / elapsed, 1),
+    }
+
+
+class BenchmarkData:
+    """Выборка id из базы, по которой сценарии строят запросы.
+
+    Пользователи для записи создаются внутри транзакции прогона
+    и откатываются вместе с ней.
+    """
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.titles = list(
+            Title.objects.order_by('pk')
+            .values_list('pk', flat=True)[:SAMPLE_SIZE]
+        )
+        self.reviews = list(
+            Review.objects.order_by('pk')
+            .values_list('title_id', 'pk')[:SAMPLE_SIZE]
+        )
+        self.comments = list(
+            Comment.objects.order_by('pk')
+            .values_list('review__title_id', 'review_id', 'pk')[:SAMPLE_SIZE]
+        )
+        self.usernames = list(
+            User.objects.order_by('pk')
+            .values_list('username', flat=True)[:SAMPLE_SIZE]
+        )
+        self.genres = list(Genre.objects.values_list('slug', flat=True))
+        self.categories = list(Category.objects.values_list('slug', flat=True))
+        self.years = list(
+            Title.objects.order_by().values_list('year', flat=True).distinct()
+        )
+        self.words = [
+            word for name in Title.objects.order_by('pk').values_list(
+                'name', flat=True)[:PAGES]
+            for word in name.split()
+        ]
+        self.title_pages = self.count_pages(Title)
+        self.user_pages = self.count_pages(User)
+        self.admin = User.objects.create(
+            username='bench-admin', email='bench-admin@yamdb.fake',
+            role=User.ADMIN,
+        )
+        self.created_users = 0
+
+    @staticmethod
+    def count_pages(model):
+        page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+        return min(PAGES, max(1, math.ceil(model.objects.count() / page_size)))
+
+    def pick(self, items):
+        return self.rng.choice(items) if items else None
+
+    def create_user(self):
+        self.created_users += 1
+        number = self.created_users
+        return User.objects.create(
+            username=f'bench-writer{number}',
+            email=f'bench-writer{number}@yamdb.fake',
+        )
+
+
+def catalog_browsing(data):
+    """Анонимный просмотр каталога, отзывов и комментариев."""
+    rng = data.rng
+    while True:
+        yield get(f'{API}/titles/?page={rng.randint(1, data.title_pages)}')
+        yield get(f'{API}/categories/')
+        yield get(f'{API}/genres/')
+        if data.genres:
+            yield get(f'{API}/titles/?genre={data.pick(data.genres)}')
+        if data.categories:
+            yield get(f'{API}/titles/?category={data.pick(data.categories)}')
+        if data.years:
+            yield get(f'{API}/titles/?year={data.pick(data.years)}')
+        if data.words:
+            yield get(f'{API}/titles/?q={data.pick(data.words)}')
+        if data.titles:
+            title_id = data.pick(data.titles)
+            yield get(f'{API}/titles/{title_id}/')
+            yield get(f'{API}/titles/{title_id}/reviews/')
+        if data.reviews:
+            title_id, review_id = data.pick(data.reviews)
+            yield get(f'{API}/titles/{title_id}/reviews/{review_id}/')
+        if data.comments:
+            title_id, review_id, comment_id = data.pick(data.comments)
+            comments = f'{API}/titles/{title_id}/reviews/{review_id}/comments'
+            yield get(f'{comments}/')
+            yield get(f'{comments}/{comment_id}/')
+
+
+def review_posting(data):
+    """Новые пользователи пишут отзывы и читают ленту произведения."""
+    rng = data.rng
+    while data.titles:
+        author = data.create_user()
+        for title_id in rng.sample(data.titles, min(3, len(data.titles))):
+            reviews = f'{API}/titles/{title_id}/reviews/'
+            yield post(reviews, {
+                'text': 'Benchmark review', 'score': rng.randint(1, 10),
+            }, author)
+            yield get(f'{reviews}?pagination=cursor', author)
+
+
+def comment_threads(data):
+    """Чтение ветки комментариев к отзыву и ответ в нее."""
+    while data.reviews:
+        author = data.create_user()
+        title_id, review_id = data.pick(data.reviews)
+        comments = f'{API}/titles/{title_id}/reviews/{review_id}/comments/'
+        yield get(f'{API}/titles/{title_id}/reviews/{review_id}/', author)
+        yield get(comments, author)
+        yield post(comments, {'text': 'Benchmark comment'}, author)
+        yield get(f'{comments}?pagination=cursor', author)
+
+
+def admin_user_search(data):
+    """Администратор ищет пользователей и открывает их профили."""
+    rng = data.rng
+    while True:
+        yield get(f'{API}/users/me/', data.admin)
+        yield get(f'{API}/users/?page={rng.randint(1, data.user_pages)}',
+                  data.admin)
+        username = data.pick(data.usernames)
+        if username:
+            prefix = username[:rng.randint(3, max(3, len(username)))]
+            yield get(f'{API}/users/?search={prefix}', data.admin)
+            yield get(f'{API}/users/{username}/', data.admin)
+
+
+def signup_and_token(data):
+    """Регистрация и получение токена новыми пользователями."""
+    number = 0
+    while True:
+        number += 1
+        username = f'bench-signup{number}'
+        email = f'{username}@yamdb.fake'
+        yield post(f'{API}/auth/signup/', {
+            'username': username, 'email': email,
+        })
+        user = User.objects.get(username=username)
+        yield post(f'{API}/auth/token/', {
+            'username': username,
+            'confirmation_code': default_token_generator.make_token(user),
+        })
+
+
+SCENARIOS = {
+    'catalog': catalog_browsing,
+    'reviews': review_posting,
+    'comments': comment_threads,
+    'admin_search': admin_user_search,
+    'auth': signup_and_token,
+}
+
+
+class BenchmarkRunner:
+    """Прогоняет сценарии через тестовый клиент Django.
+
+    Запросы идут в процессе, без сети, так что замеры отражают время
+    приложения и базы. Каждый сценарий выполняется в транзакции, которая
+    откатывается, поэтому записи не копятся между прогонами. Письма
+    уходят в память, а не в файлы.
+    """
+
+    def __init__(self, requests=200, warmup=10, cold_cache=False, seed=0):
+        self.requests = requests
+        self.warmup = warmup
+        self.cold_cache = cold_cache
+        self.seed = seed
+        self.client = Client()
+        self.tokens = {}
+        self.sent = 0
+
+    def headers(self, user):
+        if user is None:
+            return {}
+        if user.pk not in self.tokens:
+            self.tokens[user.pk] = str(RoleAccessToken.for_user(user))
+        return {'HTTP_AUTHORIZATION': f'Bearer {self.tokens[user.pk]}'}
+
+    def send(self, request):
+        if self.cold_cache:
+            get_cache().clear()
+        method = getattr(self.client, request.method)
+        kwargs = self.headers(request.user)
+        # Разные адреса, чтобы лимит auth_ip не мерил сам себя.
+        self.sent += 1
+        kwargs['REMOTE_ADDR'] = (
+            f'10.{self.sent >> 16 & 255}.{self.sent >> 8 & 255}.'
+            f'{self.sent & 255}'
+        )
+        if request.data is not None:
+            kwargs.update(data=request.data, content_type='application/json')
+        return method(request.path, **kwargs)
+
+    def run(self, names):
+        with override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'
+        ):
+            return {name: self.run_scenario(name) for name in names}
+
+    def run_scenario(self, name):
+        timings = []
+        queries = []
+        errors = []
+        with transaction.atomic():
+            requests = SCENARIOS[name](BenchmarkData(random.Random(self.seed)))
+            for request in islice(requests, self.warmup):
+                self.send(request)
+            started = time.perf_counter()
+            for request in islice(requests, self.requests):
+                with CaptureQueriesContext(connection) as context:
+                    request_started = time.perf_counter()
+                    response = self.send(request)
+                    timings.append(time.perf_counter() - request_started)
+                queries.append(len(context))
+                if response.status_code >= 400:
+                    errors.append(
+                        f'{request.method.upper()} {request.path}: '
+                        f'{response.status_code}'
+                    )
+            elapsed = time.perf_counter() - started
+            transaction.set_rollback(True)
+        self.tokens.clear()
+        if not timings:
+            return {'requests': 0, 'errors': errors}
+        return {
+            **summarize(timings, elapsed),
+            'errors': errors,
+            'queries_per_request': round(sum(queries) / len(queries), 2),
+        }
+
+
+class ConcurrencyBenchmark:
+    """Сравнивает sync- и async-вью чтения под одинаковой нагрузкой.
+
+    Обе версии работают в одном процессе с одним и тем же пулом
+    потоков, поэтому сравнение идет при равной памяти; пик выделенной
+    Python памяти выводится для каждой. Sync-вью вызываются так же, как
+    их вызывает ASGIHandler Django 3.2: в одном потоке через
+    sync_to_async(thread_sensitive=True).
+    """
+
+    endpoints = {
+        'titles': (TitleViewSet, '/titles/', ()),
+        'reviews': (
+            ReviewViewSet, '/titles/{title_id}/reviews/', ('title_id',),
+        ),
+        'comments': (
+            CommentViewSet,
+            '/titles/{title_id}/reviews/{review_id}/comments/',
+            ('title_id', 'review_id'),
+        ),
+    }
+
+    def __init__(self, concurrency=50, requests=500, cold_cache=False):
+        self.concurrency = concurrency
+        self.requests = requests
+        self.cold_cache = cold_cache
+        self.factory = RequestFactory()
+
+    def run(self):
+        title_id, review_id = Comment.objects.order_by('pk').values_list(
+            'review__title_id', 'review_id'
+        ).first() or (0, 0)
+        ids = {'title_id': str(title_id), 'review_id': str(review_id)}
+        actions = {'get': 'list'}
+        results = {}
+        for name, (viewset, path, names) in self.endpoints.items():
+            path = API + path.format(**ids)
+            kwargs = {key: ids[key] for key in names}
+            sync_view = sync_to_async(
+                rendered(viewset.as_view(actions)), thread_sensitive=True
+            )
+            results[name] = {
+                'sync': self.measure(sync_view, path, kwargs),
+                'async': self.measure(
+                    async_read_view(viewset, actions), path, kwargs
+                ),
+            }
+        return results
+
+    def measure(self, view, path, kwargs):
+        tracemalloc.start()
+        try:
+            timings, statuses, elapsed = asyncio.run(
+                self.drive(view, path, kwargs)
+            )
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        result = summarize(timings, elapsed)
+        result['errors'] = sum(status >= 400 for status in statuses)
+        result['peak_mb'] = round(peak / 2 ** 20, 1)
+        return result
+
+    async def drive(self, view, path, kwargs):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        timings = []
+        statuses = []
+
+        async def send():
+            async with semaphore:
+                if self.cold_cache:
+                    get_cache().clear()
+                started = time.perf_counter()
+                response = await view(self.factory.get(path), **kwargs)
+                timings.append(time.perf_counter() - started)
+                statuses.append(response.status_code)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(send() for _ in range(self.requests)))
+        return timings, statuses, time.perf_counter() - started
+
+
+class SerializerBenchmark:
+    """Сравнивает сериализаторы DRF и LeanPlan на страницах разного размера.
+
+    Замер включает чтение страницы из базы: объекты моделей
+    с select_related и prefetch_related для DRF и values() для LeanPlan.
+    """
+
+    page_sizes = (10, 100, 1000)
+
+    def __init__(self, rounds=20):
+        self.rounds = rounds
+
+    def endpoints(self):
+        return {
+            'titles': (
+                Title.objects.select_related('category')
+                .prefetch_related('genre').order_by('pk'),
+                TitleSerializerGET,
+            ),
+            'reviews': (
+                Review.objects.select_related('author', 'title')
+                .order_by('pk'),
+                ReviewSerializer,
+            ),
+            'comments': (
+                Comment.objects.select_related('author').order_by('pk'),
+                CommentSerializer,
+            ),
+        }
+
+    def run(self):
+        results = {}
+        for name, (queryset, serializer_class) in self.endpoints().items():
+            plan = get_plan(serializer_class())
+            for size in self.page_sizes:
+                rows, drf = self.measure(
+                    self.serialize_drf, queryset[:size], serializer_class
+                )
+                _, lean = self.measure(
+                    plan.serialize, plan.values(queryset)[:size]
+                )
+                results[f'{name} {size}'] = {
+                    'rows': rows,
+                    'drf_rows_s': round(drf),
+                    'lean_rows_s': round(lean),
+                    'speedup': round(lean / drf, 2) if drf else 0,
+                }
+        return results
+
+    @staticmethod
+    def serialize_drf(page, serializer_class):
+        return serializer_class(list(page), many=True).data
+
+    def measure(self, serialize, *args):
+        """Возвращает (строк на странице, строк в секунду)."""
+        rows = 0
+        started = time.perf_counter()
+        for _ in range(self.rounds):
+            rows += len(serialize(*args))
+        elapsed = time.perf_counter() - started
+        return rows // self.rounds, rows / elapsed if elapsed else 0
+
+
+def compare(results, baseline, threshold):
+    """Возвращает список регрессий относительно сохраненного прогона.
+
+    Задержки и пропускная способность сравниваются с допуском
+    threshold, число запросов к базе детерминировано и не должно расти.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if not previous or not current['requests']:
+            continue
+        for metric in LATENCY_METRICS:
+            limit = previous[metric] * (1 + threshold)
+            if current[metric] > limit:
+                regressions.append(
+                    f'{name}: {metric} {current[metric]} > {limit:.3f}'
+                )
+        limit = previous['rps'] * (1 - threshold)
+        if current['rps'] < limit:
+            regressions.append(f'{name}: rps {current["rps"]} < {limit:.1f}')
+        limit = previous['queries_per_request'] + QUERY_TOLERANCE
+        if current['queries_per_request'] > limit:
+            regressions.append(
+                f'{name}: queries_per_request '
+                f'{current["queries_per_request"]} > '
+                f'{previous["queries_per_request"]}'
+            )
+    return regressions
@@ -0,0 +1,177 @@
+import abc
+
+from django.db import connection, transaction
+from rest_framework.exceptions import ValidationError
+
+from api.serializers import BulkGenreSerializer, BulkTitleSerializer
+from reviews.models import Category, Genre, GenreTitle, Title
+from reviews.signals import bulk_loaded
+
+
+def slug_map(model, slugs):
+    """Словарь slug -> pk для переданных slug одним запросом."""
+    return dict(
+        model.objects.filter(slug__in=set(slugs)).values_list('slug', 'pk')
+    )
+
+
+class BulkWriter(abc.ABC):
+    """Массовая запись с проверкой всех элементов за один проход.
+
+    Элементы проверяются сериализатором `serializer_class` по одному, так
+    что ошибка одного не мешает остальным. Связанные объекты ищутся по
+    словарям, загруженным одним запросом на модель. Строгий режим ничего
+    не записывает, если хотя бы один элемент с ошибкой.
+    """
+
+    serializer_class = None
+    models = ()
+    batch_size = 500
+
+    def __init__(self, strict=False):
+        self.strict = strict
+        self.errors = {}
+
+    def validate(self, items):
+        serializer = self.serializer_class()
+        valid = {}
+        for index, item in enumerate(items):
+            try:
+                valid[index] = serializer.run_validation(item)
+            except ValidationError as error:
+                self.errors[index] = error.detail
+        return valid
+
+    def add_error(self, index, field, message):
+        self.errors.setdefault(index, {}).setdefault(field, []).append(
+            message
+        )
+
+    def write(self, items):
+        """Записывает элементы, возвращает {индекс: pk записанного}."""
+        valid = self.resolve(self.validate(items))
+        if not valid or self.strict and self.errors:
+            return {}
+        with transaction.atomic():
+            written = self.save(valid)
+        for model in self.models:
+            bulk_loaded.send(sender=model, title_ids=set(written.values()))
+        return written
+
+    def report(self, written):
+        return {
+            'created': [
+                {'index': index, 'id': pk}
+                for index, pk in sorted(written.items())
+            ],
+            'errors': [
+                {'index': index, 'errors': errors}
+                for index, errors in sorted(self.errors.items())
+            ],
+        }
+
+    @abc.abstractmethod
+    def resolve(self, valid):
+        """Подставляет связанные объекты, отбрасывает элементы с ошибкой."""
+
+    @abc.abstractmethod
+    def save(self, valid):
+        """Записывает проверенные элементы, возвращает {индекс: pk}."""
+
+
+class TitleBulkWriter(BulkWriter):
+    """Создает произведения вместе с жанрами."""
+
+    serializer_class = BulkTitleSerializer
+    models = (Title, GenreTitle)
+
+    def resolve(self, valid):
+        categories = slug_map(
+            Category, (data['category'] for data in valid.values())
+        )
+        genres = slug_map(
+            Genre, (slug for data in valid.values() for slug in data['genre'])
+        )
+        resolved = {}
+        for index, data in valid.items():
+            if data['category'] not in categories:
+                self.add_error(index, 'category',
+                               f'Категории {data["category"]} нет.')
+            for slug in data['genre']:
+                if slug not in genres:
+                    self.add_error(index, 'genre', f'Жанра {slug} нет.')
+            if index in self.errors:
+                continue
+            resolved[index] = (
+                Title(
+                    name=data['name'],
+                    year=data['year'],
+                    description=data['description'],
+                    category_id=categories[data['category']],
+                ),
+                {genres[slug] for slug in data['genre']},
+            )
+        return resolved
+
+    def save(self, valid):
+        titles = [title for title, _ in valid.values()]
+        if connection.features.can_return_rows_from_bulk_insert:
+            Title.objects.bulk_create(titles, batch_size=self.batch_size)
+        else:
+            # Без RETURNING bulk_create не заполняет pk.
+            for title in titles:
+                title.save(force_insert=True)
+        GenreTitle.objects.bulk_create(
+            [
+                GenreTitle(title_id=title.pk, genre_id=genre_id)
+                for title, genre_ids in valid.values()
+                for genre_id in genre_ids
+            ],
+            batch_size=self.batch_size,
+        )
+        return {index: title.pk for index, (title, _) in valid.items()}
+
+
+class GenreBulkWriter(BulkWriter):
+    """Добавляет жанры существующим произведениям.
+
+    Уже назначенные жанры пропускаются.
+    """
+
+    serializer_class = BulkGenreSerializer
+    models = (GenreTitle,)
+
+    def resolve(self, valid):
+        titles = set(
+            Title.objects.active().filter(
+                pk__in={data['title'] for data in valid.values()}
+            ).values_list('pk', flat=True)
+        )
+        genres = slug_map(
+            Genre, (slug for data in valid.values() for slug in data['genre'])
+        )
+        resolved = {}
+        for index, data in valid.items():
+            if data['title'] not in titles:
+                self.add_error(index, 'title',
+                               f'Произведения {data["title"]} нет.')
+            for slug in data['genre']:
+                if slug not in genres:
+                    self.add_error(index, 'genre', f'Жанра {slug} нет.')
+            if index not in self.errors:
+                resolved[index] = (
+                    data['title'], {genres[slug] for slug in data['genre']}
+                )
+        return resolved
+
+    def save(self, valid):
+        GenreTitle.objects.bulk_create(
+            [
+                GenreTitle(title_id=title_id, genre_id=genre_id)
+                for title_id, genre_ids in valid.values()
+                for genre_id in genre_ids
+            ],
+            batch_size=self.batch_size,
+            ignore_conflicts=True,
+        )
+        return {index: title_id for index, (title_id, _) in valid.items()}
@@ -0,0 +1,117 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+VERSION_KEY = 'api:version:{}'
+RESPONSE_KEY = 'api:response:{}'
+
+
+def get_cache():
+    return caches[settings.API_CACHE['ALIAS']]
+
+
+def get_versions(labels):
+    """Возвращает текущие версии моделей по их label."""
+    cache = get_cache()
+    keys = [VERSION_KEY.format(label) for label in labels]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns())
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_version(label):
+    """Увеличивает версию модели, делая закешированные ответы устаревшими.
+
+    Если ключа версии нет в кеше, он заводится заново от текущего времени,
+    чтобы не совпасть ни с одной из прежних версий.
+    """
+    cache = get_cache()
+    key = VERSION_KEY.format(label)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns())
+
+
+def bump_version_on_commit(label):
+    """Сбрасывает версию сразу и еще раз после фиксации транзакции.
+
+    Повторный сброс не дает конкурентным запросам закешировать данные,
+    прочитанные до фиксации изменений.
+    """
+    bump_version(label)
+    transaction.on_commit(lambda: bump_version(label))
+
+
+def etag_matches(header, etag):
+    """Совпадает ли ETag с заголовком If-None-Match.
+
+    Заголовок разбирается на список entity-tag, `*` совпадает с любым
+    ответом. Для If-None-Match сравнение слабое (RFC 7232, 2.3.2):
+    префикс `W/` не учитывается.
+    """
+    if not header:
+        return False
+    tags = parse_etags(header)
+    if tags == ['*']:
+        return True
+    return any(
+        (tag[2:] if tag.startswith('W/') else tag) == etag for tag in tags
+    )
+
+
+class CachedResponseMixin:
+    """Кеширует списки с данными, не зависящими от пользователя.
+
+    Ключ строится из адреса, отсортированных параметров запроса и версий
+    моделей из `cache_dependencies`, поэтому при любой записи в эти модели
+    старые ответы просто перестают использоваться. Ответ получает ETag,
+    а совпавший `If-None-Match` приводит к 304 без обращения к БД.
+    Другие действия вьюсета кешируются через `cached_response`.
+    """
+
+    cache_dependencies = ()
+
+    def get_cache_key(self, request):
+        query = '&'.join(
+            f'{name}={value}'
+            for name, values in sorted(request.query_params.lists())
+            for value in values
+        )
+        versions = get_versions(self.cache_dependencies)
+        source = '|'.join((
+            request.build_absolute_uri(request.path),
+            query,
+            request.accepted_renderer.format,
+            *(str(version) for version in versions),
+        ))
+        return hashlib.md5(source.encode()).hexdigest()
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        key = self.get_cache_key(request)
+        etag = f'"{key}"'
+        if etag_matches(request.headers.get('If-None-Match'), etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED,
+                            headers={'ETag': etag})
+        cache = get_cache()
+        data = cache.get(RESPONSE_KEY.format(key))
+        if data is not None:
+            return Response(data, headers={'ETag': etag})
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(RESPONSE_KEY.format(key), response.data,
+                      settings.API_CACHE['TIMEOUT'])
+            response['ETag'] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
@@ -1,4 +1,6 @@
+from django.db.models import F
 from django_filters.rest_framework import CharFilter, FilterSet
+from rest_framework.filters import OrderingFilter
 
 from reviews.models import Title
 
@@ -10,3 +12,53 @@ class TitleFilter(FilterSet):
     class Meta:
         model = Title
         fields = ('genre', 'category', 'year', 'name')
+
+
+class StableOrderingFilter(OrderingFilter):
+    """Сортировка по `?ordering=` с полным порядком строк.
+
+    В конец добавляется pk в направлении последнего поля (если порядок
+    еще не заканчивается им), так что строки с равными значениями
+    не переставляются между страницами. Pk добавляется в
+    `get_ordering`, поэтому его видит и курсорная пагинация. NULL идут
+    последними в обоих направлениях, как в индексах модели.
+    """
+
+    tie_breaker = 'pk'
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering:
+            return ordering
+        ordering = list(ordering)
+        last = ordering[-1]
+        if last.lstrip('-') not in (self.tie_breaker,
+                                    queryset.model._meta.pk.name):
+            ordering.append(
+                f'-{self.tie_breaker}' if last.startswith('-')
+                else self.tie_breaker
+            )
+        return ordering
+
+    def filter_queryset(self, request, queryset, view):
+        ordering = self.get_ordering(request, queryset, view)
+        if not ordering:
+            return queryset
+        return queryset.order_by(
+            *self.get_expressions(queryset.model, ordering)
+        )
+
+    def get_expressions(self, model, ordering):
+        keys = (self.tie_breaker, model._meta.pk.name)
+        expressions = []
+        for term in ordering:
+            name = term.lstrip('-')
+            nulls_last = (name not in keys
+                          and model._meta.get_field(name).null)
+            expression = F(name)
+            expressions.append(
+                expression.desc(nulls_last=nulls_last)
+                if term.startswith('-')
+                else expression.asc(nulls_last=nulls_last)
+            )
+        return expressions
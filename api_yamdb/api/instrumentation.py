@@ -0,0 +1,334 @@
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework.renderers import BaseRenderer
+
+logger = logging.getLogger('api.instrumentation')
+
+current_metrics = ContextVar('current_metrics', default=None)
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+class RequestMetrics:
+    """Замеры одного запроса.
+
+    Объект служит обработчиком execute_wrapper и считает запросы к базе,
+    их суммарное время и точные повторы (тот же SQL с теми же
+    параметрами).
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.statements = Counter()
+        self.timings = defaultdict(float)
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.queries += 1
+            self.statements[(sql, repr(params))] += 1
+
+    @property
+    def duplicates(self):
+        return sum(count - 1 for count in self.statements.values())
+
+    def most_repeated(self):
+        (sql, _), count = self.statements.most_common(1)[0]
+        return sql, count
+
+
+@contextmanager
+def measure(name):
+    """Добавляет время блока к замеру name текущего запроса."""
+    metrics = current_metrics.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.timings[name] += time.perf_counter() - started
+
+
+def route_queries(execute, sql, params, many, context):
+    """execute_wrapper, передающий запрос замеру текущего запроса.
+
+    Замер берется из ContextVar, поэтому запросы учитываются в любом
+    потоке, куда sync_to_async перенес обработку запроса.
+    """
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+def instrument_connection(connection, **kwargs):
+    if route_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(route_queries)
+
+
+def instrument_connections():
+    """Подключает route_queries к открытым и будущим соединениям."""
+    connection_created.connect(instrument_connection,
+                               dispatch_uid='instrument_connection')
+    for connection in connections.all():
+        instrument_connection(connection)
+
+
+class Histogram:
+    """Гистограмма в формате Prometheus с метками по view."""
+
+    def __init__(self, name, description, buckets):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, view, value):
+        if view not in self.series:
+            self.series[view] = [[0] * len(self.buckets), 0.0, 0]
+        counts, _, _ = series = self.series[view]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[index] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self):
+        yield f'# HELP {self.name} {self.description}'
+        yield f'# TYPE {self.name} histogram'
+        for view, (counts, total, count) in sorted(self.series.items()):
+            labels = f'view="{view}"'
+            for bound, bucket in zip(self.buckets, counts):
+                yield f'{self.name}_bucket{{{labels},le="{bound}"}} {bucket}'
+            yield f'{self.name}_bucket{{{labels},le="+Inf"}} {count}'
+            yield f'{self.name}_sum{{{labels}}} {total}'
+            yield f'{self.name}_count{{{labels}}} {count}'
+
+
+class MetricsRegistry:
+    """Агрегаты замеров по view в памяти процесса.
+
+    Каждый воркер gunicorn держит свои гистограммы, Prometheus
+    собирает их с каждого процесса отдельно.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.histograms = {
+            'duration': Histogram(
+                'yamdb_request_duration_seconds',
+                'Full request time.', SECONDS_BUCKETS,
+            ),
+            'sql': Histogram(
+                'yamdb_request_sql_seconds',
+                'Time spent in SQL queries.', SECONDS_BUCKETS,
+            ),
+            'serialize': Histogram(
+                'yamdb_request_serialize_seconds',
+                'Time spent in serializer to_representation.',
+                SECONDS_BUCKETS,
+            ),
+            'auth': Histogram(
+                'yamdb_request_auth_seconds',
+                'Time spent authenticating.', SECONDS_BUCKETS,
+            ),
+            'queries': Histogram(
+                'yamdb_request_queries',
+                'SQL queries per request.', QUERY_BUCKETS,
+            ),
+            'duplicates': Histogram(
+                'yamdb_request_duplicate_queries',
+                'Repeated identical SQL queries per request.', QUERY_BUCKETS,
+            ),
+            'bytes': Histogram(
+                'yamdb_response_bytes',
+                'Response body size.', BYTES_BUCKETS,
+            ),
+        }
+
+    def observe(self, view, values):
+        with self.lock:
+            for name, value in values.items():
+                if value is not None:
+                    self.histograms[name].observe(view, value)
+
+    def render(self):
+        with self.lock:
+            return '\n'.join(
+                line for histogram in self.histograms.values()
+                for line in histogram.render()
+            ) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def render_gauge(name, description, samples):
+    """Gauge в текстовом формате Prometheus из пар (метки, значение)."""
+    lines = [f'# HELP {name} {description}', f'# TYPE {name} gauge']
+    for labels, value in samples:
+        text = ','.join(f'{key}="{label}"' for key, label in labels.items())
+        series = f'{name}{{{text}}}' if text else name
+        lines.append(f'{series} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+class PrometheusRenderer(BaseRenderer):
+    """Текстовый формат экспозиции Prometheus."""
+
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not isinstance(data, str):
+            data = json.dumps(data)
+        return data.encode(self.charset)
+
+
+class PerformanceMiddleware:
+    """Замеряет SQL, сериализацию, аутентификацию и размер ответа.
+
+    Включается настройкой INSTRUMENTATION['ENABLED'], иначе Django
+    исключает middleware из цепочки. Замеряется доля запросов
+    SAMPLE_RATE, остальные проходят без обертки. Итоги пишутся
+    в заголовок Server-Timing, в лог и в гистограммы registry.
+    Работает и в синхронной, и в асинхронной цепочке, поэтому под ASGI
+    не добавляет переходов между потоком и циклом событий.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = settings.INSTRUMENTATION
+        if not config['ENABLED'] or config['SAMPLE_RATE'] <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = config['SAMPLE_RATE']
+        self.server_timing = config['SERVER_TIMING']
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Как в MiddlewareMixin: Django проверяет, корутина ли это.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+        instrument_connections()
+
+    def sampled(self):
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        self.record(request, response, metrics,
+                    time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        self.record(request, response, metrics,
+                    time.perf_counter() - started)
+        return response
+
+    def record(self, request, response, metrics, duration):
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        size = None if response.streaming else len(response.content)
+        values = {
+            'duration': duration,
+            'sql': metrics.sql_time,
+            'serialize': metrics.timings.get('serialize'),
+            'auth': metrics.timings.get('auth'),
+            'queries': metrics.queries,
+            'duplicates': metrics.duplicates,
+            'bytes': size,
+        }
+        registry.observe(view, values)
+        if self.server_timing:
+            response['Server-Timing'] = server_timing(metrics, duration)
+        line = {
+            'method': request.method,
+            'path': request.path,
+            'view': view,
+            'status': response.status_code,
+            **values,
+        }
+        if metrics.duplicates:
+            line['repeated_sql'], line['repeated_times'] = (
+                metrics.most_repeated()
+            )
+        logger.info(json.dumps(line))
+
+
+def server_timing(metrics, duration):
+    entries = [
+        f'db;dur={metrics.sql_time * 1000:.2f};desc="{metrics.queries} '
+        f'queries, {metrics.duplicates} duplicates"'
+    ]
+    for name in ('serialize', 'auth'):
+        if name in metrics.timings:
+            entries.append(f'{name};dur={metrics.timings[name] * 1000:.2f}')
+    entries.append(f'total;dur={duration * 1000:.2f}')
+    return ', '.join(entries)
+
+
+class InstrumentedViewMixin:
+    """Замеряет аутентификацию и сериализацию во вьюсетах DRF.
+
+    Без активного замера добавляет только чтение ContextVar.
+    """
+
+    def perform_authentication(self, request):
+        with measure('auth'):
+            super().perform_authentication(request)
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if current_metrics.get() is not None:
+            to_representation = serializer.to_representation
+
+            def timed(instance):
+                with measure('serialize'):
+                    return to_representation(instance)
+
+            serializer.to_representation = timed
+        return serializer
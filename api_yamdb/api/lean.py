@@ -0,0 +1,160 @@
+from collections import defaultdict
+from copy import deepcopy
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import F
+from rest_framework import relations, serializers
+from rest_framework.response import Response
+
+from api.instrumentation import measure
+
+PARENT_KEY = 'lean_parent'
+
+
+class UnsupportedFieldError(Exception):
+    """Поле сериализатора нельзя прочитать из values()."""
+
+
+class LeanPlan:
+    """Сериализация выборки через values() без создания объектов моделей.
+
+    План строится один раз по полям обычного сериализатора: для каждого
+    поля заранее вычисляется путь в values() и функция преобразования
+    (to_representation копии самого поля), поэтому JSON совпадает
+    с ответом сериализатора. Вложенные сериализаторы читаются через
+    JOIN, а с many=True — одним запросом на страницу. Свойства модели,
+    SerializerMethodField и поля с source через точку не поддерживаются:
+    конструктор бросает UnsupportedFieldError.
+    """
+
+    def __init__(self, serializer):
+        self.model = serializer.Meta.model
+        self.lookups = ['pk']
+        self.many = {}
+        self.columns = [
+            (name, self.compile(field, self.model, ''))
+            for name, field in serializer.fields.items()
+        ]
+
+    def add(self, lookup):
+        if lookup not in self.lookups:
+            self.lookups.append(lookup)
+        return lookup
+
+    def compile(self, field, model, prefix):
+        if field.source == '*' or '.' in field.source:
+            raise UnsupportedFieldError(field.field_name)
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            raise UnsupportedFieldError(field.field_name)
+        path = prefix + field.source
+        if isinstance(field, serializers.ListSerializer) and not prefix:
+            return self.compile_many(field, model_field)
+        if isinstance(field, (serializers.BaseSerializer,
+                              relations.SlugRelatedField)):
+            return self.compile_related(field, model_field, path)
+        if model_field.is_relation or isinstance(
+            field, relations.RelatedField
+        ):
+            raise UnsupportedFieldError(field.field_name)
+        key = self.add(path)
+        convert = deepcopy(field).to_representation
+        return lambda row, loaded: (
+            None if row[key] is None else convert(row[key])
+        )
+
+    def compile_related(self, field, model_field, path):
+        """Связь many-to-one: slug связанного объекта или его поля."""
+        if not model_field.many_to_one or isinstance(
+            field, serializers.ListSerializer
+        ):
+            raise UnsupportedFieldError(field.field_name)
+        if isinstance(field, relations.SlugRelatedField):
+            key = self.add(f'{path}__{field.slug_field}')
+            return lambda row, loaded: row[key]
+        key = self.add(path)
+        columns = [
+            (name, self.compile(nested, model_field.related_model,
+                                f'{path}__'))
+            for name, nested in field.fields.items()
+        ]
+
+        def nested(row, loaded):
+            if row[key] is None:
+                return None
+            return {name: column(row, loaded) for name, column in columns}
+
+        return nested
+
+    def compile_many(self, serializer, model_field):
+        if not model_field.many_to_many:
+            raise UnsupportedFieldError(serializer.field_name)
+        plan = LeanPlan(serializer.child)
+        name = serializer.field_name
+        manager = model_field.related_model._default_manager
+        parent = model_field.related_query_name()
+
+        def load(pks):
+            grouped = defaultdict(list)
+            rows = manager.filter(**{f'{parent}__in': pks}).values(
+                *plan.lookups, **{PARENT_KEY: F(parent)}
+            )
+            for row in rows:
+                grouped[row[PARENT_KEY]].append(plan.build(row, {}))
+            return grouped
+
+        self.many[name] = load
+        return lambda row, loaded: loaded[name].get(row['pk'], [])
+
+    def values(self, queryset):
+        """Выборка для serialize(): только нужные колонки, без prefetch."""
+        return queryset.prefetch_related(None).values(*self.lookups)
+
+    def build(self, row, loaded):
+        return {name: column(row, loaded) for name, column in self.columns}
+
+    def serialize(self, rows):
+        rows = list(rows)
+        pks = [row['pk'] for row in rows]
+        loaded = {
+            name: load(pks) if pks else {}
+            for name, load in self.many.items()
+        }
+        return [self.build(row, loaded) for row in rows]
+
+
+plans = {}
+
+
+def get_plan(serializer):
+    """План для набора полей сериализатора или None, если он невозможен."""
+    key = (type(serializer), tuple(serializer.fields))
+    if key not in plans:
+        try:
+            plans[key] = LeanPlan(serializer)
+        except UnsupportedFieldError:
+            plans[key] = None
+    return plans[key]
+
+
+class LeanListMixin:
+    """Отдает списки через LeanPlan, если сериализатор это позволяет.
+
+    Фильтры, сортировка и пагинация применяются как обычно, меняется
+    только чтение страницы: values() вместо объектов моделей.
+    """
+
+    lean_list = True
+
+    def list(self, request, *args, **kwargs):
+        plan = get_plan(self.get_serializer()) if self.lean_list else None
+        if plan is None:
+            return super().list(request, *args, **kwargs)
+        queryset = plan.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        with measure('serialize'):
+            data = plan.serialize(queryset if page is None else page)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
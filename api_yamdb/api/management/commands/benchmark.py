@@ -0,0 +1,146 @@
+import json
+from datetime import datetime
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api.benchmarks import (SCENARIOS, BenchmarkRunner, ConcurrencyBenchmark,
+                            SerializerBenchmark, compare)
+
+COLUMNS = ('requests', 'p50_ms', 'p95_ms', 'p99_ms', 'rps',
+           'queries_per_request')
+CONCURRENCY_COLUMNS = ('requests', 'errors', 'p50_ms', 'p95_ms', 'p99_ms',
+                       'rps', 'peak_mb')
+SERIALIZER_COLUMNS = ('rows', 'drf_rows_s', 'lean_rows_s', 'speedup')
+
+
+class Command(BaseCommand):
+    help = 'Runs API load scenarios and compares them with a baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scenarios',
+            nargs='+',
+            choices=SCENARIOS,
+            default=list(SCENARIOS),
+            help='Scenarios to run',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Measured requests per scenario',
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=10,
+            help='Unmeasured requests before each scenario',
+        )
+        parser.add_argument(
+            '--cold-cache',
+            action='store_true',
+            help='Clear the response cache before every request',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed for the request mix',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            help='Compare sync and async read views with N requests '
+                 'in flight instead of running the scenarios',
+        )
+        parser.add_argument(
+            '--serializers',
+            action='store_true',
+            help='Compare DRF and values() list serializers on pages of '
+                 '10, 100 and 1000 rows, --requests rounds per page',
+        )
+        parser.add_argument(
+            '--save-baseline',
+            help='Write the results to this JSON file',
+        )
+        parser.add_argument(
+            '--baseline',
+            help='Compare the results with this JSON file',
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.2,
+            help='Allowed latency and throughput regression, 0.2 is 20%%',
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['warmup'] < 0:
+            raise CommandError('--requests must be positive')
+        if options['concurrency']:
+            self.compare_concurrency(options)
+            return
+        if options['serializers']:
+            self.report(
+                SerializerBenchmark(rounds=options['requests']).run(),
+                SERIALIZER_COLUMNS,
+            )
+            return
+        baseline = None
+        if options['baseline']:
+            try:
+                baseline = json.loads(Path(options['baseline']).read_text())
+            except (OSError, ValueError) as error:
+                raise CommandError(f'Cannot read baseline: {error}')
+        runner = BenchmarkRunner(
+            requests=options['requests'],
+            warmup=options['warmup'],
+            cold_cache=options['cold_cache'],
+            seed=options['seed'],
+        )
+        results = runner.run(options['scenarios'])
+        self.report(results)
+        if options['save_baseline']:
+            Path(options['save_baseline']).write_text(json.dumps({
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'vendor': connection.vendor,
+                'scenarios': results,
+            }, indent=2))
+        failures = [
+            error for result in results.values() for error in result['errors']
+        ]
+        if baseline is not None:
+            failures += compare(results, baseline, options['threshold'])
+        if failures:
+            raise CommandError('\n'.join(failures))
+
+    def compare_concurrency(self, options):
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency must be positive')
+        results = ConcurrencyBenchmark(
+            concurrency=options['concurrency'],
+            requests=options['requests'],
+            cold_cache=options['cold_cache'],
+        ).run()
+        rows = {
+            f'{name} {mode}': result
+            for name, modes in results.items()
+            for mode, result in modes.items()
+        }
+        self.report(rows, CONCURRENCY_COLUMNS)
+        failures = [name for name, row in rows.items() if row['errors']]
+        if failures:
+            raise CommandError(f'Requests failed: {", ".join(failures)}')
+
+    def report(self, results, columns=COLUMNS):
+        self.stdout.write(
+            f'{"scenario":<16}'
+            + ''.join(f'{column:>{len(column) + 2}}' for column in columns)
+        )
+        for name, result in results.items():
+            self.stdout.write(f'{name:<16}' + ''.join(
+                f'{result.get(column, "-"):>{len(column) + 2}}'
+                for column in columns
+            ))
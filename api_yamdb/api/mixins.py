@@ -1,4 +1,9 @@
-from rest_framework import mixins, viewsets
+from rest_framework import mixins, status, viewsets
+from rest_framework.generics import get_object_or_404
+from rest_framework.response import Response
+
+from api.serializers import DeletionJobSerializer
+from reviews.deletion import schedule_deletion
 
 
 class CreateListDestroyViewSet(mixins.CreateModelMixin,
@@ -6,3 +11,73 @@ class CreateListDestroyViewSet(mixins.CreateModelMixin,
                                mixins.DestroyModelMixin,
                                viewsets.GenericViewSet):
     lookup_field = 'slug'
+
+
+class QueryPlanMixin:
+    """Загружает связанные объекты по плану для текущего action.
+
+    `query_plans` сопоставляет action со словарем с ключами
+    `select_related` и `prefetch_related`; план `default` используется
+    для action без собственного плана.
+    """
+
+    query_plans = {}
+
+    def get_query_plan(self):
+        return self.query_plans.get(
+            self.action, self.query_plans.get('default', {})
+        )
+
+    def apply_query_plan(self, queryset):
+        plan = self.get_query_plan()
+        if plan.get('select_related'):
+            queryset = queryset.select_related(*plan['select_related'])
+        if plan.get('prefetch_related'):
+            queryset = queryset.prefetch_related(*plan['prefetch_related'])
+        return queryset
+
+    def get_queryset(self):
+        return self.apply_query_plan(super().get_queryset())
+
+
+class NestedResourceMixin:
+    """Находит родительский объект вложенного маршрута.
+
+    `parent_lookups` сопоставляет поля `parent_model` с аргументами URL,
+    так что вся цепочка родителей проверяется одним запросом: отзыв
+    из чужого произведения дает 404. `parent_filters` — постоянные
+    условия родителя, например скрытие произведений в очереди
+    на удаление. Результат запоминается на время запроса, сериализаторы
+    получают его через context['view'].
+    """
+
+    parent_model = None
+    parent_lookups = {}
+    parent_filters = {}
+
+    def get_parent(self):
+        if not hasattr(self, '_parent'):
+            self._parent = get_object_or_404(
+                self.parent_model.objects.filter(**self.parent_filters),
+                **{
+                    field: self.kwargs.get(kwarg)
+                    for field, kwarg in self.parent_lookups.items()
+                },
+            )
+        return self._parent
+
+
+class DeferredDeletionMixin:
+    """Удаляет объект с большим числом зависимых строк в фоне.
+
+    Такое удаление отвечает 202 и задачей, ход которой виден
+    в /deletions/, остальные удаляются сразу с ответом 204.
+    """
+
+    def destroy(self, request, *args, **kwargs):
+        job = schedule_deletion(self.get_object())
+        if job is None:
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        return Response(
+            DeletionJobSerializer(job).data, status=status.HTTP_202_ACCEPTED,
+        )
@@ -0,0 +1,202 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+from api.cache import get_cache
+
+COUNT_KEY = 'api:count:{}'
+TABLE_SIZE_KEY = 'api:table-size:{}'
+
+
+def table_size(queryset):
+    """Оценка числа строк таблицы из статистики PostgreSQL.
+
+    Значение кешируется на PAGINATION['COUNT_TIMEOUT'] секунд. На других
+    СУБД и для таблиц без собранной статистики возвращает None.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    table = queryset.model._meta.db_table
+    cache = get_cache()
+    size = cache.get(TABLE_SIZE_KEY.format(table))
+    if size is None:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class '
+                'WHERE oid = %s::regclass',
+                (connection.ops.quote_name(table),),
+            )
+            size = cursor.fetchone()[0]
+        cache.set(TABLE_SIZE_KEY.format(table), size,
+                  settings.PAGINATION['COUNT_TIMEOUT'])
+    return size if size > 0 else None
+
+
+def planner_rows(queryset):
+    """Число строк выборки по оценке планировщика (EXPLAIN).
+
+    QuerySet.explain() отдает план строкой через str(), а psycopg2 уже
+    разбирает JSON, поэтому EXPLAIN выполняется напрямую.
+    """
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]['Plan']['Plan Rows']
+
+
+class ApproximatePage(Page):
+    """Страница, у которой следующая определяется по лишней строке."""
+
+    more = False
+
+    def has_next(self):
+        if self.paginator.approximate:
+            return self.more
+        return super().has_next()
+
+
+class ApproximateCountPaginator(Paginator):
+    """Paginator, который не считает COUNT(*) по большим таблицам.
+
+    Выборки до PAGINATION['EXACT_COUNT_THRESHOLD'] строк считаются точно.
+    Для больших выборок на PostgreSQL берется оценка планировщика, а
+    точный count больше порога кешируется на COUNT_TIMEOUT секунд, так
+    что на SQLite повторные запросы тоже не считают строки заново.
+    Признак `approximate` выставляется, если count не точный; тогда
+    номер страницы не сверяется с count, а страница читается с одной
+    лишней строкой, чтобы знать, есть ли следующая.
+    """
+
+    approximate = False
+
+    def get_count_key(self):
+        sql, params = self.object_list.query.sql_with_params()
+        source = f'{self.object_list.db}|{sql}|{params!r}'
+        return COUNT_KEY.format(hashlib.md5(source.encode()).hexdigest())
+
+    def estimate(self):
+        size = table_size(self.object_list)
+        threshold = settings.PAGINATION['EXACT_COUNT_THRESHOLD']
+        if size is None or size <= threshold:
+            return None
+        if not self.object_list.query.where:
+            return size
+        rows = planner_rows(self.object_list)
+        return rows if rows > threshold else None
+
+    @cached_property
+    def count(self):
+        if not hasattr(self.object_list, 'query'):
+            return super().count
+        try:
+            key = self.get_count_key()
+        except EmptyResultSet:
+            return 0
+        cache = get_cache()
+        count = cache.get(key)
+        if count is None:
+            count = self.estimate()
+        if count is not None:
+            self.approximate = True
+            return count
+        count = super().count
+        if count > settings.PAGINATION['EXACT_COUNT_THRESHOLD']:
+            cache.set(key, count, settings.PAGINATION['COUNT_TIMEOUT'])
+        return count
+
+    def validate_number(self, number):
+        if not (self.count and self.approximate):
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('Номер страницы не целое число')
+        if number < 1:
+            raise EmptyPage('Номер страницы меньше 1')
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.approximate:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage('На странице нет результатов')
+        page = self._get_page(rows[:self.per_page], number, self)
+        page.more = len(rows) > self.per_page
+        return page
+
+    def _get_page(self, *args, **kwargs):
+        return ApproximatePage(*args, **kwargs)
+
+
+class ApproximateCountPagination(PageNumberPagination):
+    """Постраничная пагинация с приблизительным count на больших таблицах.
+
+    Приблизительный count помечается в ответе полем `approximate: true`,
+    а выдача поиска, обрезанная до SEARCH['MAX_RESULTS'], — полем
+    `truncated: true`; остальные ответы не меняются.
+    """
+
+    django_paginator_class = ApproximateCountPaginator
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.page.paginator.approximate:
+            response.data['approximate'] = True
+            response.data.move_to_end('approximate', last=False)
+            response.data.move_to_end('count', last=False)
+        if getattr(self.request, 'search_truncated', False):
+            response.data['truncated'] = True
+        return response
+
+
+class FeedCursorPagination(CursorPagination):
+    """Курсорная пагинация лент по дате публикации."""
+
+    ordering = ('pub_date', 'id')
+
+
+class FeedPagination(ApproximateCountPagination):
+    """Постраничная пагинация лент с курсорным режимом по запросу.
+
+    Курсорный режим включается параметром `?pagination=cursor`
+    или переданным `?cursor=`; без них ответы остаются постраничными.
+    """
+
+    cursor_pagination_class = FeedCursorPagination
+    mode_query_param = 'pagination'
+    cursor_mode = 'cursor'
+
+    def use_cursor(self, request):
+        return (
+            request.query_params.get(self.mode_query_param)
+            == self.cursor_mode
+            or self.cursor_pagination_class.cursor_query_param
+            in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.use_cursor(request):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,157 @@
+import re
+import threading
+
+from django.conf import settings
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connections
+from django.db.models import Case, FloatField, Q, Value, When
+from django.db.models.functions import Greatest
+from rest_framework import filters
+
+from api.cache import bump_version_on_commit, get_versions
+
+WORD_RE = re.compile(r'\w+')
+
+
+def trigrams(text):
+    """Триграммы слов текста, как их считает pg_trgm."""
+    result = set()
+    for word in WORD_RE.findall(text.lower()):
+        padded = f'  {word} '
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+class InvertedIndex:
+    """Индекс триграмма -> id для поиска без PostgreSQL."""
+
+    def __init__(self, rows):
+        self.texts = {}
+        self.trigrams = {}
+        self.postings = {}
+        for pk, text in rows:
+            self.texts[pk] = text.lower()
+            self.trigrams[pk] = trigrams(text)
+            for trigram in self.trigrams[pk]:
+                self.postings.setdefault(trigram, set()).add(pk)
+
+    def search(self, query, threshold):
+        """Возвращает {id: сходство} для подстрок и похожих текстов."""
+        query_trigrams = trigrams(query)
+        shared = {}
+        for trigram in query_trigrams:
+            for pk in self.postings.get(trigram, ()):
+                shared[pk] = shared.get(pk, 0) + 1
+        ranks = {}
+        for pk, count in shared.items():
+            union = len(query_trigrams) + len(self.trigrams[pk]) - count
+            ranks[pk] = count / union
+        query = query.lower()
+        return {
+            pk: ranks.get(pk, 0.0)
+            for pk, text in self.texts.items()
+            if query in text or ranks.get(pk, 0.0) >= threshold
+        }
+
+
+def search_labels(model, field):
+    """Метки версий, от которых зависит индекс поля модели."""
+    label = model._meta.label_lower
+    return f'search:{label}', f'search:{label}.{field}'
+
+
+def bump_search_versions(model, fields=None):
+    """Делает устаревшими индексы всех полей модели или только fields."""
+    label = model._meta.label_lower
+    if fields is None:
+        bump_version_on_commit(f'search:{label}')
+        return
+    for field in fields:
+        bump_version_on_commit(f'search:{label}.{field}')
+
+
+class InvertedIndexRegistry:
+    """Индексы по полям моделей в памяти процесса.
+
+    Индекс перестраивается, только когда меняются строки модели или
+    само поле (см. bump_search_versions): сохранение с update_fields
+    без этого поля, например отзыв токенов пользователя, индекс
+    не сбрасывает.
+    """
+
+    def __init__(self):
+        self.indexes = {}
+        self.lock = threading.Lock()
+
+    def get(self, model, field):
+        version = get_versions(search_labels(model, field))
+        key = (model._meta.label_lower, field)
+        with self.lock:
+            cached = self.indexes.get(key)
+            if cached is None or cached[0] != version:
+                rows = model._default_manager.values_list('pk', field)
+                cached = (version, InvertedIndex(rows.iterator()))
+                self.indexes[key] = cached
+        return cached[1]
+
+
+inverted_indexes = InvertedIndexRegistry()
+
+
+class TrigramSearchFilter(filters.SearchFilter):
+    """Поиск по подстроке и триграммному сходству с ранжированием.
+
+    На PostgreSQL запрос обслуживают GIN-индексы `gin_trgm_ops`,
+    на других БД — `InvertedIndex` в памяти процесса. Там результаты
+    ограничены SEARCH['MAX_RESULTS'] лучшими по сходству, а обрезанная
+    выдача отмечается в запросе (`request.search_truncated`), чтобы
+    пагинация сообщила об этом в ответе. Параметр запроса берется
+    из `search_param` вьюсета, по умолчанию `search`.
+    """
+
+    def get_search_query(self, request, view):
+        param = getattr(view, 'search_param', self.search_param)
+        return request.query_params.get(param, '').strip()
+
+    def filter_queryset(self, request, queryset, view):
+        fields = self.get_search_fields(view, request)
+        query = self.get_search_query(request, view)
+        if not fields or not query:
+            return queryset
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        if connections[queryset.db].vendor == 'postgresql':
+            queryset = self.search_postgresql(queryset, fields, query)
+        else:
+            queryset = self.search_in_process(
+                request, queryset, fields, query
+            )
+        return queryset.order_by('-search_rank', *ordering)
+
+    def search_postgresql(self, queryset, fields, query):
+        condition = Q()
+        for field in fields:
+            condition |= Q(**{f'{field}__icontains': query})
+            condition |= Q(**{f'{field}__trigram_similar': query})
+        ranks = [TrigramSimilarity(field, query) for field in fields]
+        rank = ranks[0] if len(ranks) == 1 else Greatest(*ranks)
+        return queryset.filter(condition).annotate(search_rank=rank)
+
+    def search_in_process(self, request, queryset, fields, query):
+        threshold = settings.SEARCH['TRIGRAM_THRESHOLD']
+        ranks = {}
+        for field in fields:
+            index = inverted_indexes.get(queryset.model, field)
+            for pk, rank in index.search(query, threshold).items():
+                ranks[pk] = max(rank, ranks.get(pk, 0.0))
+        best = sorted(ranks, key=ranks.get, reverse=True)
+        limit = settings.SEARCH['MAX_RESULTS']
+        if len(best) > limit:
+            request.search_truncated = True
+            best = best[:limit]
+        return queryset.filter(pk__in=best).annotate(
+            search_rank=Case(
+                *(When(pk=pk, then=Value(ranks[pk])) for pk in best),
+                default=Value(0.0),
+                output_field=FloatField(),
+            )
+        )
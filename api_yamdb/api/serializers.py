@@ -1,9 +1,12 @@
+from django.conf import settings
+from django.db import IntegrityError
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
-from rest_framework.generics import get_object_or_404
+from rest_framework.settings import api_settings
 from rest_framework.validators import UniqueValidator
 
-from reviews.models import Category, Comment, Genre, Review, Title
+from reviews.models import Category, Comment, DeletionJob, Genre, Review, Title
+from reviews.validator import title_year_validator
 from users.models import User
 from users.validators import username_is_not_me_validators
 
@@ -72,16 +75,55 @@ class GenreSerializer(serializers.ModelSerializer):
 
 
 class TitleSerializerGET(serializers.ModelSerializer):
+    """Произведение для чтения.
+
+    Гистограмма оценок выводится только по запросу с ?histogram=true.
+    """
+
     genre = GenreSerializer(many=True,)
     category = CategorySerializer()
-    rating = serializers.IntegerField(
-        source='reviews__score__avg', read_only=True
+    rating = serializers.IntegerField(read_only=True)
+    histogram = serializers.DictField(
+        source='score_histogram',
+        child=serializers.IntegerField(),
+        read_only=True,
     )
 
     class Meta:
         model = Title
         fields = ('id', 'name', 'year', 'rating', 'description', 'genre',
-                  'category')
+                  'category', 'histogram')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.query_params.get(
+            'histogram'
+        ) not in serializers.BooleanField.TRUE_VALUES:
+            self.fields.pop('histogram')
+
+
+class TitleHistogramSerializer(serializers.ModelSerializer):
+    histogram = serializers.DictField(
+        source='score_histogram',
+        child=serializers.IntegerField(),
+        read_only=True,
+    )
+
+    class Meta:
+        model = Title
+        fields = ('id', 'review_count', 'histogram')
+
+
+class LeaderboardQuerySerializer(serializers.Serializer):
+    genre = serializers.SlugField(required=False)
+    category = serializers.SlugField(required=False)
+    year = serializers.IntegerField(required=False)
+    limit = serializers.IntegerField(
+        min_value=1,
+        max_value=settings.LEADERBOARD['MAX_LIMIT'],
+        default=settings.LEADERBOARD['DEFAULT_LIMIT'],
+    )
 
 
 class TitleSerializer(serializers.ModelSerializer):
@@ -100,6 +142,42 @@ class TitleSerializer(serializers.ModelSerializer):
         fields = ('name', 'id', 'year', 'description', 'genre', 'category')
 
 
+class BulkTitleSerializer(serializers.Serializer):
+    """Произведение для массовой загрузки.
+
+    Жанры и категория принимаются как slug без запросов к базе,
+    их существование проверяется для всей пачки сразу.
+    """
+
+    name = serializers.CharField(max_length=256)
+    year = serializers.IntegerField(validators=(title_year_validator,))
+    description = serializers.CharField(allow_blank=True, default='')
+    category = serializers.SlugField(max_length=50)
+    genre = serializers.ListField(child=serializers.SlugField(max_length=50))
+
+
+class BulkGenreSerializer(serializers.Serializer):
+    """Назначение жанров произведению для массовой загрузки."""
+
+    title = serializers.IntegerField()
+    genre = serializers.ListField(
+        child=serializers.SlugField(max_length=50), allow_empty=False,
+    )
+
+
+class BulkRequestSerializer(serializers.Serializer):
+    items = serializers.ListField(
+        child=serializers.DictField(), allow_empty=False,
+    )
+    strict = serializers.BooleanField(default=False)
+
+    def validate_items(self, value):
+        limit = self.context['max_items']
+        if len(value) > limit:
+            raise ValidationError(f'Не больше {limit} элементов за запрос.')
+        return value
+
+
 class ReviewSerializer(serializers.ModelSerializer):
     title = serializers.SlugRelatedField(
         slug_field='name',
@@ -111,22 +189,30 @@ class ReviewSerializer(serializers.ModelSerializer):
         default=serializers.CurrentUserDefault(),
     )
 
-    def validate(self, data):
-        request = self.context['request']
-        title = get_object_or_404(
-            Title, pk=self.context['view'].kwargs.get('title_id')
-        )
-        if request.method == 'POST':
-            if (Review.objects.filter(title=title, author=request.user)
-                    .exists()):
-                raise ValidationError(
+    def create(self, validated_data):
+        """Создает отзыв одним INSERT, повтор отклоняет ограничение БД.
+
+        Проверка до вставки не защищает от двух одновременных запросов,
+        поэтому нарушение unique_author_title превращается в ошибку 400.
+        """
+        try:
+            return super().create(validated_data)
+        except IntegrityError:
+            if not Review.objects.filter(
+                title=validated_data['title'],
+                author=validated_data['author'],
+            ).exists():
+                raise
+            raise ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
                     'Вы уже оставляли отзыв на это произведение'
-                )
-        return data
+                ],
+            })
 
     class Meta:
         model = Review
-        fields = ('id', 'author', 'title', 'text', 'score', 'pub_date')
+        fields = ('id', 'author', 'title', 'text', 'score', 'pub_date',
+                  'comment_count', 'last_comment_at')
 
 
 class CommentSerializer(serializers.ModelSerializer):
@@ -137,3 +223,19 @@ class CommentSerializer(serializers.ModelSerializer):
     class Meta:
         fields = ('id', 'author', 'text', 'pub_date',)
         model = Comment
+
+
+class DeletionJobSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = DeletionJob
+        fields = ('id', 'kind', 'object_id', 'status', 'total', 'deleted',
+                  'progress', 'attempts', 'last_error', 'created_at',
+                  'finished_at')
+
+    def get_progress(self, job):
+        """Доля удаленных строк, счетчик total приблизительный."""
+        if job.status == DeletionJob.DONE or not job.total:
+            return 1.0
+        return min(job.deleted / job.total, 1.0)
@@ -0,0 +1,53 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from api.authentication import forget_user
+from api.cache import bump_version_on_commit
+from api.search import bump_search_versions
+from reviews.models import (Category, Genre, GenreTitle, Review, Title,
+                            TitleRanking)
+from reviews.signals import bulk_loaded
+from users.models import User
+
+VERSIONED_MODELS = (Category, Genre, GenreTitle, Review, Title, TitleRanking,
+                    User)
+SEARCHED_MODELS = (Category, Genre, Title, User)
+
+
+def model_changed(sender, **kwargs):
+    """Сбрасывает версию модели для кеша ответов."""
+    bump_version_on_commit(sender._meta.label_lower)
+
+
+def searched_model_saved(sender, created, update_fields, **kwargs):
+    """Сбрасывает поисковые индексы только по сохраненным полям."""
+    bump_search_versions(sender, None if created else update_fields)
+
+
+def searched_model_changed(sender, fields=None, **kwargs):
+    bump_search_versions(sender, fields)
+
+
+# Приемники подключаются к конкретным моделям: приемник post_delete без
+# sender отключил бы быстрое удаление (Collector.can_fast_delete) у всех
+# моделей проекта.
+for model in VERSIONED_MODELS:
+    for signal in (post_save, post_delete, bulk_loaded):
+        signal.connect(model_changed, sender=model)
+for model in SEARCHED_MODELS:
+    post_save.connect(searched_model_saved, sender=model)
+    post_delete.connect(searched_model_changed, sender=model)
+    bulk_loaded.connect(searched_model_changed, sender=model)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_genres_changed(sender, action, **kwargs):
+    if action.startswith('post_'):
+        bump_version_on_commit(GenreTitle._meta.label_lower)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    """Сбрасывает закешированную для аутентификации версию токенов."""
+    forget_user(instance.pk)
@@ -0,0 +1,45 @@
+import json
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class NDJSONRenderer(JSONRenderer):
+    """Рендерер для потоковых ответов по строке JSON на объект."""
+
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(
+            data, accepted_media_type, renderer_context
+        ) + b'\n'
+
+
+def iterate_chunks(queryset, chunk_size):
+    """Возвращает объекты пачками, выбирая каждую по ключу pk.
+
+    Каждая пачка — отдельный запрос с LIMIT, поэтому prefetch_related
+    выполняется для пачки, а не для всей выборки.
+    """
+    queryset = queryset.order_by('pk')
+    last_pk = None
+    while True:
+        chunk = queryset
+        if last_pk is not None:
+            chunk = chunk.filter(pk__gt=last_pk)
+        chunk = list(chunk[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1].pk
+
+
+def stream_ndjson(queryset, serializer_class, chunk_size=500):
+    """Сериализует выборку построчно в NDJSON."""
+    for chunk in iterate_chunks(queryset, chunk_size):
+        lines = (
+            json.dumps(item, cls=JSONEncoder, ensure_ascii=False)
+            for item in serializer_class(chunk, many=True).data
+        )
+        yield ('\n'.join(lines) + '\n').encode()
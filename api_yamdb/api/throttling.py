@@ -0,0 +1,176 @@
+import abc
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'5/min' -> (5, 60), как у SimpleRateThrottle."""
+    if rate is None:
+        return None, None
+    number, period = rate.split('/')
+    return int(number), DURATIONS[period[0]]
+
+
+class LocalBucketStore:
+    """Token bucket в памяти процесса.
+
+    Емкость корзины равна limit, она наполняется со скоростью
+    limit / period. Хранится не больше MAX_KEYS корзин, самые давние
+    вытесняются.
+    """
+
+    MAX_KEYS = 100_000
+
+    def __init__(self, timer=time.monotonic):
+        self.timer = timer
+        self.lock = threading.Lock()
+        self.buckets = OrderedDict()
+
+    def hit(self, key, limit, period):
+        """Списывает токен; возвращает (разрешено, через сколько секунд)."""
+        rate = limit / period
+        now = self.timer()
+        with self.lock:
+            tokens, updated = self.buckets.pop(key, (limit, now))
+            tokens = min(limit, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self.buckets[key] = (tokens, now)
+            if len(self.buckets) > self.MAX_KEYS:
+                self.buckets.popitem(last=False)
+        return allowed, 0 if allowed else (1 - tokens) / rate
+
+
+class CacheWindowStore:
+    """Скользящее окно на двух счетчиках в общем кеше.
+
+    Число запросов за последние period секунд оценивается как счетчик
+    текущего окна плюс доля счетчика предыдущего. Счетчики меняются
+    через add/incr/decr, поэтому воркеры с общим кешем не теряют
+    обращений.
+    """
+
+    def __init__(self, timer=time.time):
+        self.timer = timer
+        self.cache = caches[settings.API_THROTTLE['CACHE_ALIAS']]
+
+    def hit(self, key, limit, period):
+        now = self.timer()
+        window = int(now // period)
+        current_key = f'{key}:{window}'
+        self.cache.add(current_key, 0, period * 2)
+        try:
+            current = self.cache.incr(current_key)
+        except ValueError:
+            self.cache.add(current_key, 1, period * 2)
+            current = 1
+        previous = self.cache.get(f'{key}:{window - 1}', 0)
+        elapsed = now - window * period
+        weight = 1 - elapsed / period
+        if previous * weight + current <= limit:
+            return True, 0
+        # Отклоненные запросы не занимают место в окне.
+        self.cache.decr(current_key)
+        if current > limit or not previous:
+            return False, period - elapsed
+        excess = previous * weight + current - limit
+        return False, min(period - elapsed, excess * period / previous)
+
+
+stores = {}
+
+
+def get_store():
+    path = settings.API_THROTTLE['STORE']
+    if path not in stores:
+        stores[path] = import_string(path)()
+    return stores[path]
+
+
+class KeyedRateThrottle(BaseThrottle, metaclass=abc.ABCMeta):
+    """Ограничивает частоту запросов по ключам из get_idents.
+
+    Лимит берется из REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'][scope]
+    при каждом запросе; без лимита запросы не ограничиваются. Счетчики
+    ведутся отдельно для каждого action вьюсета.
+    """
+
+    scope = None
+    wait_time = 0
+
+    @abc.abstractmethod
+    def get_idents(self, request, view):
+        """Ключи, по каждому из которых считается лимит."""
+
+    def allow_request(self, request, view):
+        limit, period = parse_rate(
+            api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        )
+        if limit is None:
+            return True
+        action = getattr(view, 'action', None) or request.method.lower()
+        store = get_store()
+        for ident in self.get_idents(request, view):
+            if not ident:
+                continue
+            digest = hashlib.md5(str(ident).encode()).hexdigest()
+            allowed, self.wait_time = store.hit(
+                f'throttle:{self.scope}:{action}:{digest}', limit, period
+            )
+            if not allowed:
+                return False
+        return True
+
+    def wait(self):
+        return math.ceil(self.wait_time)
+
+
+class IPRateThrottle(KeyedRateThrottle):
+    scope = 'auth_ip'
+
+    def get_idents(self, request, view):
+        return (self.get_ident(request),)
+
+    def get_ident(self, request):
+        """IP клиента; X-Forwarded-For учитывается только с NUM_PROXIES.
+
+        BaseThrottle при NUM_PROXIES = None берет IP из X-Forwarded-For
+        целиком, и клиент без прокси обходил бы лимит подменой заголовка.
+        """
+        if api_settings.NUM_PROXIES is None:
+            return request.META.get('REMOTE_ADDR')
+        return super().get_ident(request)
+
+
+class DataFieldRateThrottle(KeyedRateThrottle):
+    """Ключ — значение поля из тела запроса без учета регистра."""
+
+    field = None
+
+    def get_idents(self, request, view):
+        if not isinstance(request.data, dict):
+            return ()
+        value = request.data.get(self.field)
+        return (value.strip().lower(),) if isinstance(value, str) else ()
+
+
+class UsernameRateThrottle(DataFieldRateThrottle):
+    scope = 'auth_username'
+    field = 'username'
+
+
+class EmailRateThrottle(DataFieldRateThrottle):
+    scope = 'auth_email'
+    field = 'email'
@@ -1,14 +1,18 @@
-from django.urls import include, path
+from django.conf import settings
+from django.urls import include, path, re_path
 from rest_framework.routers import DefaultRouter
 
+from api.async_views import async_read_view
 from api.views import (AuthViewSet, CategoryViewSet, CommentViewSet,
-                       GenreViewSet, ReviewViewSet, TitleViewSet, UserViewSet)
+                       DeletionJobViewSet, GenreViewSet, MetricsView,
+                       ReviewViewSet, TitleViewSet, UserViewSet)
 
 app_name = 'api'
 
 router = DefaultRouter()
 router.register(r'auth', AuthViewSet, basename='auth')
 router.register(r'users', UserViewSet, basename='users')
+router.register(r'deletions', DeletionJobViewSet, basename='deletions')
 
 router.register(r'categories', CategoryViewSet)
 router.register(r'genres', GenreViewSet)
@@ -18,6 +22,29 @@ router.register(r'titles/(?P<title_id>\d+)/reviews',
 router.register(r'titles/(?P<title_id>\d+)/reviews/(?P<review_id>\d+)'
                 r'/comments', CommentViewSet, basename='comments')
 
+async_urlpatterns = [
+    re_path(
+        r'^v1/titles/$',
+        async_read_view(TitleViewSet, {'get': 'list', 'post': 'create'}),
+        name='titles-list',
+    ),
+    re_path(
+        r'^v1/titles/(?P<title_id>\d+)/reviews/$',
+        async_read_view(ReviewViewSet, {'get': 'list', 'post': 'create'}),
+        name='reviews-list',
+    ),
+    re_path(
+        r'^v1/titles/(?P<title_id>\d+)/reviews/(?P<review_id>\d+)'
+        r'/comments/$',
+        async_read_view(CommentViewSet, {'get': 'list', 'post': 'create'}),
+        name='comments-list',
+    ),
+]
+
 urlpatterns = [
+    path('v1/metrics/', MetricsView.as_view(), name='metrics'),
     path('v1/', include(router.urls)),
 ]
+
+if settings.ASYNC_READ_VIEWS:
+    urlpatterns = async_urlpatterns + urlpatterns
@@ -1,30 +1,48 @@
 from django.contrib.auth.tokens import default_token_generator
-from django.db.models import Avg
+from django.http import StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters, permissions, status, viewsets
+from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.generics import get_object_or_404
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import AccessToken
-
-from api.filters import TitleFilter
-from api.mixins import CreateListDestroyViewSet
+from rest_framework.views import APIView
+
+from api.authentication import RoleAccessToken, get_author, get_full_user
+from api.bulk import GenreBulkWriter, TitleBulkWriter
+from api.cache import CachedResponseMixin
+from api.filters import StableOrderingFilter, TitleFilter
+from api.instrumentation import (InstrumentedViewMixin, PrometheusRenderer,
+                                 registry, render_gauge)
+from api.lean import LeanListMixin
+from api.mixins import (CreateListDestroyViewSet, DeferredDeletionMixin,
+                        NestedResourceMixin, QueryPlanMixin)
+from api.pagination import ApproximateCountPagination, FeedPagination
 from api.permissions import (IsAdmin, IsAdminOrReadOnly, IsOwner,
                              IsOwnerModeratorAdminOrReadOnly)
-from api.serializers import (AuthSerializer, CategorySerializer,
-                             CommentSerializer, GenreSerializer,
-                             ReviewSerializer, TitleSerializer,
+from api.search import TrigramSearchFilter
+from api.serializers import (AuthSerializer, BulkRequestSerializer,
+                             CategorySerializer, CommentSerializer,
+                             DeletionJobSerializer, GenreSerializer,
+                             LeaderboardQuerySerializer, ReviewSerializer,
+                             TitleHistogramSerializer, TitleSerializer,
                              TitleSerializerGET, TokenSerializer,
                              UserPatchSerializer, UserSerializer)
-from reviews.models import Category, Genre, Review, Title
+from api.streaming import NDJSONRenderer, stream_ndjson
+from api.throttling import (EmailRateThrottle, IPRateThrottle,
+                            UsernameRateThrottle)
+from reviews.models import (HISTOGRAM_FIELDS, Category, DeletionJob, Genre,
+                            Review, Title, TitleRanking)
+from users.mail import enqueue_email, queue_stats
 from users.models import User
 
 
-class AuthViewSet(viewsets.ViewSet):
+class AuthViewSet(InstrumentedViewMixin, viewsets.ViewSet):
     """Вьюсет для авторизации."""
 
     permission_classes = (permissions.AllowAny,)
+    throttle_classes = (IPRateThrottle, UsernameRateThrottle,
+                        EmailRateThrottle)
 
     @action(detail=False, methods=('POST',))
     def signup(self, request):
@@ -33,9 +51,11 @@ class AuthViewSet(viewsets.ViewSet):
         serializer.is_valid(raise_exception=True)
         user, _ = User.objects.get_or_create(**serializer.validated_data)
         confirmation_code = default_token_generator.make_token(user)
-        user.email_user(
+        enqueue_email(
+            user.email,
             'Код подтверждения',
             f'{confirmation_code}',
+            dedup_key=f'signup:{user.pk}',
         )
         return Response(
             serializer.data,
@@ -58,19 +78,20 @@ class AuthViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
         return Response(
-            {'token': str(AccessToken.for_user(user))},
+            {'token': str(RoleAccessToken.for_user(user))},
             status=status.HTTP_200_OK,
         )
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(InstrumentedViewMixin, DeferredDeletionMixin,
+                  viewsets.ModelViewSet):
     """Вьюсет для обьектов модели User."""
 
     queryset = User.objects.all()
     permission_classes = (IsAdmin,)
     serializer_class = UserSerializer
-    pagination_class = PageNumberPagination
-    filter_backends = (filters.SearchFilter,)
+    pagination_class = ApproximateCountPagination
+    filter_backends = (TrigramSearchFilter,)
     search_fields = ('username',)
 
     @action(
@@ -79,11 +100,12 @@ class UserViewSet(viewsets.ModelViewSet):
         permission_classes=(IsOwner,)
     )
     def me(self, request, *args, **kwars):
+        user = get_full_user(request.user)
         if request.method == 'GET':
-            serializer = UserSerializer(request.user)
+            serializer = UserSerializer(user)
         elif request.method == 'PATCH':
             serializer = UserPatchSerializer(
-                request.user,
+                user,
                 data=request.data,
                 partial=True
             )
@@ -102,23 +124,144 @@ class UserViewSet(viewsets.ModelViewSet):
         return super().update(request, args, **kwargs)
 
 
-class CategoryViewSet(CreateListDestroyViewSet):
+class CategoryViewSet(InstrumentedViewMixin, CachedResponseMixin,
+                      CreateListDestroyViewSet):
     """Вьюсет для обьектов модели Category."""
 
     queryset = Category.objects.all()
+    cache_dependencies = ('reviews.category',)
     serializer_class = CategorySerializer
     permission_classes = (IsAdminOrReadOnly,)
-    filter_backends = (filters.SearchFilter,)
+    filter_backends = (TrigramSearchFilter,)
     search_fields = ('name',)
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(InstrumentedViewMixin, CachedResponseMixin,
+                   QueryPlanMixin, DeferredDeletionMixin, LeanListMixin,
+                   viewsets.ModelViewSet):
     """Вьюсет для обьектов модели Title."""
 
     permission_classes = (IsAdminOrReadOnly,)
-    queryset = Title.objects.annotate(Avg('reviews__score')).order_by('name')
-    filter_backends = (DjangoFilterBackend,)
+    queryset = Title.objects.active().order_by('name', 'id')
+    query_plans = {
+        'list': {
+            'select_related': ('category',),
+            'prefetch_related': ('genre',),
+        },
+        'retrieve': {
+            'select_related': ('category',),
+            'prefetch_related': ('genre',),
+        },
+        'export': {
+            'select_related': ('category',),
+            'prefetch_related': ('genre',),
+        },
+    }
+    export_chunk_size = 500
+    bulk_max_items = 1000
+    filter_backends = (DjangoFilterBackend, TrigramSearchFilter,
+                       StableOrderingFilter)
     filterset_class = TitleFilter
+    search_fields = ('name',)
+    search_param = 'q'
+    ordering_fields = ('rating', 'year', 'name', 'review_count')
+    cache_dependencies = ('reviews.title', 'reviews.category',
+                          'reviews.genre', 'reviews.genretitle',
+                          'reviews.review', 'reviews.titleranking')
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    @action(
+        detail=False,
+        methods=('GET',),
+        permission_classes=(IsAdmin,),
+        renderer_classes=(NDJSONRenderer, JSONRenderer),
+    )
+    def export(self, request):
+        """Потоковая выгрузка всех произведений в NDJSON.
+
+        Поддерживает фильтры списка, выборка идет пачками по pk.
+        """
+        return StreamingHttpResponse(
+            stream_ndjson(
+                self.filter_queryset(self.get_queryset()),
+                TitleSerializerGET,
+                self.export_chunk_size,
+            ),
+            content_type=NDJSONRenderer.media_type,
+        )
+
+    @action(detail=False, methods=('GET',))
+    def top(self, request):
+        """Лучшие произведения по жанру, категории и году.
+
+        Читает limit строк из предрассчитанных рейтингов.
+        """
+        return self.cached_response(self.top_response, request)
+
+    def top_response(self, request):
+        query = LeaderboardQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = dict(query.validated_data)
+        limit = params.pop('limit')
+        rankings = TitleRanking.objects.top(**params).select_related(
+            'title__category'
+        ).prefetch_related('title__genre')[:limit]
+        return Response(TitleSerializerGET(
+            [ranking.title for ranking in rankings], many=True
+        ).data)
+
+    @action(detail=True, methods=('GET',))
+    def histogram(self, request, pk=None):
+        """Гистограмма оценок произведения из хранимых счетчиков.
+
+        Читает одну строку произведения, таблицу отзывов не трогает.
+        """
+        return self.cached_response(self.histogram_response, request, pk=pk)
+
+    def histogram_response(self, request, pk=None):
+        title = get_object_or_404(
+            Title.objects.active().only(
+                'id', 'review_count', *HISTOGRAM_FIELDS
+            ),
+            pk=pk,
+        )
+        return Response(TitleHistogramSerializer(title).data)
+
+    def bulk_write(self, writer_class, request):
+        serializer = BulkRequestSerializer(
+            data=request.data, context={'max_items': self.bulk_max_items},
+        )
+        serializer.is_valid(raise_exception=True)
+        writer = writer_class(strict=serializer.validated_data['strict'])
+        written = writer.write(serializer.validated_data['items'])
+        return Response(
+            writer.report(written),
+            status=status.HTTP_201_CREATED if written
+            else status.HTTP_400_BAD_REQUEST,
+        )
+
+    @action(detail=False, methods=('POST',), permission_classes=(IsAdmin,))
+    def bulk(self, request):
+        """Создает пачку произведений одной транзакцией.
+
+        Ошибочные элементы пропускаются и возвращаются в errors,
+        со strict=true при любой ошибке ничего не создается.
+        """
+        return self.bulk_write(TitleBulkWriter, request)
+
+    @action(
+        detail=False,
+        methods=('POST',),
+        permission_classes=(IsAdmin,),
+        url_path='bulk-genres',
+    )
+    def bulk_genres(self, request):
+        """Добавляет жанры пачке произведений."""
+        return self.bulk_write(GenreBulkWriter, request)
 
     def get_serializer_class(self):
         """Использует один из сериалайзеров в зависимости от запроса."""
@@ -127,51 +270,105 @@ class TitleViewSet(viewsets.ModelViewSet):
         return TitleSerializer
 
 
-class GenreViewSet(CreateListDestroyViewSet):
+class DeletionJobViewSet(InstrumentedViewMixin,
+                         viewsets.ReadOnlyModelViewSet):
+    """Ход отложенных удалений пользователей и произведений."""
+
+    queryset = DeletionJob.objects.order_by('-id')
+    serializer_class = DeletionJobSerializer
+    permission_classes = (IsAdmin,)
+
+
+class GenreViewSet(InstrumentedViewMixin, CachedResponseMixin,
+                   CreateListDestroyViewSet):
     """Вьюсет для обьектов модели Genre."""
 
     queryset = Genre.objects.all()
+    cache_dependencies = ('reviews.genre',)
     serializer_class = GenreSerializer
     permission_classes = (IsAdminOrReadOnly,)
-    filter_backends = (filters.SearchFilter,)
+    filter_backends = (TrigramSearchFilter,)
     search_fields = ('name',)
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(InstrumentedViewMixin, QueryPlanMixin,
+                    NestedResourceMixin, LeanListMixin,
+                    viewsets.ModelViewSet):
     """Вьюсет для обьектов модели Review."""
 
     serializer_class = ReviewSerializer
     permission_classes = (IsOwnerModeratorAdminOrReadOnly,)
-
-    def get_title(self):
-        """Возвращает title по pk."""
-        return get_object_or_404(Title, pk=self.kwargs.get("title_id"))
+    pagination_class = FeedPagination
+    filter_backends = (StableOrderingFilter,)
+    ordering_fields = ('pub_date', 'comment_count')
+    ordering = ('pub_date', 'id')
+    parent_model = Title
+    parent_lookups = {'pk': 'title_id'}
+    parent_filters = {'is_active': True}
+    query_plans = {
+        'default': {
+            'select_related': ('author',),
+        },
+    }
 
     def get_queryset(self):
         """Возвращает queryset c review для выбранного title."""
-        return self.get_title().reviews.all()
+        return self.apply_query_plan(self.get_parent().reviews.all())
 
     def perform_create(self, serializer):
         """Создает review для текущего title,
         автор == текущий пользователь."""
-        serializer.save(author=self.request.user, title=self.get_title())
+        serializer.save(
+            author=get_author(self.request.user), title=self.get_parent()
+        )
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(InstrumentedViewMixin, QueryPlanMixin,
+                     NestedResourceMixin, LeanListMixin,
+                     viewsets.ModelViewSet):
     """Вьюсет для обьектов модели Comment."""
 
     serializer_class = CommentSerializer
     permission_classes = (IsOwnerModeratorAdminOrReadOnly,)
-
-    def get_review(self):
-        """Возвращает review по pk."""
-        return get_object_or_404(Review, pk=self.kwargs.get("review_id"))
+    pagination_class = FeedPagination
+    parent_model = Review
+    parent_lookups = {'pk': 'review_id', 'title_id': 'title_id'}
+    parent_filters = {'title__is_active': True}
+    query_plans = {
+        'default': {
+            'select_related': ('author',),
+        },
+    }
 
     def get_queryset(self):
         """Возвращает queryset c comments для выбранного review."""
-        return self.get_review().comments.all()
+        return self.apply_query_plan(self.get_parent().comments.all())
 
     def perform_create(self, serializer):
         """Создает comments для текущего review,
         автор == текущий пользователь."""
-        serializer.save(author=self.request.user, review=self.get_review())
+        serializer.save(
+            author=get_author(self.request.user), review=self.get_parent()
+        )
+
+
+class MetricsView(APIView):
+    """Гистограммы замеров по view в текстовом формате Prometheus."""
+
+    permission_classes = (IsAdmin,)
+    renderer_classes = (PrometheusRenderer, JSONRenderer)
+
+    def get(self, request):
+        depth, oldest = queue_stats()
+        return Response(
+            registry.render()
+            + render_gauge(
+                'yamdb_mail_queue_depth', 'Outbound emails by status.',
+                [({'status': status}, count)
+                 for status, count in depth.items()],
+            )
+            + render_gauge(
+                'yamdb_mail_queue_oldest_pending_seconds',
+                'Age of the oldest pending email.', [({}, oldest)],
+            )
+        )
@@ -0,0 +1,38 @@
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+
+
+class StreamingASGIHandler(ASGIHandler):
+    """ASGIHandler, который читает потоковые ответы вне event loop.
+
+    Django 3.2 перебирает StreamingHttpResponse прямо в event loop, и
+    запросы к БД в генераторе ответа (выгрузка `/titles/export/`) падают
+    с SynchronousOnlyOperation. Здесь каждая часть ответа читается в
+    потоке для синхронного кода, как это делает Django 4.2.
+    """
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            await super().send_response(response, send)
+            return
+        parts = iter(response)
+        next_part = sync_to_async(next, thread_sensitive=True)
+        # Заголовки и завершающее сообщение отправляет ASGIHandler, ему
+        # остается пустое тело, а части идут сразу после заголовков.
+        response.streaming_content = ()
+
+        async def send_parts(message):
+            await send(message)
+            if message['type'] != 'http.response.start':
+                return
+            part = await next_part(parts, None)
+            while part is not None:
+                for chunk, _ in self.chunk_bytes(part):
+                    await send({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+                part = await next_part(parts, None)
+
+        await super().send_response(response, send_parts)
@@ -0,0 +1,48 @@
+from django.db.migrations.operations.base import Operation
+
+
+class CreateTrigramIndexes(Operation):
+    """GIN-индексы gin_trgm_ops по столбцам и по UPPER() столбцов.
+
+    Индексы создаются только на PostgreSQL и нужны поиску по подстроке
+    (`icontains`) и триграммному сходству. Расширение pg_trgm должно быть
+    создано раньше операцией TrigramExtension.
+    """
+
+    reversible = True
+
+    def __init__(self, columns):
+        self.columns = tuple(columns)
+
+    def deconstruct(self):
+        return self.__class__.__name__, [self.columns], {}
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def indexes(self):
+        for table, column in self.columns:
+            yield f'{table}_{column}_trgm', table, column
+            yield f'{table}_{column}_upper_trgm', table, f'UPPER({column})'
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for name, table, expression in self.indexes():
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS {name} '
+                f'ON {table} USING gin ({expression} gin_trgm_ops)'
+            )
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for name, _, _ in self.indexes():
+            schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+    def describe(self):
+        return 'Creates trigram indexes on ' + ', '.join(
+            f'{table}.{column}' for table, column in self.columns
+        )
@@ -18,6 +18,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'django_filters',
     'users.apps.UsersConfig',
@@ -26,6 +27,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.instrumentation.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -119,10 +121,88 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
 
+# Cache
+
+# Кеш общий для всех процессов: версии моделей, счетчики лимитов и
+# версии токенов меняются в web и в воркерах очередей.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.memcached.PyMemcacheCache',
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'memcached:11211'),
+    }
+}
+
+API_CACHE = {
+    'ALIAS': 'default',
+    'TIMEOUT': int(os.getenv('API_CACHE_TIMEOUT', 300)),
+    'AUTH_TIMEOUT': int(os.getenv('AUTH_CACHE_TIMEOUT', 60)),
+}
+
+
+# Search
+
+# MAX_RESULTS ограничивает выдачу поиска без PostgreSQL (индекс в памяти
+# процесса); обрезанный ответ содержит `truncated: true`.
+SEARCH = {
+    'TRIGRAM_THRESHOLD': 0.3,
+    'MAX_RESULTS': 1000,
+}
+
+
+# Leaderboards
+
+LEADERBOARD = {
+    'MIN_VOTES': int(os.getenv('LEADERBOARD_MIN_VOTES', 0)),
+    'DEFAULT_LIMIT': 10,
+    'MAX_LIMIT': 100,
+}
+
+
+# ASGI
+
+ASYNC_READ_VIEWS = bool(os.getenv('ASYNC_READ_VIEWS', False))
+
+
+# Instrumentation
+
+INSTRUMENTATION = {
+    'ENABLED': bool(os.getenv('INSTRUMENTATION_ENABLED', False)),
+    'SAMPLE_RATE': float(os.getenv('INSTRUMENTATION_SAMPLE_RATE', 1.0)),
+    'SERVER_TIMING': True,
+}
+
+
 # Email
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+EMAIL_BACKEND = os.getenv(
+    'EMAIL_BACKEND', 'django.core.mail.backends.filebased.EmailBackend'
+)
 EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
+EMAIL_HOST = os.getenv('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.getenv('EMAIL_PORT', 25))
+
+MAIL_QUEUE = {
+    'BATCH_SIZE': 50,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_DELAY': 60,
+    'MAX_RETRY_DELAY': 3600,
+    'DEDUP_WINDOW': 300,
+    'LEASE': 300,
+}
+
+# Удаление пользователей и произведений, у которых зависимых отзывов
+# и комментариев больше THRESHOLD, выполняет фоновый deletionworker.
+DELETION_QUEUE = {
+    'THRESHOLD': int(os.getenv('DELETION_THRESHOLD', 1000)),
+    'BATCH_SIZE': 1000,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_DELAY': 60,
+    'MAX_RETRY_DELAY': 3600,
+    'LEASE': 300,
+}
 
 
 # REST
@@ -132,14 +212,37 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PAGINATION_CLASS':
-        'rest_framework.pagination.PageNumberPagination',
+        'api.pagination.ApproximateCountPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
     ),
+    'DEFAULT_THROTTLE_RATES': {
+        'auth_ip': os.getenv('AUTH_IP_RATE', '30/min'),
+        'auth_username': os.getenv('AUTH_USERNAME_RATE', '5/min'),
+        'auth_email': os.getenv('AUTH_EMAIL_RATE', '5/min'),
+    },
+    # IP из X-Forwarded-For берется, только если задано число прокси
+    # (см. api.throttling.IPRateThrottle): без прокси клиент подставил бы
+    # в заголовок любой IP.
+    'NUM_PROXIES': (
+        int(os.getenv('NUM_PROXIES')) if os.getenv('NUM_PROXIES') else None
+    ),
+}
+
+PAGINATION = {
+    'EXACT_COUNT_THRESHOLD': int(os.getenv('EXACT_COUNT_THRESHOLD', 10000)),
+    'COUNT_TIMEOUT': int(os.getenv('COUNT_CACHE_TIMEOUT', 60)),
+}
+
+# CacheWindowStore делит счетчики между процессами только при общем кеше,
+# LocalBucketStore всегда считает запросы в каждом процессе отдельно.
+API_THROTTLE = {
+    'STORE': os.getenv('THROTTLE_STORE', 'api.throttling.CacheWindowStore'),
+    'CACHE_ALIAS': 'default',
 }
 
 SIMPLE_JWT = {
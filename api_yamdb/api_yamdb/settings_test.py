@@ -0,0 +1,29 @@
+"""Настройки для запуска тестов.
+
+Без DB_HOST тесты, которым нужна БД, выполняются на SQLite в файле:
+потоки в тестах с transaction=True получают отдельные соединения
+к одной базе. Кеш всегда локальный для процесса.
+"""
+import os
+import tempfile
+
+from api_yamdb.settings import *  # noqa: F401,F403
+
+if not os.getenv('DB_HOST'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': ':memory:',
+            'TEST': {
+                'NAME': os.path.join(
+                    tempfile.gettempdir(), f'yamdb_test_{os.getpid()}.sqlite3'
+                ),
+            },
+        }
+    }
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
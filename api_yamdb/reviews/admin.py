@@ -1,9 +1,11 @@
 from django.contrib import admin
 
-from reviews.models import Category, Comment, Genre, GenreTitle, Review, Title
+from reviews.models import (Category, Comment, DeletionJob, Genre, GenreTitle,
+                            Review, Title)
 
 admin.site.register(Category)
 admin.site.register(Comment)
+admin.site.register(DeletionJob)
 admin.site.register(Genre)
 admin.site.register(GenreTitle)
 admin.site.register(Review)
@@ -0,0 +1,577 @@
+import csv
+import gzip
+import io
+import json
+import multiprocessing
+import time
+from concurrent.futures import (ALL_COMPLETED, FIRST_COMPLETED,
+                                ProcessPoolExecutor, wait)
+from contextlib import contextmanager
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, connections, transaction
+
+from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                            Title, TitleRanking)
+from reviews.signals import bulk_loaded
+from reviews.workers import setup_worker
+from users.models import User
+
+CSV_FILES = {
+    'users.csv': User,
+    'category.csv': Category,
+    'genre.csv': Genre,
+    'titles.csv': Title,
+    'genre_title.csv': GenreTitle,
+    'review.csv': Review,
+    'comments.csv': Comment,
+}
+
+# Порядок столбцов в файлах, которые читает csvfullfillment.
+CSV_COLUMNS = {
+    'users.csv': ('id', 'username', 'email', 'role', 'bio', 'first_name',
+                  'last_name'),
+    'category.csv': ('id', 'name', 'slug'),
+    'genre.csv': ('id', 'name', 'slug'),
+    'titles.csv': ('id', 'name', 'year', 'category'),
+    'genre_title.csv': ('id', 'title_id', 'genre_id'),
+    'review.csv': ('id', 'title_id', 'text', 'author', 'score', 'pub_date'),
+    'comments.csv': ('id', 'review_id', 'text', 'author', 'pub_date'),
+}
+
+CONFLICT_ERROR = 'error'
+CONFLICT_IGNORE = 'ignore'
+CONFLICT_UPDATE = 'update'
+CONFLICT_MODES = (CONFLICT_ERROR, CONFLICT_IGNORE, CONFLICT_UPDATE)
+
+COPY_NULL = '\\N'
+
+# Связанные таблицы меньше этого размера загружаются в память целиком,
+# для остальных существование id проверяется одним запросом на пачку.
+PRELOAD_LIMIT = 1_000_000
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    batch = list(islice(iterator, size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, size))
+
+
+class IdMap:
+    """Множество существующих id связанной модели."""
+
+    def __init__(self, model):
+        self.model = model
+        self.ids = None
+        if model.objects.count() <= PRELOAD_LIMIT:
+            self.ids = set(model.objects.values_list('pk', flat=True))
+
+    def missing(self, values):
+        values = set(values)
+        if self.ids is not None:
+            return values - self.ids
+        return values - set(
+            self.model.objects.filter(pk__in=values)
+            .values_list('pk', flat=True)
+        )
+
+
+class CsvTable:
+    """Соответствие столбцов CSV-файла полям модели.
+
+    Столбцы сопоставляются полям по имени или attname, поэтому
+    `author`, `category` и `title_id` становятся id внешних ключей.
+    """
+
+    def __init__(self, file_name, model):
+        self.file_name = file_name
+        self.model = model
+
+    def __str__(self):
+        return self.file_name
+
+    @property
+    def columns(self):
+        return CSV_COLUMNS[self.file_name]
+
+    def get_fields(self, header):
+        return [self.model._meta.get_field(column) for column in header]
+
+    def get_relations(self, header):
+        """Столбцы внешних ключей и модели, на которые они ссылаются."""
+        return {
+            field.attname: field.related_model
+            for field in self.get_fields(header)
+            if field.is_relation
+        }
+
+    def to_instances(self, fields, rows):
+        return [self.to_instance(fields, row) for row in rows]
+
+    def to_instance(self, fields, row):
+        values = {}
+        for field, value in zip(fields, row):
+            if value == '' and field.null:
+                value = None
+            else:
+                value = field.to_python(value)
+            values[field.attname] = value
+        instance = self.model(**values)
+        if hasattr(instance, 'set_role_flags'):
+            instance.set_role_flags()
+        return instance
+
+
+def get_tables(only=None):
+    return [
+        CsvTable(file_name, model)
+        for file_name, model in CSV_FILES.items()
+        if not only or file_name in only
+    ]
+
+
+def get_stages(tables):
+    """Разбивает таблицы на стадии по графу внешних ключей моделей.
+
+    Таблица попадает в стадию на единицу дальше самой поздней из таблиц,
+    на которые она ссылается; таблицы одной стадии независимы.
+    """
+    models = set(CSV_FILES.values())
+    levels = {}
+
+    def get_level(model):
+        if model not in levels:
+            parents = {
+                field.related_model
+                for field in model._meta.concrete_fields
+                if field.is_relation
+                and field.related_model in models
+                and field.related_model is not model
+            }
+            levels[model] = 1 + max(map(get_level, parents), default=-1)
+        return levels[model]
+
+    stages = {}
+    for table in tables:
+        stages.setdefault(get_level(table.model), []).append(table)
+    return [stages[level] for level in sorted(stages)]
+
+
+def finish_bulk_load(models):
+    """Восстанавливает последовательности, хранимые агрегаты и рейтинги.
+
+    Нужна после записи строк в обход save(), когда сигналы не срабатывали.
+    """
+    sql_list = connection.ops.sequence_reset_sql(no_style(), models)
+    with connection.cursor() as cursor:
+        for sql in sql_list:
+            cursor.execute(sql)
+    if set(models) & {Title, Review}:
+        Title.objects.rebuild_ratings()
+    if set(models) & {Title, GenreTitle, Review}:
+        TitleRanking.objects.rebuild()
+    if set(models) & {Review, Comment}:
+        Review.objects.rebuild_comment_stats()
+    for model in models:
+        bulk_loaded.send(sender=model)
+
+
+@contextmanager
+def explicit_auto_now_add(model, instances):
+    """Сохраняет прочитанные из файла значения полей с auto_now_add.
+
+    bulk_create и pre_save заменили бы их текущим временем, поэтому на
+    время записи auto_now_add отключается; пустые значения заполняются
+    текущим временем, как при save(). Загрузка идет в отдельном процессе
+    команды, так что временное изменение поля не видно запросам API.
+    """
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now_add', False)
+    ]
+    for field in fields:
+        for instance in instances:
+            if getattr(instance, field.attname) is None:
+                field.pre_save(instance, True)
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def copy_instances(model, instances):
+    """Записывает объекты командой COPY FROM STDIN (только PostgreSQL)."""
+    fields = model._meta.concrete_fields
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for instance in instances:
+        values = (
+            field.get_db_prep_save(field.pre_save(instance, True), connection)
+            for field in fields
+        )
+        writer.writerow([
+            COPY_NULL if value is None else value for value in values
+        ])
+    buffer.seek(0)
+    quote_name = connection.ops.quote_name
+    columns = ', '.join(quote_name(field.column) for field in fields)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f'COPY {quote_name(model._meta.db_table)} ({columns}) '
+            f"FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')",
+            buffer,
+        )
+
+
+def write_instances(model, instances, conflicts=CONFLICT_ERROR,
+                    use_copy=False):
+    """Записывает пачку объектов с учетом режима конфликтов."""
+    with explicit_auto_now_add(model, instances):
+        if use_copy:
+            copy_instances(model, instances)
+            return
+        if conflicts == CONFLICT_IGNORE:
+            model.objects.bulk_create(instances, ignore_conflicts=True)
+            return
+        if conflicts == CONFLICT_UPDATE:
+            existing = set(
+                model.objects.filter(
+                    pk__in=[instance.pk for instance in instances]
+                ).values_list('pk', flat=True)
+            )
+            fields = [
+                field.name for field in model._meta.concrete_fields
+                if not field.primary_key
+            ]
+            model.objects.bulk_update(
+                [obj for obj in instances if obj.pk in existing], fields
+            )
+            instances = [obj for obj in instances if obj.pk not in existing]
+        model.objects.bulk_create(instances)
+
+
+def load_batch(file_name, header, rows, conflicts, use_copy):
+    """Загружает пачку строк в процессе пула; возвращает число строк."""
+    table = CsvTable(file_name, CSV_FILES[file_name])
+    instances = table.to_instances(table.get_fields(header), rows)
+    with transaction.atomic():
+        write_instances(table.model, instances, conflicts, use_copy)
+    return len(instances)
+
+
+class Checkpoint:
+    """Число загруженных строк по файлам для возобновления загрузки."""
+
+    def __init__(self, path):
+        self.path = Path(path) if path else None
+        self.rows = {}
+        if self.path and self.path.exists():
+            self.rows = json.loads(self.path.read_text())
+
+    def get(self, table):
+        return self.rows.get(table.file_name, 0)
+
+    def update(self, table, rows):
+        self.rows[table.file_name] = rows
+        if self.path:
+            self.path.write_text(json.dumps(self.rows))
+
+
+class CsvImporter:
+    """Потоковая пакетная загрузка CSV-файлов в БД.
+
+    Файл читается пачками по `batch_size` строк, внешние ключи
+    проверяются по `IdMap`, каждая пачка записывается `bulk_create`
+    в отдельной транзакции и отмечается в контрольной точке.
+    """
+
+    def __init__(self, data_dir, batch_size=1000, conflicts=CONFLICT_ERROR,
+                 checkpoint=None, use_copy=False, log=print):
+        self.data_dir = Path(data_dir)
+        self.batch_size = batch_size
+        self.conflicts = conflicts
+        self.use_copy = use_copy
+        self.checkpoint = Checkpoint(checkpoint)
+        self.log = log
+
+    def open(self, table):
+        return open(self.data_dir / table.file_name, encoding='utf-8',
+                    newline='')
+
+    def truncate(self, tables):
+        models = [table.model for table in tables]
+        sql_list = connection.ops.sql_flush(
+            no_style(),
+            [model._meta.db_table for model in models],
+            allow_cascade=True,
+        )
+        connection.ops.execute_sql_flush(sql_list)
+        for table in tables:
+            self.checkpoint.update(table, 0)
+
+    def write(self, model, instances):
+        write_instances(model, instances, self.conflicts, self.use_copy)
+
+    def read(self, table, skip=0):
+        """Возвращает поля заголовка и итератор строк после `skip`."""
+        file = self.open(table)
+        reader = csv.reader(file)
+        header = next(reader)
+        return file, header, islice(reader, skip, None)
+
+    def check_relations(self, fields, id_maps, rows):
+        """Отбрасывает строки со ссылками на несуществующие объекты."""
+        skipped = 0
+        for index, field in enumerate(fields):
+            id_map = id_maps.get(field.attname)
+            if id_map is None:
+                continue
+            values = {
+                row[index]: field.to_python(row[index])
+                for row in rows if row[index] != ''
+            }
+            missing = id_map.missing(values.values())
+            if missing:
+                kept = [
+                    row for row in rows
+                    if row[index] == '' or values[row[index]] not in missing
+                ]
+                skipped += len(rows) - len(kept)
+                rows = kept
+        return rows, skipped
+
+    def get_id_maps(self, table, header):
+        return {
+            attname: IdMap(model)
+            for attname, model in table.get_relations(header).items()
+        }
+
+    def load_table(self, table):
+        done = self.checkpoint.get(table)
+        file, header, rows = self.read(table, skip=done)
+        fields = table.get_fields(header)
+        id_maps = self.get_id_maps(table, header)
+        loaded = skipped = 0
+        started = time.monotonic()
+        with file:
+            for batch in batches(rows, self.batch_size):
+                kept, batch_skipped = self.check_relations(
+                    fields, id_maps, batch
+                )
+                instances = table.to_instances(fields, kept)
+                with transaction.atomic():
+                    self.write(table.model, instances)
+                done += len(batch)
+                loaded += len(instances)
+                skipped += batch_skipped
+                self.checkpoint.update(table, done)
+        self.log_rate(table, loaded, started,
+                      f', {skipped} skipped with missing relations')
+        return loaded
+
+    def log_rate(self, name, rows, started, extra=''):
+        elapsed = time.monotonic() - started
+        self.log(
+            f'{name}: {rows} rows in {elapsed:.1f}s '
+            f'({rows / (elapsed or 1):.0f} rows/s){extra}'
+        )
+
+    def load(self, tables, truncate=False):
+        if truncate:
+            self.truncate(tables)
+        started = time.monotonic()
+        total = sum(self.load_table(table) for table in tables)
+        self.finish(tables)
+        self.log_rate('Total', total, started)
+        return total
+
+    def finish(self, tables):
+        finish_bulk_load({table.model for table in tables})
+
+
+class BatchProgress:
+    """Отмечает в контрольной точке непрерывно загруженное начало файла.
+
+    Пачки завершаются в произвольном порядке, поэтому возобновление
+    возможно только с первой строки, до которой загружено все.
+    """
+
+    def __init__(self, checkpoint, table, done):
+        self.checkpoint = checkpoint
+        self.table = table
+        self.done = done
+        self.finished = {}
+
+    def complete(self, start, size):
+        self.finished[start] = size
+        while self.done in self.finished:
+            self.done += self.finished.pop(self.done)
+        self.checkpoint.update(self.table, self.done)
+
+
+class ParallelCsvImporter(CsvImporter):
+    """Загрузка CSV-файлов пулом процессов по стадиям зависимостей.
+
+    Таблицы одной стадии загружаются одновременно, а файлы разбиваются
+    на пачки между процессами, поэтому большой `review.csv` пишется
+    параллельно. У каждого процесса собственное соединение с БД.
+    """
+
+    def __init__(self, *args, workers=2, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.workers = workers
+        self.pending = {}
+
+    def collect(self, return_when):
+        finished, _ = wait(self.pending, return_when=return_when)
+        loaded = 0
+        for future in finished:
+            progress, start, size = self.pending.pop(future)
+            loaded += future.result()
+            progress.complete(start, size)
+        return loaded
+
+    def submit_table(self, pool, table):
+        """Отправляет пачки файла в пул; возвращает уже загруженные строки."""
+        done = self.checkpoint.get(table)
+        progress = BatchProgress(self.checkpoint, table, done)
+        file, header, rows = self.read(table, skip=done)
+        fields = table.get_fields(header)
+        id_maps = self.get_id_maps(table, header)
+        loaded = 0
+        with file:
+            for batch in batches(rows, self.batch_size):
+                kept, _ = self.check_relations(fields, id_maps, batch)
+                future = pool.submit(load_batch, table.file_name, header,
+                                     kept, self.conflicts, self.use_copy)
+                self.pending[future] = (progress, done, len(batch))
+                done += len(batch)
+                if len(self.pending) >= self.workers * 2:
+                    loaded += self.collect(FIRST_COMPLETED)
+        return loaded
+
+    def load_stage(self, pool, stage):
+        loaded = sum(self.submit_table(pool, table) for table in stage)
+        return loaded + self.collect(ALL_COMPLETED)
+
+    def make_pool(self):
+        connections.close_all()
+        return ProcessPoolExecutor(
+            self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=setup_worker,
+            initargs=({
+                alias: connections[alias].settings_dict['NAME']
+                for alias in connections
+            },),
+        )
+
+    def load(self, tables, truncate=False):
+        if truncate:
+            self.truncate(tables)
+        started = time.monotonic()
+        total = 0
+        with self.make_pool() as pool:
+            for number, stage in enumerate(get_stages(tables), 1):
+                stage_started = time.monotonic()
+                rows = self.load_stage(pool, stage)
+                names = ', '.join(map(str, stage))
+                self.log_rate(f'Stage {number} ({names})', rows,
+                              stage_started)
+                total += rows
+        self.finish(tables)
+        self.log_rate('Total', total, started)
+        return total
+
+
+class CsvExporter:
+    """Потоковая выгрузка таблиц в CSV или JSONL.
+
+    Строки читаются `iterator(chunk_size=...)` (на PostgreSQL это
+    серверный курсор) и сразу пишутся в файл, поэтому память
+    не зависит от размера таблицы.
+    """
+
+    CSV = 'csv'
+    JSONL = 'jsonl'
+    FORMATS = (CSV, JSONL)
+
+    def __init__(self, output_dir, format=CSV, compress=False,
+                 chunk_size=2000, log=print):
+        self.output_dir = Path(output_dir)
+        self.format = format
+        self.compress = compress
+        self.chunk_size = chunk_size
+        self.encoder = DjangoJSONEncoder(ensure_ascii=False)
+        self.log = log
+
+    def get_path(self, table):
+        path = self.output_dir / table.file_name
+        if self.format == self.JSONL:
+            path = path.with_suffix('.jsonl')
+        if self.compress:
+            path = path.with_name(path.name + '.gz')
+        return path
+
+    def open(self, path):
+        if self.compress:
+            return gzip.open(path, 'wt', encoding='utf-8', newline='')
+        return open(path, 'w', encoding='utf-8', newline='')
+
+    def to_csv_value(self, value):
+        if value is None:
+            return ''
+        if isinstance(value, (str, int, float)):
+            return value
+        return self.encoder.default(value)
+
+    def get_rows(self, table):
+        fields = table.get_fields(table.columns)
+        return (
+            table.model.objects.order_by('pk')
+            .values_list(*(field.attname for field in fields))
+            .iterator(chunk_size=self.chunk_size)
+        )
+
+    def write_csv(self, file, table):
+        writer = csv.writer(file)
+        writer.writerow(table.columns)
+        rows = 0
+        for row in self.get_rows(table):
+            writer.writerow([self.to_csv_value(value) for value in row])
+            rows += 1
+        return rows
+
+    def write_jsonl(self, file, table):
+        rows = 0
+        for row in self.get_rows(table):
+            file.write(self.encoder.encode(dict(zip(table.columns, row))))
+            file.write('\n')
+            rows += 1
+        return rows
+
+    def export_table(self, table):
+        started = time.monotonic()
+        path = self.get_path(table)
+        with self.open(path) as file:
+            if self.format == self.JSONL:
+                rows = self.write_jsonl(file, table)
+            else:
+                rows = self.write_csv(file, table)
+        elapsed = time.monotonic() - started
+        self.log(
+            f'{path.name}: {rows} rows in {elapsed:.1f}s '
+            f'({rows / (elapsed or 1):.0f} rows/s)'
+        )
+        return rows
+
+    def export(self, tables):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        return sum(self.export_table(table) for table in tables)
@@ -0,0 +1,198 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from reviews.models import (RATING_FIELDS, Comment, DeletionJob, Review, Title,
+                            TitleRanking)
+from reviews.signals import bulk_loaded
+from users.models import User
+
+MODELS = {
+    DeletionJob.USER: User,
+    DeletionJob.TITLE: Title,
+}
+KINDS = {model: kind for kind, model in MODELS.items()}
+
+
+def refresh_reviews(review_ids):
+    Review.objects.filter(pk__in=review_ids).rebuild_comment_stats()
+
+
+def refresh_titles(title_ids):
+    Title.objects.filter(pk__in=title_ids).rebuild_ratings()
+    TitleRanking.objects.refresh_scores(title_ids)
+
+
+def steps(kind, object_id):
+    """Зависимые строки в порядке удаления.
+
+    Для каждого набора строк указано поле родителя и функция пересчета
+    хранимых агрегатов затронутых родителей.
+    """
+    if kind == DeletionJob.USER:
+        return (
+            (Comment.objects.filter(author_id=object_id), 'review_id',
+             refresh_reviews),
+            (Comment.objects.filter(review__author_id=object_id),
+             'review_id', refresh_reviews),
+            (Review.objects.filter(author_id=object_id), 'title_id',
+             refresh_titles),
+        )
+    return (
+        (Comment.objects.filter(review__title_id=object_id), 'review_id',
+         refresh_reviews),
+        (Review.objects.filter(title_id=object_id), 'title_id',
+         refresh_titles),
+    )
+
+
+def count_dependents(instance):
+    """Число отзывов и комментариев, удаляемых вместе с объектом."""
+    if isinstance(instance, User):
+        return (
+            Review.objects.filter(author=instance).count()
+            + Comment.objects.filter(
+                Q(author=instance) | Q(review__author=instance)
+            ).count()
+        )
+    totals = Review.objects.filter(title=instance).order_by().aggregate(
+        reviews=Count('pk'), comments=Sum('comment_count'),
+    )
+    return totals['reviews'] + (totals['comments'] or 0)
+
+
+def schedule_deletion(instance):
+    """Удаляет объект сразу или ставит удаление в очередь.
+
+    Если зависимых строк больше DELETION_QUEUE['THRESHOLD'], возвращает
+    задачу на удаление (повторный вызов вернет ту же задачу), иначе
+    удаляет объект обычным каскадом и возвращает None. Пользователь
+    в очереди сразу теряет доступ к API, произведение пропадает из API
+    и рейтингов, отзывы и комментарии к нему больше не принимаются.
+    """
+    kind = KINDS[type(instance)]
+    total = count_dependents(instance)
+    if total <= settings.DELETION_QUEUE['THRESHOLD']:
+        instance.delete()
+        return None
+    try:
+        with transaction.atomic():
+            job = DeletionJob.objects.create(
+                kind=kind, object_id=instance.pk, total=total,
+            )
+    except IntegrityError:
+        return DeletionJob.objects.get(
+            kind=kind, object_id=instance.pk, status=DeletionJob.PENDING,
+        )
+    instance.is_active = False
+    instance.save(update_fields=('is_active',))
+    if kind == DeletionJob.USER:
+        instance.revoke_tokens()
+    return job
+
+
+def deletion_stats():
+    """Число задач на удаление по статусам."""
+    stats = {status: 0 for status, _ in DeletionJob.STATUS_CHOICES}
+    stats.update(
+        DeletionJob.objects.order_by().values_list('status')
+        .annotate(count=Count('pk'))
+    )
+    return stats
+
+
+class DeletionQueue:
+    """Выполняет отложенные удаления пачками.
+
+    Задача захватывается на DELETION_QUEUE['LEASE'] секунд сдвигом
+    next_attempt_at, каждая пачка продлевает захват. Пачка удаляется
+    одним DELETE без загрузки объектов и сигналов, хранимые агрегаты
+    затронутых отзывов и произведений пересчитываются в той же
+    транзакции. Прерванная задача продолжается с оставшихся строк.
+    """
+
+    def __init__(self, batch_size=None):
+        self.config = settings.DELETION_QUEUE
+        self.batch_size = batch_size or self.config['BATCH_SIZE']
+
+    def lease(self):
+        return timezone.now() + timedelta(seconds=self.config['LEASE'])
+
+    def claim(self):
+        with transaction.atomic():
+            job = DeletionJob.objects.filter(
+                status=DeletionJob.PENDING,
+                next_attempt_at__lte=timezone.now(),
+            ).select_for_update(skip_locked=True).first()
+            if job is not None:
+                job.next_attempt_at = self.lease()
+                job.save(update_fields=('next_attempt_at',))
+        return job
+
+    def delete_batch(self, job, queryset, field, refresh):
+        """Удаляет пачку строк, возвращает их число."""
+        rows = list(queryset.values_list('pk', field)[:self.batch_size])
+        if not rows:
+            return 0
+        ids = [pk for pk, _ in rows]
+        with transaction.atomic():
+            if queryset.model is Review:
+                # Комментарии, добавленные после шага комментариев.
+                Comment.objects.filter(review_id__in=ids)._raw_delete(
+                    Comment.objects.db
+                )
+            queryset.model.objects.filter(pk__in=ids)._raw_delete(
+                queryset.db
+            )
+            refresh({parent for _, parent in rows})
+            DeletionJob.objects.filter(pk=job.pk).update(
+                deleted=F('deleted') + len(rows),
+                next_attempt_at=self.lease(),
+            )
+        bulk_loaded.send(sender=Review)
+        bulk_loaded.send(sender=Title, fields=RATING_FIELDS)
+        return len(rows)
+
+    def run(self, job):
+        """Удаляет зависимые строки, затем сам объект."""
+        for queryset, field, refresh in steps(job.kind, job.object_id):
+            while self.delete_batch(job, queryset, field, refresh):
+                pass
+        with transaction.atomic():
+            MODELS[job.kind].objects.filter(pk=job.object_id).delete()
+            DeletionJob.objects.filter(pk=job.pk).update(
+                status=DeletionJob.DONE, finished_at=timezone.now(),
+            )
+
+    def retry(self, job, error):
+        job.attempts += 1
+        job.last_error = str(error)
+        if job.attempts >= self.config['MAX_ATTEMPTS']:
+            job.status = DeletionJob.FAILED
+        else:
+            delay = min(
+                self.config['RETRY_DELAY'] * 2 ** (job.attempts - 1),
+                self.config['MAX_RETRY_DELAY'],
+            )
+            job.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+        job.save(update_fields=(
+            'attempts', 'last_error', 'status', 'next_attempt_at',
+        ))
+
+    def drain(self):
+        """Выполняет все подошедшие задачи, возвращает (выполнено, ошибок)."""
+        done = failed = 0
+        while True:
+            job = self.claim()
+            if job is None:
+                return done, failed
+            try:
+                self.run(job)
+            except DatabaseError as error:
+                self.retry(job, error)
+                failed += 1
+            else:
+                done += 1
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from reviews.csv_data import CSV_FILES, CsvExporter, get_tables
+
+
+class Command(BaseCommand):
+    help = 'Streams the DB tables to csv files in the csvfullfillment layout'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output_dir',
+            help='Directory to write the files to',
+        )
+        parser.add_argument(
+            '--format',
+            choices=CsvExporter.FORMATS,
+            default=CsvExporter.CSV,
+            help='csv (same columns as csvfullfillment reads) or jsonl',
+        )
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='Compress the files with gzip',
+        )
+        parser.add_argument(
+            '--only',
+            nargs='+',
+            choices=CSV_FILES,
+            help='Export only these files',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Rows fetched from the DB cursor at a time',
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive')
+        exporter = CsvExporter(
+            options['output_dir'],
+            format=options['format'],
+            compress=options['gzip'],
+            chunk_size=options['chunk_size'],
+            log=self.stdout.write,
+        )
+        exporter.export(get_tables(options['only']))
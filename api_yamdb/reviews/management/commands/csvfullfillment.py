@@ -1,35 +1,93 @@
-import csv
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, connection
 
-from django.core.management.base import BaseCommand
-
-from reviews.models import Category, Comment, Genre, GenreTitle, Review, Title
-from users.models import User
-
-CSV_FILES = {
-    'users.csv': User,
-    'category.csv': Category,
-    'genre.csv': Genre,
-    'titles.csv': Title,
-    'genre_title.csv': GenreTitle,
-    'review.csv': Review,
-    'comments.csv': Comment,
-}
-
-ID_FIELDS = {
-    'category': Category,
-    'author': User,
-}
+from reviews.csv_data import (CONFLICT_ERROR, CONFLICT_MODES, CSV_FILES,
+                              CsvImporter, ParallelCsvImporter, get_tables)
 
 
 class Command(BaseCommand):
     help = 'Fullfills the DB with data from csv files'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--data-dir',
+            default=settings.BASE_DIR / 'static' / 'data',
+            help='Directory with csv files',
+        )
+        parser.add_argument(
+            '--only',
+            nargs='+',
+            choices=CSV_FILES,
+            help='Load only these files',
+        )
+        parser.add_argument(
+            '--truncate',
+            action='store_true',
+            help='Empty the tables before loading',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows per bulk insert and transaction',
+        )
+        parser.add_argument(
+            '--conflicts',
+            choices=CONFLICT_MODES,
+            default=CONFLICT_ERROR,
+            help='What to do with rows whose id already exists',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='File to record progress in and resume from',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Load independent files and batches in N processes',
+        )
+        parser.add_argument(
+            '--copy',
+            action='store_true',
+            help='Write with COPY FROM STDIN (PostgreSQL only)',
+        )
+
     def handle(self, *args, **options):
-        for file_name, model in CSV_FILES.items():
-            with open('static/data/' + file_name, encoding='utf-8') as file:
-                data = csv.DictReader(file)
-                for row in data:
-                    for key, value in row.items():
-                        if key in ID_FIELDS:
-                            row[key] = ID_FIELDS[key].objects.get(pk=value)
-                    model.objects.create(**row)
+        if options['batch_size'] < 1 or options['workers'] < 1:
+            raise CommandError('--batch-size and --workers must be positive')
+        if options['copy'] and (connection.vendor != 'postgresql'
+                                or options['conflicts'] != CONFLICT_ERROR):
+            raise CommandError(
+                '--copy needs PostgreSQL and cannot resolve conflicts'
+            )
+        kwargs = {
+            'batch_size': options['batch_size'],
+            'conflicts': options['conflicts'],
+            'checkpoint': options['checkpoint'],
+            'use_copy': options['copy'],
+            'log': self.stdout.write,
+        }
+        if options['workers'] > 1 and self.is_shared_database():
+            importer = ParallelCsvImporter(
+                options['data_dir'], workers=options['workers'], **kwargs
+            )
+        else:
+            importer = CsvImporter(options['data_dir'], **kwargs)
+        try:
+            importer.load(get_tables(options['only']),
+                          truncate=options['truncate'])
+        except IntegrityError as error:
+            raise CommandError(
+                f'{error}. Use --conflicts ignore/update or --truncate.'
+            )
+
+    def is_shared_database(self):
+        """Процессы пула не видят базу SQLite в памяти."""
+        if connection.vendor != 'sqlite':
+            return True
+        if connection.is_in_memory_db():
+            self.stderr.write('In-memory SQLite, loading in one process')
+            return False
+        return True
@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reviews.deletion import DeletionQueue, deletion_stats
+
+
+class Command(BaseCommand):
+    help = 'Deletes queued users and titles with their reviews in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Rows per DELETE, DELETION_QUEUE["BATCH_SIZE"] by default',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Seconds to wait when the queue is empty',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run all due jobs once and exit',
+        )
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Only print the number of jobs by status',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] is not None and options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        if options['stats']:
+            self.report()
+            return
+        queue = DeletionQueue(batch_size=options['batch_size'])
+        while True:
+            done, failed = queue.drain()
+            if done or failed:
+                self.stdout.write(f'Finished {done} jobs, {failed} failed')
+                self.report()
+            if options['once']:
+                return
+            time.sleep(options['interval'])
+
+    def report(self):
+        self.stdout.write(', '.join(
+            f'{status}: {count}'
+            for status, count in deletion_stats().items()
+        ))
@@ -0,0 +1,94 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from reviews.models import (HISTOGRAM_FIELDS, RATING_FIELDS, Review, Title,
+                            TitleRanking)
+from reviews.signals import bulk_loaded
+
+
+class Command(BaseCommand):
+    help = ('Rebuilds stored title ratings and score histograms, review '
+            'comment counts and leaderboards, and checks for drift')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report drifted ratings and comment counts, '
+                 'do not rebuild',
+        )
+        parser.add_argument(
+            '--leaderboards',
+            action='store_true',
+            help='Only rebuild leaderboards from stored ratings',
+        )
+        parser.add_argument(
+            '--comments',
+            action='store_true',
+            help='Only rebuild review comment counts',
+        )
+
+    def handle(self, *args, **options):
+        if options['leaderboards']:
+            rankings = TitleRanking.objects.rebuild()
+            bulk_loaded.send(sender=TitleRanking)
+            self.stdout.write(self.style.SUCCESS(
+                f'Rebuilt {rankings} leaderboard rows'
+            ))
+            return
+        if options['comments']:
+            self.rebuild_comment_stats()
+            return
+        drift_count = self.report_titles() + self.report_reviews()
+        if options['check']:
+            if drift_count:
+                raise CommandError(f'{drift_count} objects have drifted')
+            self.stdout.write(self.style.SUCCESS('No drift found'))
+            return
+        with transaction.atomic():
+            updated = Title.objects.rebuild_ratings()
+            rankings = TitleRanking.objects.rebuild()
+        bulk_loaded.send(sender=Title, fields=RATING_FIELDS)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt ratings and histograms for {updated} titles, '
+            f'{drift_count} objects had drifted'
+        ))
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {rankings} leaderboard rows'
+        ))
+        self.rebuild_comment_stats()
+
+    def report_titles(self):
+        drifted = Title.objects.drifted_ratings()
+        for title in drifted.iterator():
+            self.stdout.write(
+                f'Title {title.pk}: stored {title.review_count} reviews '
+                f'/ {title.score_sum} points, actual '
+                f'{title.actual_review_count} / {title.actual_score_sum}, '
+                f'histogram stored {self.histogram(title)} actual '
+                f'{self.histogram(title, "actual_")}'
+            )
+        return drifted.count()
+
+    @staticmethod
+    def histogram(title, prefix=''):
+        return [getattr(title, prefix + field) for field in HISTOGRAM_FIELDS]
+
+    def report_reviews(self):
+        drifted = Review.objects.drifted_comment_stats()
+        for review in drifted.iterator():
+            self.stdout.write(
+                f'Review {review.pk}: stored {review.comment_count} '
+                f'comments / last {review.last_comment_at}, actual '
+                f'{review.actual_comment_count} / '
+                f'{review.actual_last_comment_at}'
+            )
+        return drifted.count()
+
+    def rebuild_comment_stats(self):
+        with transaction.atomic():
+            updated = Review.objects.rebuild_comment_stats()
+        bulk_loaded.send(sender=Review)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt comment counts for {updated} reviews'
+        ))
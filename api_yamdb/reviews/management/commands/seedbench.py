@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from reviews.seeding import SCALES, Seeder
+
+
+class Command(BaseCommand):
+    help = 'Generates synthetic users, titles, reviews and comments'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            choices=SCALES,
+            default='small',
+            help='Preset sizes: 10k, 1M or 10M reviews',
+        )
+        for name in SCALES['small']:
+            parser.add_argument(
+                f'--{name}',
+                type=int,
+                help=f'Number of {name}, overrides the preset',
+            )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Rows per bulk insert and transaction',
+        )
+        parser.add_argument(
+            '--copy',
+            action='store_true',
+            help='Write with COPY FROM STDIN (PostgreSQL only)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed for reproducible data',
+        )
+
+    def handle(self, *args, **options):
+        sizes = {
+            name: default if options[name] is None else options[name]
+            for name, default in SCALES[options['scale']].items()
+        }
+        if min(sizes.values()) < 0 or options['batch_size'] < 1:
+            raise CommandError('Sizes must not be negative')
+        if options['copy'] and connection.vendor != 'postgresql':
+            raise CommandError('--copy needs PostgreSQL')
+        try:
+            seeder = Seeder(
+                **sizes,
+                batch_size=options['batch_size'],
+                use_copy=options['copy'],
+                seed=options['seed'],
+                log=self.stdout.write,
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        seeder.seed()
+        self.stdout.write(self.style.SUCCESS('Benchmark data generated'))
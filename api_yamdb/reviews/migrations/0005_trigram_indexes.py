@@ -0,0 +1,20 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+from api_yamdb.operations import CreateTrigramIndexes
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_feed_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        CreateTrigramIndexes((
+            ('reviews_title', 'name'),
+            ('reviews_category', 'name'),
+            ('reviews_genre', 'name'),
+        )),
+    ]
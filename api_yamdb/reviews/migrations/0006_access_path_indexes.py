@@ -0,0 +1,46 @@
+# Generated by Django 3.2 on 2026-10-18 02:59
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def delete_duplicate_genre_titles(apps, schema_editor):
+    GenreTitle = apps.get_model('reviews', 'GenreTitle')
+    duplicates = (
+        GenreTitle.objects.values('title', 'genre')
+        .annotate(first_id=Min('id'), total=Count('id'))
+        .filter(total__gt=1)
+    )
+    for duplicate in duplicates:
+        GenreTitle.objects.filter(
+            title=duplicate['title'], genre=duplicate['genre'],
+        ).exclude(id=duplicate['first_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            delete_duplicate_genre_titles, migrations.RunPython.noop
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['name'], name='title_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['category', 'name'], name='title_category_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['year', 'name'], name='title_year_name_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='genretitle',
+            constraint=models.UniqueConstraint(fields=('title', 'genre'), name='unique_title_genre'),
+        ),
+    ]
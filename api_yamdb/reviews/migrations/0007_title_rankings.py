@@ -0,0 +1,71 @@
+# Generated by Django 3.2 on 2026-10-18 03:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_rankings(apps, schema_editor):
+    """Заполняет рейтинги средней оценкой; вес задает rebuildaggregates."""
+    Title = apps.get_model('reviews', 'Title')
+    GenreTitle = apps.get_model('reviews', 'GenreTitle')
+    TitleRanking = apps.get_model('reviews', 'TitleRanking')
+    titles = {
+        title[0]: title for title in Title.objects.filter(
+            review_count__gt=0
+        ).values_list('pk', 'review_count', 'score_sum', 'category_id', 'year')
+    }
+    genres = GenreTitle.objects.filter(
+        title__review_count__gt=0, genre__isnull=False,
+    ).values_list('title_id', 'genre_id')
+    rows = []
+    for title_id, genre_id in [*((pk, None) for pk in titles), *genres]:
+        _, review_count, score_sum, category_id, year = titles[title_id]
+        rows.append(TitleRanking(
+            title_id=title_id, genre_id=genre_id, category_id=category_id,
+            year=year, review_count=review_count,
+            score=score_sum / review_count,
+        ))
+    TitleRanking.objects.bulk_create(rows, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleRanking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('review_count', models.PositiveIntegerField()),
+                ('score', models.FloatField()),
+                ('category', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='reviews.category')),
+                ('genre', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='reviews.genre')),
+                ('title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rankings', to='reviews.title')),
+            ],
+            options={
+                'verbose_name': 'Место в рейтинге',
+                'verbose_name_plural': 'Места в рейтингах',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='titleranking',
+            index=models.Index(fields=['genre', '-score', '-review_count', 'title'], name='ranking_genre_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='titleranking',
+            index=models.Index(fields=['genre', 'category', '-score', '-review_count', 'title'], name='ranking_category_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='titleranking',
+            index=models.Index(fields=['genre', 'year', '-score', '-review_count', 'title'], name='ranking_year_score_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='titleranking',
+            constraint=models.UniqueConstraint(fields=('title', 'genre'), name='unique_ranking_title_genre'),
+        ),
+        migrations.RunPython(build_rankings, migrations.RunPython.noop),
+    ]
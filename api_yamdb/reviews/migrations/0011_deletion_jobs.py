@@ -0,0 +1,43 @@
+# Generated by Django 3.2 on 2026-10-18 03:32
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0010_score_histograms'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletionJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('user', 'Пользователь'), ('title', 'Произведение')], max_length=15, verbose_name='Тип объекта')),
+                ('object_id', models.PositiveIntegerField(verbose_name='Id объекта')),
+                ('status', models.CharField(choices=[('pending', 'Ожидает удаления'), ('done', 'Удалено'), ('failed', 'Не удалено')], default='pending', max_length=15, verbose_name='Статус')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Зависимых строк при постановке')),
+                ('deleted', models.PositiveIntegerField(default=0, verbose_name='Удалено строк')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попытки')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Следующая попытка')),
+                ('last_error', models.TextField(blank=True, verbose_name='Последняя ошибка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Завершено')),
+            ],
+            options={
+                'verbose_name': 'Удаление',
+                'verbose_name_plural': 'Удаления',
+                'ordering': ('next_attempt_at', 'id'),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='deletionjob',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='deletion_job_due_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='deletionjob',
+            constraint=models.UniqueConstraint(condition=models.Q(status='pending'), fields=('kind', 'object_id'), name='unique_pending_deletion'),
+        ),
+    ]
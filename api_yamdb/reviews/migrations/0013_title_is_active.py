@@ -0,0 +1,22 @@
+# Generated by Django 3.2 on 2026-10-18 04:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0012_rating_prior'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='is_active',
+            field=models.BooleanField(default=True, editable=False, verbose_name='Доступно'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(condition=models.Q(is_active=True), fields=['id'], name='title_active_id_idx'),
+        ),
+    ]
@@ -1,5 +1,12 @@
+from itertools import islice
+
+from django.conf import settings
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import (Avg, Case, Count, Exists, F, FloatField, Max,
+                              OuterRef, Q, Subquery, Sum, Value, When)
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
 
 from reviews.validator import title_year_validator
 from users.models import User
@@ -66,11 +73,141 @@ class GenreTitle(models.Model):
         verbose_name = 'Жанр произведения'
         verbose_name_plural = 'Жанры произведений'
         ordering = ('id',)
+        constraints = (
+            models.UniqueConstraint(
+                fields=('title', 'genre'),
+                name='unique_title_genre',
+            ),
+        )
 
     def __str__(self):
         return f'{self.genre} {self.title}'
 
 
+MIN_SCORE = 1
+MAX_SCORE = 10
+SCORES = range(MIN_SCORE, MAX_SCORE + 1)
+
+
+def histogram_field(score):
+    """Имя счетчика оценки score в гистограмме произведения."""
+    if score not in SCORES:
+        raise ValueError(
+            f'Оценка {score} вне диапазона {MIN_SCORE}-{MAX_SCORE}'
+        )
+    return f'score_{score}_count'
+
+
+HISTOGRAM_FIELDS = tuple(histogram_field(score) for score in SCORES)
+RATING_FIELDS = ('rating', 'review_count', 'score_sum', *HISTOGRAM_FIELDS)
+
+
+def score_counter(score):
+    return models.PositiveIntegerField(
+        verbose_name=f'Оценок {score}',
+        default=0,
+        editable=False,
+    )
+
+
+class TitleQuerySet(models.QuerySet):
+    """Запросы к произведениям с поддержкой хранимого рейтинга."""
+
+    def active(self):
+        """Произведения, не стоящие в очереди на удаление."""
+        return self.filter(is_active=True)
+
+    def apply_review_delta(self, count, score, added=None, removed=None):
+        """Изменяет хранимые агрегаты отзывов одним UPDATE.
+
+        added и removed — оценки, которые добавляются в гистограмму
+        и убираются из нее.
+        """
+        review_count = F('review_count') + count
+        score_sum = F('score_sum') + score
+        counters = {}
+        if added != removed:
+            if added is not None:
+                field = histogram_field(added)
+                counters[field] = F(field) + 1
+            if removed is not None:
+                field = histogram_field(removed)
+                counters[field] = F(field) - 1
+        return self.update(
+            **counters,
+            review_count=review_count,
+            score_sum=score_sum,
+            rating=Case(
+                When(
+                    review_count__gt=-count,
+                    then=(Cast(score_sum, FloatField())
+                          / Cast(review_count, FloatField())),
+                ),
+                default=Value(None),
+                output_field=FloatField(),
+            ),
+        )
+
+    def with_actual_ratings(self):
+        """Добавляет агрегаты, посчитанные по таблице отзывов."""
+        return self.annotate(
+            actual_review_count=Count('reviews'),
+            actual_score_sum=Coalesce(Sum('reviews__score'), 0),
+            **{
+                f'actual_{field}': Count(
+                    'reviews', filter=Q(reviews__score=score)
+                )
+                for score, field in zip(SCORES, HISTOGRAM_FIELDS)
+            },
+        )
+
+    def drifted_ratings(self):
+        """Произведения, у которых хранимые агрегаты расходятся с отзывами."""
+        drift = (~Q(review_count=F('actual_review_count'))
+                 | ~Q(score_sum=F('actual_score_sum')))
+        for field in HISTOGRAM_FIELDS:
+            drift |= ~Q(**{field: F(f'actual_{field}')})
+        return self.with_actual_ratings().filter(drift)
+
+    def rebuild_histograms(self, batch_size=1000):
+        """Пересчитывает гистограммы оценок одним проходом по отзывам."""
+        self.update(**{field: 0 for field in HISTOGRAM_FIELDS})
+        rows = Review.objects.filter(title__in=self).order_by().values(
+            'title'
+        ).annotate(**{
+            field: Count('pk', filter=Q(score=score))
+            for score, field in zip(SCORES, HISTOGRAM_FIELDS)
+        }).iterator()
+        titles = (Title(pk=row.pop('title'), **row) for row in rows)
+        batch = list(islice(titles, batch_size))
+        while batch:
+            Title.objects.bulk_update(batch, HISTOGRAM_FIELDS)
+            batch = list(islice(titles, batch_size))
+
+    def rebuild_ratings(self):
+        """Пересчитывает хранимые агрегаты и гистограммы по отзывам."""
+        reviews = (Review.objects.filter(title=OuterRef('pk'))
+                   .order_by().values('title'))
+        review_count = Coalesce(
+            Subquery(reviews.annotate(value=Count('pk')).values('value')),
+            0,
+        )
+        score_sum = Coalesce(
+            Subquery(reviews.annotate(value=Sum('score')).values('value')),
+            0,
+        )
+        updated = self.update(
+            review_count=review_count,
+            score_sum=score_sum,
+            rating=Subquery(
+                reviews.annotate(value=Avg('score')).values('value'),
+                output_field=FloatField(),
+            ),
+        )
+        self.rebuild_histograms()
+        return updated
+
+
 class Title(models.Model):
     """Произведения."""
 
@@ -98,15 +235,131 @@ class Title(models.Model):
         Genre,
         through=GenreTitle
     )
+    is_active = models.BooleanField(
+        verbose_name='Доступно',
+        default=True,
+        editable=False,
+    )
+    rating = models.FloatField(
+        verbose_name='Рейтинг',
+        null=True,
+        blank=True,
+        editable=False,
+    )
+    review_count = models.PositiveIntegerField(
+        verbose_name='Количество отзывов',
+        default=0,
+        editable=False,
+    )
+    score_sum = models.PositiveIntegerField(
+        verbose_name='Сумма оценок',
+        default=0,
+        editable=False,
+    )
+    score_1_count = score_counter(1)
+    score_2_count = score_counter(2)
+    score_3_count = score_counter(3)
+    score_4_count = score_counter(4)
+    score_5_count = score_counter(5)
+    score_6_count = score_counter(6)
+    score_7_count = score_counter(7)
+    score_8_count = score_counter(8)
+    score_9_count = score_counter(9)
+    score_10_count = score_counter(10)
+
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
         ordering = ('name',)
+        # Индекс rating DESC NULLS LAST для ?ordering=-rating создается
+        # миграцией только на PostgreSQL.
+        indexes = (
+            models.Index(fields=('name', 'id'), name='title_name_id_idx'),
+            models.Index(fields=('category', 'name'),
+                         name='title_category_name_idx'),
+            models.Index(fields=('year', 'name'), name='title_year_name_idx'),
+            models.Index(fields=('year', 'id'), name='title_year_id_idx'),
+            models.Index(fields=('rating', 'id'), name='title_rating_id_idx'),
+            models.Index(fields=('review_count', 'id'),
+                         name='title_review_count_id_idx'),
+            # Подсчет доступных произведений для пагинации.
+            models.Index(fields=('id',), name='title_active_id_idx',
+                         condition=Q(is_active=True)),
+        )
 
     def __str__(self):
         return self.name
 
+    @property
+    def score_histogram(self):
+        """Число отзывов с каждой оценкой из хранимых счетчиков."""
+        return {
+            score: getattr(self, field)
+            for score, field in zip(SCORES, HISTOGRAM_FIELDS)
+        }
+
+
+class ReviewQuerySet(models.QuerySet):
+    """Запросы к отзывам с хранимой статистикой комментариев."""
+
+    def add_comment(self, pub_date):
+        """Учитывает новый комментарий одним UPDATE."""
+        return self.update(
+            comment_count=F('comment_count') + 1,
+            last_comment_at=Case(
+                When(last_comment_at__gt=pub_date, then=F('last_comment_at')),
+                default=Value(pub_date),
+            ),
+        )
+
+    def remove_comment(self, pub_date):
+        """Учитывает удаленный комментарий одним UPDATE.
+
+        Время последнего комментария пересчитывается, только если удален
+        самый поздний из них.
+        """
+        return self.update(
+            comment_count=F('comment_count') - 1,
+            last_comment_at=Case(
+                When(last_comment_at__gt=pub_date, then=F('last_comment_at')),
+                default=self.comment_stats()['last_comment_at'],
+            ),
+        )
+
+    def comment_stats(self):
+        comments = (Comment.objects.filter(review=OuterRef('pk'))
+                    .order_by().values('review'))
+        return {
+            'comment_count': Coalesce(
+                Subquery(comments.annotate(value=Count('pk')).values('value')),
+                0,
+            ),
+            'last_comment_at': Subquery(
+                comments.annotate(value=Max('pub_date')).values('value')
+            ),
+        }
+
+    def rebuild_comment_stats(self):
+        """Пересчитывает число и время последнего комментария."""
+        return self.update(**self.comment_stats())
+
+    def drifted_comment_stats(self):
+        """Отзывы, у которых хранимая статистика расходится с таблицей."""
+        return self.annotate(
+            actual_comment_count=Count('comments'),
+            actual_last_comment_at=Max('comments__pub_date'),
+        ).filter(
+            ~Q(comment_count=F('actual_comment_count'))
+            | Q(last_comment_at__lt=F('actual_last_comment_at'))
+            | Q(last_comment_at__gt=F('actual_last_comment_at'))
+            | Q(last_comment_at__isnull=True,
+                actual_last_comment_at__isnull=False)
+            | Q(last_comment_at__isnull=False,
+                actual_last_comment_at__isnull=True)
+        )
+
 
 class Review(models.Model):
     """Отзывы."""
@@ -129,8 +382,8 @@ class Review(models.Model):
     score = models.PositiveIntegerField(
         verbose_name='Рейтинг',
         validators=[
-            MinValueValidator(1, 'Минимальная оценка 1'),
-            MaxValueValidator(10, 'Максимальная оценка 10'),
+            MinValueValidator(MIN_SCORE, f'Минимальная оценка {MIN_SCORE}'),
+            MaxValueValidator(MAX_SCORE, f'Максимальная оценка {MAX_SCORE}'),
         ],
     )
     pub_date = models.DateTimeField(
@@ -138,21 +391,53 @@ class Review(models.Model):
         auto_now_add=True,
         db_index=True,
     )
+    comment_count = models.PositiveIntegerField(
+        verbose_name='Количество комментариев',
+        default=0,
+        editable=False,
+    )
+    last_comment_at = models.DateTimeField(
+        verbose_name='Дата последнего комментария',
+        null=True,
+        blank=True,
+        editable=False,
+    )
+
+    objects = ReviewQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Отзыв'
         verbose_name_plural = 'Отзывы'
         ordering = ['pub_date']
+        indexes = (
+            models.Index(
+                fields=('title', 'pub_date', 'id'),
+                name='review_title_pub_date_idx',
+            ),
+            models.Index(
+                fields=('title', 'comment_count', 'id'),
+                name='review_title_comments_idx',
+            ),
+        )
         constraints = (
             models.UniqueConstraint(
                 fields=['author', 'title'],
                 name='unique_author_title',
             ),
+            models.CheckConstraint(
+                check=Q(score__gte=MIN_SCORE, score__lte=MAX_SCORE),
+                name='review_score_range',
+            ),
         )
 
     def __str__(self):
         return self.text[:30]
 
+    def save(self, *args, **kwargs):
+        """Сохраняет отзыв вместе с агрегатами произведения."""
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     """Комментарии."""
@@ -182,6 +467,332 @@ class Comment(models.Model):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         ordering = ['pub_date']
+        indexes = (
+            models.Index(
+                fields=('review', 'pub_date', 'id'),
+                name='comment_review_pub_date_idx',
+            ),
+        )
 
     def __str__(self):
         return self.text[:30]
+
+
+class RatingPrior(models.Model):
+    """Средняя оценка по всем отзывам для взвешенного рейтинга.
+
+    Единственная строка таблицы общая для всех процессов, так что оценки
+    после новых отзывов и полная перестройка рейтингов считаются с одним
+    и тем же значением.
+    """
+
+    value = models.FloatField(
+        verbose_name='Средняя оценка',
+    )
+
+    class Meta:
+        verbose_name = 'Средняя оценка для рейтингов'
+        verbose_name_plural = 'Средняя оценка для рейтингов'
+
+    def __str__(self):
+        return str(self.value)
+
+
+def rating_prior(refresh=False):
+    """Средняя оценка из RatingPrior; с refresh пересчитывается заново.
+
+    Пересчитывается при полной перестройке рейтингов и при первом
+    обращении, пока строки нет.
+    """
+    if not refresh:
+        prior = RatingPrior.objects.values_list('value', flat=True).first()
+        if prior is not None:
+            return prior
+    totals = Title.objects.aggregate(
+        reviews=Coalesce(Sum('review_count'), 0),
+        points=Coalesce(Sum('score_sum'), 0),
+    )
+    prior = totals['points'] / totals['reviews'] if totals['reviews'] else 0
+    RatingPrior.objects.update_or_create(pk=1, defaults={'value': prior})
+    return prior
+
+
+def weighted_score(review_count, score_sum, prior=None):
+    """Байесовская оценка с MIN_VOTES голосами за среднюю оценку.
+
+    При MIN_VOTES = 0 совпадает со средней оценкой произведения.
+    """
+    votes = settings.LEADERBOARD['MIN_VOTES']
+    if not votes:
+        return score_sum / review_count
+    if prior is None:
+        prior = rating_prior()
+    return (score_sum + votes * prior) / (review_count + votes)
+
+
+def weighted_score_expression(review_count, score_sum):
+    """weighted_score для выражений с числом отзывов и суммой оценок."""
+    votes = settings.LEADERBOARD['MIN_VOTES']
+    prior = rating_prior() if votes else 0
+    return (
+        (Cast(score_sum, FloatField()) + Value(float(votes * prior)))
+        / (Cast(review_count, FloatField()) + Value(float(votes)))
+    )
+
+
+class TitleRankingQuerySet(models.QuerySet):
+    """Запросы к предрассчитанным рейтингам произведений."""
+
+    def top(self, genre=None, category=None, year=None):
+        """Строки рейтинга в порядке убывания оценки.
+
+        Без жанра используются общие строки (genre IS NULL), так что
+        каждый вариант фильтра читает начало одного индекса.
+        """
+        if genre is None:
+            rankings = self.filter(genre__isnull=True)
+        else:
+            rankings = self.filter(genre__slug=genre)
+        if category is not None:
+            rankings = rankings.filter(category__slug=category)
+        if year is not None:
+            rankings = rankings.filter(year=year)
+        return rankings.order_by('-score', '-review_count', 'title_id')
+
+    def build_rows(self, titles, prior=None):
+        """Строки рейтинга для кортежей (pk, отзывы, баллы, категория, год).
+
+        Для каждого произведения создается общая строка и по строке на
+        каждый его жанр.
+        """
+        titles = {title[0]: title for title in titles}
+        genres = GenreTitle.objects.filter(
+            title_id__in=titles, genre__isnull=False,
+        ).values_list('title_id', 'genre_id')
+        rows = []
+        for title_id, genre_id in [*((pk, None) for pk in titles), *genres]:
+            _, review_count, score_sum, category_id, year = titles[title_id]
+            rows.append(self.model(
+                title_id=title_id,
+                genre_id=genre_id,
+                category_id=category_id,
+                year=year,
+                review_count=review_count,
+                score=weighted_score(review_count, score_sum, prior),
+            ))
+        return rows
+
+    def ranked_titles(self):
+        return Title.objects.active().filter(review_count__gt=0).order_by(
+            'pk'
+        ).values_list('pk', 'review_count', 'score_sum', 'category_id', 'year')
+
+    def rebuild_titles(self, title_ids):
+        """Пересоздает строки рейтинга произведений.
+
+        Нужна, когда у произведения меняются жанры, категория или год.
+        Строки произведений блокируются, чтобы параллельные перестройки
+        не создали дублей.
+        """
+        with transaction.atomic():
+            titles = list(
+                self.ranked_titles().filter(pk__in=title_ids)
+                .select_for_update()
+            )
+            self.filter(title_id__in=title_ids).delete()
+            self.bulk_create(self.build_rows(titles))
+
+    def refresh_scores(self, title_ids):
+        """Обновляет оценки после изменения отзывов произведений.
+
+        Оценки существующих строк пересчитываются одним UPDATE по агрегатам
+        произведений. Строки перестраиваются, только если у произведения
+        появился первый отзыв или удален последний.
+        """
+        titles = Title.objects.filter(pk=OuterRef('title_id'))
+        review_count = Subquery(titles.values('review_count'))
+        score_sum = Subquery(titles.values('score_sum'))
+        updated = self.filter(
+            title_id__in=title_ids, title__review_count__gt=0,
+        ).update(
+            review_count=review_count,
+            score=weighted_score_expression(review_count, score_sum),
+        )
+        title_ids = set(title_ids)
+        if len(title_ids) > 1:
+            title_ids = set(
+                Title.objects.filter(pk__in=title_ids).annotate(
+                    ranked=Exists(self.model.objects.filter(
+                        title=OuterRef('pk'), genre__isnull=True,
+                    )),
+                ).filter(
+                    Q(review_count__gt=0, ranked=False)
+                    | Q(review_count=0, ranked=True)
+                ).values_list('pk', flat=True)
+            )
+        elif updated:
+            return
+        if title_ids:
+            self.rebuild_titles(title_ids)
+
+    def rebuild(self, chunk_size=2000):
+        """Пересчитывает все рейтинги, возвращает число строк."""
+        created = 0
+        with transaction.atomic():
+            prior = rating_prior(refresh=True)
+            self.all().delete()
+            last_pk = 0
+            while True:
+                titles = list(
+                    self.ranked_titles().filter(pk__gt=last_pk)[:chunk_size]
+                )
+                if not titles:
+                    return created
+                created += len(self.bulk_create(
+                    self.build_rows(titles, prior), batch_size=chunk_size,
+                ))
+                last_pk = titles[-1][0]
+
+
+class TitleRanking(models.Model):
+    """Предрассчитанное место произведения в рейтингах.
+
+    Строка с пустым жанром участвует в общем рейтинге и рейтингах по
+    категории и году, строки с жанром — в рейтингах жанра. Категория и
+    год повторяют поля произведения, чтобы рейтинг читался по индексу.
+    """
+
+    title = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name='rankings',
+    )
+    genre = models.ForeignKey(
+        Genre,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    category = models.ForeignKey(
+        Category,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name='+',
+    )
+    year = models.IntegerField()
+    review_count = models.PositiveIntegerField()
+    score = models.FloatField()
+
+    objects = TitleRankingQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Место в рейтинге'
+        verbose_name_plural = 'Места в рейтингах'
+        indexes = (
+            models.Index(
+                fields=('genre', '-score', '-review_count', 'title'),
+                name='ranking_genre_score_idx',
+            ),
+            models.Index(
+                fields=('genre', 'category', '-score', '-review_count',
+                        'title'),
+                name='ranking_category_score_idx',
+            ),
+            models.Index(
+                fields=('genre', 'year', '-score', '-review_count', 'title'),
+                name='ranking_year_score_idx',
+            ),
+        )
+        constraints = (
+            models.UniqueConstraint(
+                fields=('title', 'genre'),
+                name='unique_ranking_title_genre',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.title_id} {self.genre_id} {self.score}'
+
+
+class DeletionJob(models.Model):
+    """Отложенное удаление пользователя или произведения с зависимыми."""
+
+    USER = 'user'
+    TITLE = 'title'
+    KIND_CHOICES = (
+        (USER, 'Пользователь'),
+        (TITLE, 'Произведение'),
+    )
+    PENDING = 'pending'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Ожидает удаления'),
+        (DONE, 'Удалено'),
+        (FAILED, 'Не удалено'),
+    )
+
+    kind = models.CharField(
+        verbose_name='Тип объекта',
+        max_length=15,
+        choices=KIND_CHOICES,
+    )
+    object_id = models.PositiveIntegerField(
+        verbose_name='Id объекта',
+    )
+    status = models.CharField(
+        verbose_name='Статус',
+        max_length=15,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+    )
+    total = models.PositiveIntegerField(
+        verbose_name='Зависимых строк при постановке',
+        default=0,
+    )
+    deleted = models.PositiveIntegerField(
+        verbose_name='Удалено строк',
+        default=0,
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попытки',
+        default=0,
+    )
+    next_attempt_at = models.DateTimeField(
+        verbose_name='Следующая попытка',
+        default=timezone.now,
+    )
+    last_error = models.TextField(
+        verbose_name='Последняя ошибка',
+        blank=True,
+    )
+    created_at = models.DateTimeField(
+        verbose_name='Создано',
+        auto_now_add=True,
+    )
+    finished_at = models.DateTimeField(
+        verbose_name='Завершено',
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        verbose_name = 'Удаление'
+        verbose_name_plural = 'Удаления'
+        ordering = ('next_attempt_at', 'id')
+        indexes = (
+            models.Index(
+                fields=('status', 'next_attempt_at'),
+                name='deletion_job_due_idx',
+            ),
+        )
+        constraints = (
+            models.UniqueConstraint(
+                fields=('kind', 'object_id'),
+                condition=Q(status='pending'),
+                name='unique_pending_deletion',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id}: {self.status}'
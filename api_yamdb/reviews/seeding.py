@@ -0,0 +1,124 @@
+import random
+
+from django.db import transaction
+from django.db.models import Max
+
+from reviews.csv_data import batches, finish_bulk_load, write_instances
+from reviews.models import Category, Comment, Genre, GenreTitle, Review, Title
+from users.models import User
+
+SCALES = {
+    'small': {
+        'users': 1000, 'titles': 1000,
+        'reviews': 10_000, 'comments': 20_000,
+    },
+    'medium': {
+        'users': 20_000, 'titles': 50_000,
+        'reviews': 1_000_000, 'comments': 2_000_000,
+    },
+    'large': {
+        'users': 100_000, 'titles': 200_000,
+        'reviews': 10_000_000, 'comments': 20_000_000,
+    },
+}
+CATEGORIES = 10
+GENRES = 30
+GENRES_PER_TITLE = 2
+UNUSABLE_PASSWORD = '!'
+WORDS = (
+    'amber', 'bridge', 'cinder', 'delta', 'ember', 'falcon', 'garden',
+    'harbor', 'island', 'jungle', 'kettle', 'lantern', 'meadow', 'north',
+    'orchid', 'pepper', 'quartz', 'river', 'silver', 'thunder', 'umbra',
+    'velvet', 'winter', 'xenon', 'yellow', 'zephyr',
+)
+
+
+def next_pk(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+class Seeder:
+    """Генерирует синтетические данные для нагрузочных тестов.
+
+    Строки пишутся пачками с явными id поверх уже существующих данных,
+    поэтому генератор можно запускать повторно. Пары автор-произведение
+    у отзывов не повторяются: отзыв i пишет пользователь i // titles
+    на произведение i % titles, так что пользователей берется не меньше,
+    чем reviews / titles.
+    """
+
+    def __init__(self, users, titles, reviews, comments, batch_size=5000,
+                 use_copy=False, seed=0, log=None):
+        if titles < 1 and reviews:
+            raise ValueError('Reviews need at least one title')
+        self.titles = titles
+        self.reviews = reviews
+        self.users = max(users, -(-reviews // titles) if reviews else 0)
+        self.comments = comments if reviews else 0
+        self.batch_size = batch_size
+        self.use_copy = use_copy
+        self.random = random.Random(seed)
+        self.log = log or (lambda message: None)
+
+    def words(self, size):
+        return ' '.join(self.random.choice(WORDS) for _ in range(size))
+
+    def write(self, model, instances):
+        written = 0
+        for batch in batches(instances, self.batch_size):
+            with transaction.atomic():
+                write_instances(model, batch, use_copy=self.use_copy)
+            written += len(batch)
+        self.log(f'{model.__name__}: {written} rows')
+
+    def seed(self):
+        """Создает все строки и пересчитывает агрегаты."""
+        models = [User, Category, Genre, Title, GenreTitle, Review, Comment]
+        first = {model: next_pk(model) for model in models}
+        categories = range(first[Category], first[Category] + CATEGORIES)
+        genres = range(first[Genre], first[Genre] + GENRES)
+        users = range(first[User], first[User] + self.users)
+        titles = range(first[Title], first[Title] + self.titles)
+        self.write(Category, (
+            Category(pk=pk, name=f'Category {pk}', slug=f'bench-category-{pk}')
+            for pk in categories
+        ))
+        self.write(Genre, (
+            Genre(pk=pk, name=f'Genre {pk}', slug=f'bench-genre-{pk}')
+            for pk in genres
+        ))
+        self.write(User, (
+            User(pk=pk, username=f'bench{pk}', email=f'bench{pk}@yamdb.fake',
+                 password=UNUSABLE_PASSWORD, bio=self.words(5))
+            for pk in users
+        ))
+        self.write(Title, (
+            Title(pk=pk, name=self.words(3).title(),
+                  year=self.random.randint(1950, 2020),
+                  description=self.words(12),
+                  category_id=self.random.choice(categories))
+            for pk in titles
+        ))
+        self.write(GenreTitle, (
+            GenreTitle(pk=first[GenreTitle] + index, title_id=title_id,
+                       genre_id=genre_id)
+            for index, (title_id, genre_id) in enumerate(
+                (title_id, genre_id) for title_id in titles
+                for genre_id in self.random.sample(genres, GENRES_PER_TITLE)
+            )
+        ))
+        self.write(Review, (
+            Review(pk=first[Review] + index,
+                   title_id=first[Title] + index % self.titles,
+                   author_id=first[User] + index // self.titles,
+                   score=self.random.randint(1, 10), text=self.words(20))
+            for index in range(self.reviews)
+        ))
+        self.write(Comment, (
+            Comment(pk=first[Comment] + index,
+                    review_id=first[Review] + index % self.reviews,
+                    author_id=first[User] + index % self.users,
+                    text=self.words(10))
+            for index in range(self.comments)
+        ))
+        finish_bulk_load(models)
@@ -0,0 +1,134 @@
+from contextvars import ContextVar
+
+from django.db.models.signals import (m2m_changed, post_delete, post_init,
+                                      post_save, pre_delete)
+from django.dispatch import Signal, receiver
+
+from reviews.models import Comment, GenreTitle, Review, Title, TitleRanking
+
+# Отправляется после массовой загрузки строк модели в обход save().
+# Необязательный аргумент title_ids ограничивает затронутые произведения,
+# fields - измененные поля, если строки не добавлялись и не удалялись.
+bulk_loaded = Signal()
+
+# Отзывы, которые сейчас удаляются: их комментарии уходят каскадом,
+# и статистику комментариев таких отзывов обновлять незачем.
+deleting_reviews = ContextVar('deleting_reviews', default=frozenset())
+
+
+def remember_review_state(review):
+    """Запоминает сохраненные в БД произведение и оценку отзыва."""
+    review._saved_title_id = review.__dict__.get('title_id')
+    review._saved_score = review.__dict__.get('score')
+
+
+@receiver(post_init, sender=Review)
+def review_initialized(sender, instance, **kwargs):
+    remember_review_state(instance)
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, **kwargs):
+    """Обновляет рейтинг произведения после сохранения отзыва."""
+    titles = Title.objects.filter(pk=instance.title_id)
+    if created:
+        titles.apply_review_delta(1, instance.score, added=instance.score)
+    elif instance._saved_score is None or instance._saved_title_id is None:
+        titles.rebuild_ratings()
+    elif instance._saved_title_id != instance.title_id:
+        Title.objects.filter(pk=instance._saved_title_id).apply_review_delta(
+            -1, -instance._saved_score, removed=instance._saved_score
+        )
+        titles.apply_review_delta(1, instance.score, added=instance.score)
+    elif instance._saved_score != instance.score:
+        titles.apply_review_delta(
+            0, instance.score - instance._saved_score,
+            added=instance.score, removed=instance._saved_score,
+        )
+    else:
+        # Оценка и произведение не менялись, рейтинги пересчитывать незачем.
+        return
+    TitleRanking.objects.refresh_scores(
+        {instance.title_id, instance._saved_title_id} - {None}
+    )
+    remember_review_state(instance)
+
+
+@receiver(pre_delete, sender=Review)
+def review_deleting(sender, instance, **kwargs):
+    deleting_reviews.set(deleting_reviews.get() | {instance.pk})
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    """Обновляет рейтинг произведения после удаления отзыва.
+
+    Срабатывает и при каскадном удалении пользователя или произведения.
+    """
+    deleting_reviews.set(deleting_reviews.get() - {instance.pk})
+    title_id = instance._saved_title_id or instance.title_id
+    score = instance._saved_score or instance.score
+    Title.objects.filter(pk=title_id).apply_review_delta(
+        -1, -score, removed=score
+    )
+    TitleRanking.objects.refresh_scores((title_id,))
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    """Обновляет статистику комментариев отзыва."""
+    if created:
+        Review.objects.filter(pk=instance.review_id).add_comment(
+            instance.pub_date
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    """Обновляет статистику отзыва, в том числе при каскаде.
+
+    При удалении самого отзыва статистика не обновляется.
+    """
+    if instance.review_id in deleting_reviews.get():
+        return
+    Review.objects.filter(pk=instance.review_id).remove_comment(
+        instance.pub_date
+    )
+
+
+@receiver(post_save, sender=Title)
+def title_saved(sender, instance, created, **kwargs):
+    """Переносит категорию и год произведения в рейтинги."""
+    if not created:
+        TitleRanking.objects.rebuild_titles((instance.pk,))
+
+
+@receiver(post_save, sender=GenreTitle)
+@receiver(post_delete, sender=GenreTitle)
+def genre_title_changed(sender, instance, **kwargs):
+    if instance.title_id is not None:
+        TitleRanking.objects.rebuild_titles((instance.title_id,))
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_genres_changed(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    """Обновляет рейтинги жанров после изменения жанров произведения."""
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        TitleRanking.objects.rebuild_titles((instance.pk,))
+    elif pk_set is None:
+        TitleRanking.objects.filter(genre=instance).delete()
+    else:
+        TitleRanking.objects.rebuild_titles(pk_set)
+
+
+@receiver(bulk_loaded, sender=GenreTitle)
+def genres_bulk_loaded(sender, title_ids=None, **kwargs):
+    """Перестраивает рейтинги произведений после загрузки жанров.
+
+    Без title_ids рейтинги перестраивает finish_bulk_load.
+    """
+    if title_ids is not None:
+        TitleRanking.objects.rebuild_titles(title_ids)
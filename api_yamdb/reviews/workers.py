@@ -0,0 +1,14 @@
+import django
+from django.conf import settings
+
+
+def setup_worker(names):
+    """Настраивает Django в процессе пула на базы родительского процесса.
+
+    Имена баз передаются явно: у тестовой базы имя отличается от
+    указанного в настройках. Модуль не импортирует модели, поэтому
+    функцию можно передать в spawn-процесс до django.setup().
+    """
+    for alias, name in names.items():
+        settings.DATABASES[alias]['NAME'] = name
+    django.setup()
@@ -1,5 +1,6 @@
 from django.contrib import admin
 
-from users.models import User
+from users.models import OutboundEmail, User
 
+admin.site.register(OutboundEmail)
 admin.site.register(User)
@@ -0,0 +1,150 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from users.models import OutboundEmail
+
+
+def enqueue_email(recipient, subject, body, dedup_key=''):
+    """Ставит письмо в очередь, возвращает (письмо, создано ли новое).
+
+    Повтор с тем же dedup_key в пределах MAIL_QUEUE['DEDUP_WINDOW']
+    не создает нового письма: ожидающее отправки получает новый текст,
+    а уже отправленное не дублируется.
+    """
+    if dedup_key:
+        since = timezone.now() - timedelta(
+            seconds=settings.MAIL_QUEUE['DEDUP_WINDOW']
+        )
+        recent = OutboundEmail.objects.filter(
+            dedup_key=dedup_key, created_at__gte=since,
+        ).exclude(status=OutboundEmail.FAILED).order_by('-created_at').first()
+        if recent is not None:
+            if recent.status == OutboundEmail.PENDING:
+                OutboundEmail.objects.filter(
+                    pk=recent.pk, status=OutboundEmail.PENDING,
+                ).update(recipient=recipient, subject=subject, body=body)
+            return recent, False
+    email = OutboundEmail.objects.create(
+        recipient=recipient, subject=subject, body=body, dedup_key=dedup_key,
+    )
+    return email, True
+
+
+def queue_stats():
+    """Глубина очереди по статусам и возраст самого старого письма."""
+    stats = {status: 0 for status, _ in OutboundEmail.STATUS_CHOICES}
+    stats.update(
+        OutboundEmail.objects.order_by().values_list('status')
+        .annotate(count=Count('pk'))
+    )
+    oldest = OutboundEmail.objects.filter(
+        status=OutboundEmail.PENDING
+    ).aggregate(oldest=Min('created_at'))['oldest']
+    age = (timezone.now() - oldest).total_seconds() if oldest else 0
+    return stats, age
+
+
+class MailQueue:
+    """Отправляет письма из очереди пачками через одно соединение.
+
+    Пачка захватывается на MAIL_QUEUE['LEASE'] секунд сдвигом
+    next_attempt_at (на PostgreSQL строки выбираются с SKIP LOCKED),
+    так что несколько воркеров не отправят одно письмо дважды. Ошибка
+    отправки откладывает письмо с экспоненциальной задержкой, после
+    MAX_ATTEMPTS попыток оно помечается как неотправленное.
+    """
+
+    def __init__(self, batch_size=None, backend=None):
+        self.config = settings.MAIL_QUEUE
+        self.batch_size = batch_size or self.config['BATCH_SIZE']
+        self.backend = backend
+
+    def claim(self):
+        now = timezone.now()
+        with transaction.atomic():
+            ids = list(
+                OutboundEmail.objects.filter(
+                    status=OutboundEmail.PENDING, next_attempt_at__lte=now,
+                ).select_for_update(skip_locked=True)
+                .values_list('pk', flat=True)[:self.batch_size]
+            )
+            OutboundEmail.objects.filter(pk__in=ids).update(
+                next_attempt_at=now + timedelta(seconds=self.config['LEASE'])
+            )
+        return list(OutboundEmail.objects.filter(pk__in=ids))
+
+    def retry(self, email, error):
+        email.attempts += 1
+        email.last_error = str(error)
+        if email.attempts >= self.config['MAX_ATTEMPTS']:
+            email.status = OutboundEmail.FAILED
+        else:
+            delay = min(
+                self.config['RETRY_DELAY'] * 2 ** (email.attempts - 1),
+                self.config['MAX_RETRY_DELAY'],
+            )
+            email.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+        email.save(update_fields=(
+            'attempts', 'last_error', 'status', 'next_attempt_at',
+        ))
+
+    def release(self, emails):
+        """Возвращает неотправленные письма в очередь без новой попытки."""
+        OutboundEmail.objects.filter(
+            pk__in=[email.pk for email in emails]
+        ).update(next_attempt_at=timezone.now())
+
+    def mark_sent(self, email):
+        OutboundEmail.objects.filter(pk=email.pk).update(
+            status=OutboundEmail.SENT,
+            sent_at=timezone.now(),
+            attempts=F('attempts') + 1,
+            last_error='',
+        )
+
+    def send(self, emails):
+        """Отправляет пачку, возвращает число отправленных писем.
+
+        Каждое письмо помечается отправленным сразу после отправки, чтобы
+        сбой на следующих письмах не привел к повторной доставке. После
+        любой ошибки соединение может быть сломано, поэтому оставшиеся
+        письма пачки возвращаются в очередь до следующего прохода.
+        """
+        connection = get_connection(self.backend)
+        sent = 0
+        try:
+            connection.open()
+            for index, email in enumerate(emails):
+                message = EmailMessage(
+                    email.subject, email.body, to=(email.recipient,),
+                    connection=connection,
+                )
+                try:
+                    connection.send_messages([message])
+                except Exception as error:
+                    self.retry(email, error)
+                    self.release(emails[index + 1:])
+                    break
+                self.mark_sent(email)
+                sent += 1
+        except OSError as error:
+            for email in emails:
+                self.retry(email, error)
+        finally:
+            connection.close()
+        return sent
+
+    def drain(self):
+        """Отправляет все подошедшие письма, возвращает (отправлено, пачек)."""
+        sent = batches = 0
+        while True:
+            emails = self.claim()
+            if not emails:
+                return sent, batches
+            sent += self.send(emails)
+            batches += 1
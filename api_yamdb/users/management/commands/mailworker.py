@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.mail import MailQueue, queue_stats
+
+
+class Command(BaseCommand):
+    help = 'Sends queued emails in batches over one connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Emails per connection, MAIL_QUEUE["BATCH_SIZE"] by default',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Seconds to wait when the queue is empty',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain the queue once and exit',
+        )
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Only print the queue depth',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] is not None and options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        if options['stats']:
+            self.report()
+            return
+        queue = MailQueue(batch_size=options['batch_size'])
+        while True:
+            sent, batches = queue.drain()
+            if sent or batches:
+                self.stdout.write(f'Sent {sent} emails in {batches} batches')
+                self.report()
+            if options['once']:
+                return
+            time.sleep(options['interval'])
+
+    def report(self):
+        depth, oldest = queue_stats()
+        self.stdout.write(
+            ', '.join(f'{status}: {count}' for status, count in depth.items())
+            + f', oldest pending: {oldest:.0f}s'
+        )
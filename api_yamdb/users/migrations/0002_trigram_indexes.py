@@ -0,0 +1,18 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+from api_yamdb.operations import CreateTrigramIndexes
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        CreateTrigramIndexes((
+            ('users_user', 'username'),
+        )),
+    ]
@@ -1,11 +1,17 @@
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.db import models
+from django.utils import timezone
 
 from users.validators import username_is_not_me_validators
 
+# Поля пользователя, которые попадают в claims access-токена.
+TOKEN_CLAIMS = ('username', 'role', 'is_superuser', 'is_staff')
+
+
+class RoleMixin:
+    """Роли и проверки прав по полям role, is_superuser и is_staff."""
 
-class User(AbstractUser):
     USER = 'user'
     MODERATOR = 'moderator'
     ADMIN = 'admin'
@@ -15,6 +21,25 @@ class User(AbstractUser):
         (ADMIN, 'Администратор'),
     )
 
+    @property
+    def is_user(self):
+        return (not self.is_admin
+                and not self.is_moderator
+                and self.role == self.USER)
+
+    @property
+    def is_moderator(self):
+        return (not self.is_admin
+                and (self.is_staff
+                     or self.role == self.MODERATOR))
+
+    @property
+    def is_admin(self):
+        return (self.is_superuser
+                or self.role == self.ADMIN)
+
+
+class User(RoleMixin, AbstractUser):
     username = models.CharField(
         'username',
         max_length=150,
@@ -36,8 +61,13 @@ class User(AbstractUser):
     role = models.CharField(
         'Роль',
         max_length=15,
-        choices=ROLE_CHOICES,
-        default=USER,
+        choices=RoleMixin.ROLE_CHOICES,
+        default=RoleMixin.USER,
+    )
+    token_version = models.PositiveIntegerField(
+        'Версия токенов',
+        default=0,
+        editable=False,
     )
 
     class Meta:
@@ -51,26 +81,128 @@ class User(AbstractUser):
             ),
         )
 
-    @property
-    def is_user(self):
-        return (not self.is_admin
-                and not self.is_moderator
-                and self.role == self.USER)
-
-    @property
-    def is_moderator(self):
-        return (not self.is_admin
-                and (self.is_staff
-                     or self.role == self.MODERATOR))
-
-    @property
-    def is_admin(self):
-        return (self.is_superuser
-                or self.role == self.ADMIN)
-
-    def save(self, *args, **kwargs):
+    def set_role_flags(self):
+        """Согласует роль с флагами is_superuser и is_staff."""
         if self.is_superuser:
             self.role = self.ADMIN
         if self.is_admin or self.is_moderator:
             self.is_staff = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        user = super().from_db(db, field_names, values)
+        user.remember_claims()
+        return user
+
+    def remember_claims(self):
+        """Запоминает сохраненные в БД значения полей из claims."""
+        self._saved_claims = {
+            name: self.__dict__[name]
+            for name in TOKEN_CLAIMS if name in self.__dict__
+        }
+
+    def claims_changed(self):
+        saved = getattr(self, '_saved_claims', {})
+        return any(
+            getattr(self, name) != value for name, value in saved.items()
+        )
+
+    def revoke_tokens(self):
+        """Делает недействительными все выданные пользователю токены."""
+        self.token_version = models.F('token_version') + 1
+        self.save(update_fields=('token_version',))
+        self.refresh_from_db(fields=('token_version',))
+
+    def save(self, *args, **kwargs):
+        """Сохраняет пользователя, отзывая токены при смене claims.
+
+        Токены с устаревшими username, ролью или флагами прав перестают
+        действовать при любом сохранении модели: через API, админку
+        или shell. Обновления queryset.update() сюда не попадают.
+        """
+        self.set_role_flags()
+        revoke = not self._state.adding and self.claims_changed()
+        if revoke:
+            self.token_version = models.F('token_version') + 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'token_version'}
         super().save(*args, **kwargs)
+        if revoke:
+            self.refresh_from_db(fields=('token_version',))
+        self.remember_claims()
+
+
+class OutboundEmail(models.Model):
+    """Письмо в очереди на отправку."""
+
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Ожидает отправки'),
+        (SENT, 'Отправлено'),
+        (FAILED, 'Не отправлено'),
+    )
+
+    recipient = models.EmailField(
+        'Получатель',
+        max_length=254,
+    )
+    subject = models.CharField(
+        'Тема',
+        max_length=255,
+    )
+    body = models.TextField(
+        'Текст',
+    )
+    dedup_key = models.CharField(
+        'Ключ для склейки повторов',
+        max_length=255,
+        blank=True,
+    )
+    status = models.CharField(
+        'Статус',
+        max_length=15,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(
+        'Попытки',
+        default=0,
+    )
+    next_attempt_at = models.DateTimeField(
+        'Следующая попытка',
+        default=timezone.now,
+    )
+    last_error = models.TextField(
+        'Последняя ошибка',
+        blank=True,
+    )
+    created_at = models.DateTimeField(
+        'Создано',
+        auto_now_add=True,
+    )
+    sent_at = models.DateTimeField(
+        'Отправлено',
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+        ordering = ('next_attempt_at', 'id')
+        indexes = (
+            models.Index(
+                fields=('status', 'next_attempt_at'),
+                name='outbound_email_due_idx',
+            ),
+            models.Index(
+                fields=('dedup_key', 'created_at'),
+                name='outbound_email_dedup_idx',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.subject} -> {self.recipient}'
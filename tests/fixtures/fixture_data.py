@@ -0,0 +1,94 @@
+import pytest
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def admin(django_user_model):
+    return django_user_model.objects.create_user(
+        username='TestAdmin', email='admin@yamdb.fake', role='admin',
+    )
+
+
+@pytest.fixture
+def user(django_user_model):
+    return django_user_model.objects.create_user(
+        username='TestUser', email='user@yamdb.fake',
+    )
+
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+@pytest.fixture
+def admin_client(admin):
+    client = APIClient()
+    client.force_authenticate(admin)
+    return client
+
+
+@pytest.fixture
+def user_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def catalog(django_user_model):
+    """Фабрика каталога заданной формы.
+
+    create(titles, reviews, comments, authors, genres) создает категорию,
+    genres жанров, titles произведений со всеми жанрами, authors
+    пользователей (по умолчанию столько, сколько нужно для отзывов
+    и комментариев), reviews отзывов на первое произведение и comments
+    комментариев к первому отзыву. Возвращает первое произведение
+    и первый отзыв (None, если отзывов нет).
+    """
+    from reviews.models import Category, Comment, Genre, Review, Title
+
+    def create(titles=1, reviews=0, comments=0, authors=None, genres=2):
+        if comments and not reviews:
+            raise ValueError('Комментариям нужен отзыв')
+        if authors is None:
+            authors = max(reviews, comments)
+        category = Category.objects.create(name='Фильм', slug='movie')
+        genre_list = [
+            Genre.objects.create(name=f'Жанр {i}', slug=f'genre-{i}')
+            for i in range(genres)
+        ]
+        users = [
+            django_user_model.objects.create_user(
+                username=f'author{i}', email=f'author{i}@yamdb.fake',
+            )
+            for i in range(max(authors, reviews))
+        ]
+        title_list = []
+        for i in range(titles):
+            title = Title.objects.create(
+                name=f'Произведение {i}', year=2000, category=category,
+            )
+            title.genre.set(genre_list)
+            title_list.append(title)
+        review_list = [
+            Review.objects.create(
+                title=title_list[0], author=author, text='Отзыв', score=5,
+            )
+            for author in users[:reviews]
+        ]
+        for i in range(comments):
+            Comment.objects.create(
+                review=review_list[0], author=users[i % len(users)],
+                text='Комментарий',
+            )
+        return title_list[0], (review_list[0] if review_list else None)
+
+    return create
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    from django.core.cache import cache
+
+    cache.clear()
@@ -0,0 +1,88 @@
+import pytest
+from django.db import connection
+
+
+@pytest.fixture
+def threshold(settings):
+    settings.PAGINATION = {**settings.PAGINATION, 'EXACT_COUNT_THRESHOLD': 3}
+
+
+def add_review(title, django_user_model):
+    from reviews.models import Review
+
+    author = django_user_model.objects.create_user(
+        username='latecomer', email='latecomer@yamdb.fake',
+    )
+    Review.objects.create(title=title, author=author, text='Отзыв', score=1)
+
+
+@pytest.mark.django_db
+class TestApproximateCount:
+
+    def test_small_lists_are_exact(self, client, catalog, settings,
+                                   django_user_model):
+        title, _ = catalog(reviews=5)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        assert client.get(url).json()['count'] == 5
+        add_review(title, django_user_model)
+        data = client.get(url).json()
+        assert data['count'] == 6
+        assert 'approximate' not in data
+
+    def test_large_count_is_cached(self, client, catalog, threshold,
+                                   django_user_model):
+        title, _ = catalog(reviews=5)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        data = client.get(url).json()
+        if connection.vendor == 'sqlite':
+            assert data['count'] == 5 and 'approximate' not in data
+        add_review(title, django_user_model)
+        data = client.get(url).json()
+        assert data['approximate'] is True, (
+            'Проверьте, что count больше порога не считается заново'
+        )
+        assert list(data)[:2] == ['count', 'approximate']
+        assert len(data['results']) == 6
+
+    def test_pages_beyond_stale_count(self, client, catalog, threshold,
+                                      django_user_model):
+        title, _ = catalog(reviews=10)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        assert client.get(url).json()['next'] is None
+        add_review(title, django_user_model)
+        data = client.get(url).json()
+        assert data['count'] == 10 and data['next'] is not None, (
+            'Проверьте, что следующая страница не зависит от count'
+        )
+        last = client.get(data['next']).json()
+        assert len(last['results']) == 1 and last['next'] is None
+        assert client.get(url, {'page': 3}).status_code == 404
+
+    def test_cursor_mode_is_unchanged(self, client, catalog, threshold):
+        title, _ = catalog(reviews=5)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        client.get(url)
+        data = client.get(url, {'pagination': 'cursor'}).json()
+        assert set(data) == {'next', 'previous', 'results'}
+
+    def test_planner_estimate(self, admin_client, catalog, threshold):
+        if connection.vendor != 'postgresql':
+            pytest.skip('Оценка планировщика есть только в PostgreSQL')
+        catalog(authors=5)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE users_user')
+        data = admin_client.get('/api/v1/users/').json()
+        assert data['approximate'] is True
+
+    def test_planner_estimate_for_filtered_list(self, client, catalog,
+                                                threshold):
+        if connection.vendor != 'postgresql':
+            pytest.skip('Оценка планировщика есть только в PostgreSQL')
+        title, _ = catalog(reviews=5)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE reviews_review')
+        data = client.get(f'/api/v1/titles/{title.id}/reviews/').json()
+        assert data['approximate'] is True, (
+            'Проверьте, что для выборки с фильтром берется оценка EXPLAIN'
+        )
+        assert data['count'] > 3
@@ -0,0 +1,152 @@
+import asyncio
+import importlib
+import json
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import clear_url_caches
+
+
+@pytest.fixture
+def async_urls(settings):
+    import api.urls
+    import api_yamdb.urls
+
+    def reload(enabled):
+        settings.ASYNC_READ_VIEWS = enabled
+        importlib.reload(api.urls)
+        importlib.reload(api_yamdb.urls)
+        clear_url_caches()
+
+    reload(True)
+    yield
+    reload(False)
+
+
+def token_headers(user):
+    """AsyncClient в Django 3.2 принимает заголовки без префикса HTTP_."""
+    from api.authentication import RoleAccessToken
+
+    return {'authorization': f'Bearer {RoleAccessToken.for_user(user)}'}
+
+
+def asgi_get(path, headers=None):
+    """GET через ASGI-приложение проекта; возвращает статус и тело."""
+    from api_yamdb.handlers import StreamingASGIHandler
+
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request'}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'path': path,
+        'query_string': b'',
+        'headers': [
+            (name.encode(), value.encode())
+            for name, value in (headers or {}).items()
+        ],
+    }
+    async_to_sync(StreamingASGIHandler().__call__)(scope, receive, send)
+    body = b''.join(message.get('body', b'') for message in messages[1:])
+    return messages[0]['status'], body
+
+
+@pytest.mark.django_db(transaction=True)
+class TestAsyncViews:
+
+    def test_routes_are_async(self, async_urls):
+        from django.urls import resolve
+
+        match = resolve('/api/v1/titles/1/reviews/')
+        assert asyncio.iscoroutinefunction(match.func)
+        assert match.view_name == 'api:reviews-list'
+        assert not asyncio.iscoroutinefunction(
+            resolve('/api/v1/titles/1/').func
+        )
+
+    def test_same_response_as_sync(self, async_urls, client, catalog):
+        from api.cache import get_cache
+
+        title, review = catalog(titles=3, reviews=3, comments=3)
+        paths = (
+            '/api/v1/titles/?genre=genre-0',
+            f'/api/v1/titles/{title.pk}/reviews/',
+            f'/api/v1/titles/{title.pk}/reviews/{review.pk}/comments/'
+            '?pagination=cursor',
+        )
+        for path in paths:
+            sync_response = client.get(path)
+            get_cache().clear()
+            async_response = async_to_sync(AsyncClient().get)(path)
+            assert async_response.status_code == 200
+            assert async_response.json() == sync_response.json(), (
+                'Проверьте, что async-вью отдают то же, что и sync'
+            )
+
+    def test_concurrent_reads(self, async_urls, catalog):
+        title, _ = catalog(reviews=12)
+        client = AsyncClient()
+
+        async def fetch_all():
+            return await asyncio.gather(*(
+                client.get(f'/api/v1/titles/{title.pk}/reviews/?page={page}')
+                for page in (1, 1, 1, 1, 2, 2, 2, 2)
+            ))
+
+        responses = async_to_sync(fetch_all)()
+        assert [response.status_code for response in responses] == [200] * 8
+
+    def test_writes_and_permissions(self, async_urls, user, catalog):
+        from reviews.models import Review
+
+        title, _ = catalog()
+        other = title.__class__.objects.create(name='Другое', year=2000)
+        client = AsyncClient()
+        path = f'/api/v1/titles/{other.pk}/reviews/'
+        anonymous = async_to_sync(client.post)(
+            path, {'text': 'Отзыв', 'score': 7},
+            content_type='application/json',
+        )
+        assert anonymous.status_code == 401
+        response = async_to_sync(client.post)(
+            path, {'text': 'Отзыв', 'score': 7},
+            content_type='application/json', **token_headers(user),
+        )
+        assert response.status_code == 201
+        assert Review.objects.filter(title=other, author=user).exists()
+
+    def test_streaming_export_through_asgi(self, admin, catalog,
+                                           monkeypatch):
+        from api.views import TitleViewSet
+
+        catalog(titles=5)
+        monkeypatch.setattr(TitleViewSet, 'export_chunk_size', 2)
+        status, body = asgi_get('/api/v1/titles/export/',
+                                token_headers(admin))
+        assert status == 200, (
+            'Проверьте, что выгрузка работает через ASGI-приложение'
+        )
+        titles = [json.loads(line) for line in body.decode().splitlines()]
+        assert [title['name'] for title in titles] == [
+            f'Произведение {i}' for i in range(5)
+        ]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrency_benchmark(catalog, capsys):
+    from django.core.management import call_command
+
+    catalog(titles=3, reviews=3, comments=3)
+    call_command('benchmark', concurrency=4, requests=8)
+    output = capsys.readouterr().out
+    for row in ('titles sync', 'titles async', 'comments async'):
+        assert row in output
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+
+@pytest.mark.django_db
+class TestBenchmark:
+
+    @pytest.fixture
+    def seeded(self):
+        call_command('seedbench', users=5, titles=20, reviews=60,
+                     comments=30, batch_size=7)
+
+    def test_seed_keeps_aggregates(self, seeded):
+        from reviews.models import Review, Title
+
+        assert Review.objects.count() == 60
+        assert not Title.objects.drifted_ratings().exists(), (
+            'Проверьте, что генератор пересчитывает рейтинги'
+        )
+        call_command('seedbench', users=1, titles=1, reviews=1, comments=0)
+        assert Review.objects.count() == 61, (
+            'Проверьте, что генератор можно запускать повторно'
+        )
+
+    def test_baseline_round_trip(self, seeded, tmp_path):
+        baseline = tmp_path / 'baseline.json'
+        call_command('benchmark', requests=20, warmup=2,
+                     save_baseline=str(baseline))
+        saved = json.loads(baseline.read_text())
+        assert set(saved['scenarios']) == {
+            'catalog', 'reviews', 'comments', 'admin_search', 'auth'
+        }
+        catalog = saved['scenarios']['catalog']
+        assert catalog['requests'] == 20
+        assert catalog['errors'] == []
+        assert catalog['p50_ms'] <= catalog['p95_ms'] <= catalog['p99_ms']
+        call_command('benchmark', requests=20, warmup=2,
+                     baseline=str(baseline), threshold=1000)
+
+    def test_regression_fails(self, seeded, tmp_path):
+        baseline = tmp_path / 'baseline.json'
+        call_command('benchmark', scenarios=['catalog'], requests=20,
+                     save_baseline=str(baseline))
+        saved = json.loads(baseline.read_text())
+        saved['scenarios']['catalog']['queries_per_request'] = 0.5
+        baseline.write_text(json.dumps(saved))
+        with pytest.raises(CommandError, match='queries_per_request'):
+            call_command('benchmark', scenarios=['catalog'], requests=20,
+                         baseline=str(baseline), threshold=1000)
+
+    def test_serializer_benchmark(self, seeded):
+        from api.benchmarks import SerializerBenchmark
+
+        results = SerializerBenchmark(rounds=2).run()
+        assert set(results) == {
+            f'{name} {size}'
+            for name in ('titles', 'reviews', 'comments')
+            for size in (10, 100, 1000)
+        }
+        assert results['titles 10']['rows'] == 10
+        assert results['reviews 1000']['rows'] == 60
+        assert all(row['lean_rows_s'] > 0 for row in results.values())
+        call_command('benchmark', serializers=True, requests=1)
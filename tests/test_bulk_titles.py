@@ -0,0 +1,138 @@
+import pytest
+
+
+@pytest.fixture
+def slugs():
+    from reviews.models import Category, Genre
+
+    Category.objects.create(name='Фильм', slug='movie')
+    for slug in ('drama', 'comedy'):
+        Genre.objects.create(name=slug, slug=slug)
+
+
+def item(number, **kwargs):
+    return {
+        'name': f'Произведение {number}', 'year': 2000,
+        'category': 'movie', 'genre': ['drama', 'comedy'], **kwargs,
+    }
+
+
+@pytest.mark.django_db
+class TestBulkTitles:
+    url = '/api/v1/titles/bulk/'
+
+    def test_admin_only(self, user_client, slugs):
+        response = user_client.post(
+            self.url, {'items': [item(0)]}, format='json'
+        )
+        assert response.status_code == 403
+
+    def test_creates_titles_with_genres(self, admin_client, slugs,
+                                        django_assert_max_num_queries):
+        from reviews.models import GenreTitle, Title
+
+        items = [item(number) for number in range(20)]
+        with django_assert_max_num_queries(30):
+            response = admin_client.post(
+                self.url, {'items': items}, format='json'
+            )
+        assert response.status_code == 201
+        data = response.json()
+        assert data['errors'] == []
+        assert [entry['index'] for entry in data['created']] == list(
+            range(20)
+        )
+        assert Title.objects.count() == 20
+        assert GenreTitle.objects.count() == 40
+        title = Title.objects.get(pk=data['created'][3]['id'])
+        assert title.name == 'Произведение 3'
+        assert title.category.slug == 'movie'
+
+    def test_queries_do_not_depend_on_batch_size(self, admin_client, slugs):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        if not connection.features.can_return_rows_from_bulk_insert:
+            pytest.skip('pk после bulk_create возвращает только RETURNING')
+        counts = []
+        for size in (5, 50):
+            with CaptureQueriesContext(connection) as context:
+                admin_client.post(
+                    self.url, {'items': [item(n) for n in range(size)]},
+                    format='json',
+                )
+            counts.append(len(context))
+        assert counts[0] == counts[1]
+
+    def test_item_errors_do_not_abort_batch(self, admin_client, slugs):
+        from reviews.models import Title
+
+        items = [
+            item(0),
+            item(1, genre=['missing']),
+            item(2, category='nope'),
+            item(3, year=3000),
+            {'name': 'Без полей'},
+            item(5),
+        ]
+        response = admin_client.post(
+            self.url, {'items': items}, format='json'
+        )
+        assert response.status_code == 201
+        data = response.json()
+        assert [entry['index'] for entry in data['created']] == [0, 5]
+        errors = {entry['index']: entry['errors'] for entry in data['errors']}
+        assert set(errors) == {1, 2, 3, 4}
+        assert 'genre' in errors[1] and 'category' in errors[2]
+        assert 'year' in errors[3]
+        assert Title.objects.count() == 2
+
+    def test_strict_mode_writes_nothing(self, admin_client, slugs):
+        from reviews.models import Title
+
+        response = admin_client.post(self.url, {
+            'items': [item(0), item(1, category='nope')], 'strict': True,
+        }, format='json')
+        assert response.status_code == 400
+        assert response.json()['created'] == []
+        assert Title.objects.count() == 0
+
+    def test_batch_limit(self, admin_client, slugs):
+        response = admin_client.post(self.url, {
+            'items': [item(n) for n in range(1001)],
+        }, format='json')
+        assert response.status_code == 400
+        assert 'items' in response.json()
+
+    def test_invalidates_catalog_cache(self, admin_client, client, slugs):
+        assert client.get('/api/v1/titles/').json()['count'] == 0
+        admin_client.post(self.url, {'items': [item(0)]}, format='json')
+        assert client.get('/api/v1/titles/').json()['count'] == 1
+
+
+@pytest.mark.django_db
+class TestBulkGenres:
+    url = '/api/v1/titles/bulk-genres/'
+
+    def test_assigns_genres(self, admin_client, slugs):
+        from reviews.models import Genre, Title
+
+        first = Title.objects.create(name='Первое', year=2000)
+        second = Title.objects.create(name='Второе', year=2000)
+        first.genre.set(Genre.objects.filter(slug='drama'))
+        response = admin_client.post(self.url, {'items': [
+            {'title': first.pk, 'genre': ['drama', 'comedy']},
+            {'title': second.pk, 'genre': ['comedy']},
+            {'title': 0, 'genre': ['comedy']},
+            {'title': second.pk, 'genre': ['missing']},
+        ]}, format='json')
+        assert response.status_code == 201
+        data = response.json()
+        assert [entry['index'] for entry in data['created']] == [0, 1]
+        assert [entry['index'] for entry in data['errors']] == [2, 3]
+        assert set(first.genre.values_list('slug', flat=True)) == {
+            'drama', 'comedy',
+        }
+        assert list(second.genre.values_list('slug', flat=True)) == [
+            'comedy'
+        ]
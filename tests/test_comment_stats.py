@@ -0,0 +1,129 @@
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+@pytest.fixture
+def thread(catalog, django_user_model):
+    """Отзыв с комментариями и второй отзыв без них."""
+    from reviews.models import Review
+
+    title, review = catalog(reviews=2, comments=3)
+    quiet = Review.objects.filter(title=title).exclude(pk=review.pk).first()
+    return title, review, quiet
+
+
+def review_data(client, title, review):
+    response = client.get(f'/api/v1/titles/{title.pk}/reviews/{review.pk}/')
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.mark.django_db
+class TestCommentStats:
+
+    def test_serialized_counts(self, client, thread):
+        title, review, quiet = thread
+        data = review_data(client, title, review)
+        assert data['comment_count'] == 3
+        assert data['last_comment_at'] is not None
+        quiet_data = review_data(client, title, quiet)
+        assert quiet_data['comment_count'] == 0
+        assert quiet_data['last_comment_at'] is None
+
+    def test_create_and_delete(self, user_client, thread):
+        title, _, quiet = thread
+        url = f'/api/v1/titles/{title.pk}/reviews/{quiet.pk}/comments/'
+        first = user_client.post(url, {'text': 'Первый'}).json()
+        second = user_client.post(url, {'text': 'Второй'}).json()
+        data = review_data(user_client, title, quiet)
+        assert data['comment_count'] == 2
+        assert data['last_comment_at'] == second['pub_date']
+        user_client.delete(f'{url}{second["id"]}/')
+        data = review_data(user_client, title, quiet)
+        assert data['comment_count'] == 1
+        assert data['last_comment_at'] == first['pub_date']
+        user_client.delete(f'{url}{first["id"]}/')
+        data = review_data(user_client, title, quiet)
+        assert data['comment_count'] == 0
+        assert data['last_comment_at'] is None
+
+    def test_cascade_delete(self, thread, django_user_model):
+        _, review, _ = thread
+        django_user_model.objects.filter(
+            username__in=('author0', 'author1')
+        ).exclude(pk=review.author_id).delete()
+        review.refresh_from_db()
+        assert review.comment_count == review.comments.count()
+
+    def test_order_by_most_discussed(self, client, thread):
+        title, review, quiet = thread
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+        ids = [
+            item['id'] for item in
+            client.get(url, {'ordering': '-comment_count'}).json()['results']
+        ]
+        assert ids[0] == review.pk
+        response = client.get(url, {
+            'ordering': '-comment_count', 'pagination': 'cursor',
+        })
+        assert response.json()['results'][0]['id'] == review.pk
+        default = client.get(url, {'pagination': 'cursor'}).json()
+        assert 'next' in default
+
+    def test_cursor_pages_with_tied_counts(self, client, catalog):
+        title, review = catalog(reviews=25, comments=3)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(f'/api/v1/titles/{title.pk}/reviews/', {
+                'ordering': '-comment_count', 'pagination': 'cursor',
+            })
+        [query] = [
+            query['sql'] for query in context.captured_queries
+            if 'ORDER BY' in query['sql']
+        ]
+        assert query.endswith('"reviews_review"."id" DESC LIMIT 11'), (
+            'Проверьте, что курсор сортирует равные значения по id'
+        )
+        ids = []
+        while True:
+            data = response.json()
+            ids += [item['id'] for item in data['results']]
+            if not data['next']:
+                break
+            response = client.get(data['next'])
+        assert ids[0] == review.pk
+        assert ids[1:] == sorted(ids[1:], reverse=True)
+        assert len(ids) == len(set(ids)) == 25
+
+    def test_repair_command(self, thread):
+        from reviews.models import Review
+
+        _, review, _ = thread
+        Review.objects.update(comment_count=7, last_comment_at=None)
+        with pytest.raises(CommandError):
+            call_command('rebuildaggregates', check=True)
+        call_command('rebuildaggregates', comments=True)
+        review.refresh_from_db()
+        assert review.comment_count == 3
+        assert review.last_comment_at == review.comments.latest(
+            'pub_date'
+        ).pub_date
+        call_command('rebuildaggregates', check=True)
+
+    @pytest.mark.parametrize('size', (1, 50))
+    def test_review_delete_skips_comment_stats(
+        self, catalog, django_assert_num_queries, size
+    ):
+        _, review = catalog(reviews=1, comments=size)
+        with django_assert_num_queries(10):
+            review.delete()
+
+    def test_delete_older_comment(self, thread):
+        _, review, _ = thread
+        last_comment_at = review.comments.latest('pub_date').pub_date
+        comment = review.comments.earliest('pub_date')
+        comment.delete()
+        review.refresh_from_db()
+        assert review.comment_count == 2
+        assert review.last_comment_at == last_comment_at
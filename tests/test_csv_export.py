@@ -0,0 +1,36 @@
+import gzip
+import json
+
+import pytest
+from django.core.management import call_command
+
+
+@pytest.mark.django_db
+class TestCsvExport:
+
+    def test_round_trip(self, tmp_path):
+        from reviews.models import Comment, Review, Title
+
+        call_command('csvfullfillment')
+        call_command('csvexport', str(tmp_path))
+        header = (tmp_path / 'review.csv').read_text().splitlines()[0]
+        assert header == 'id,title_id,text,author,score,pub_date', (
+            'Проверьте, что выгрузка совпадает по столбцам с csvfullfillment'
+        )
+        call_command('csvfullfillment', data_dir=tmp_path, truncate=True)
+        assert Title.objects.count() == 32
+        assert Review.objects.count() == 72
+        assert Comment.objects.count() == 3
+        assert Review.objects.get(pk=1).pub_date.isoformat() == (
+            '2019-09-24T21:08:21.567000+00:00'
+        ), 'Проверьте, что дата отзыва берется из файла'
+        assert Comment.objects.get(pk=1).pub_date.year == 2020
+
+    def test_jsonl_gzip(self, tmp_path):
+        call_command('csvfullfillment', only=['category.csv'])
+        call_command('csvexport', str(tmp_path), format='jsonl', gzip=True,
+                     only=['category.csv'], chunk_size=1)
+        with gzip.open(tmp_path / 'category.jsonl.gz', 'rt') as file:
+            rows = [json.loads(line) for line in file]
+        assert rows[0] == {'id': 1, 'name': 'Фильм', 'slug': 'movie'}
+        assert len(rows) == 3
@@ -0,0 +1,124 @@
+import json
+from concurrent.futures import Future
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+
+
+class InlinePool:
+    """Пул, который выполняет пачки сразу в текущем процессе."""
+
+    def __init__(self):
+        self.batches = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def submit(self, function, file_name, header, rows, *args):
+        self.batches.append((file_name, len(rows)))
+        future = Future()
+        future.set_result(function(file_name, header, rows, *args))
+        return future
+
+
+def assert_loaded():
+    from reviews.models import Comment, Review, Title
+    from users.models import User
+
+    assert User.objects.count() == 5
+    assert Title.objects.count() == 32
+    assert Review.objects.count() == 72
+    assert Comment.objects.count() == 3
+    assert Review.objects.get(pk=1).pub_date.isoformat() == (
+        '2019-09-24T21:08:21.567000+00:00'
+    ), 'Проверьте, что дата публикации берется из файла'
+    assert not Title.objects.drifted_ratings().exists(), (
+        'Проверьте, что после загрузки пересчитываются рейтинги'
+    )
+    assert not Review.objects.drifted_comment_stats().exists()
+    title = Title.objects.create(name='После загрузки', year=2000)
+    assert title.pk > 32, 'Проверьте, что последовательности сброшены'
+
+
+@pytest.mark.django_db
+class TestCsvImport:
+
+    def test_full_import(self):
+        from users.models import User
+
+        call_command('csvfullfillment', batch_size=10)
+        assert_loaded()
+        assert User.objects.get(username='capt_obvious').is_staff
+
+    def test_parallel_batches(self, tmp_path, monkeypatch):
+        from reviews.csv_data import ParallelCsvImporter, get_tables
+        from reviews.models import TitleRanking
+
+        pool = InlinePool()
+        monkeypatch.setattr(ParallelCsvImporter, 'make_pool',
+                            lambda self: pool)
+        checkpoint = tmp_path / 'checkpoint.json'
+        importer = ParallelCsvImporter(
+            settings.BASE_DIR / 'static' / 'data', batch_size=10,
+            workers=2, checkpoint=str(checkpoint), log=lambda line: None,
+        )
+        importer.load(get_tables())
+        assert [
+            size for name, size in pool.batches if name == 'review.csv'
+        ] == [10] * 7 + [2], 'Проверьте, что файл делится на пачки'
+        assert json.loads(checkpoint.read_text())['review.csv'] == 72
+        assert_loaded()
+        assert TitleRanking.objects.exists()
+
+    def test_conflicts(self):
+        from reviews.models import Genre
+
+        call_command('csvfullfillment', only=['genre.csv'])
+        with pytest.raises(CommandError):
+            call_command('csvfullfillment', only=['genre.csv'])
+        Genre.objects.filter(pk=1).update(name='Изменено')
+        call_command('csvfullfillment', only=['genre.csv'],
+                     conflicts='ignore')
+        assert Genre.objects.get(pk=1).name == 'Изменено'
+        call_command('csvfullfillment', only=['genre.csv'],
+                     conflicts='update')
+        assert Genre.objects.get(pk=1).name == 'Драма'
+
+    def test_checkpoint_resumes(self, tmp_path):
+        from reviews.models import Category
+
+        checkpoint = tmp_path / 'checkpoint.json'
+        checkpoint.write_text(json.dumps({'category.csv': 2}))
+        call_command('csvfullfillment', only=['category.csv'],
+                     checkpoint=str(checkpoint))
+        assert list(Category.objects.values_list('pk', flat=True)) == [3]
+        assert json.loads(checkpoint.read_text()) == {'category.csv': 3}
+
+    def test_stages_follow_dependencies(self):
+        from reviews.csv_data import get_stages, get_tables
+
+        stages = [
+            sorted(table.file_name for table in stage)
+            for stage in get_stages(get_tables())
+        ]
+        assert stages == [
+            ['category.csv', 'genre.csv', 'users.csv'],
+            ['titles.csv'],
+            ['genre_title.csv', 'review.csv'],
+            ['comments.csv'],
+        ]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_copy_import():
+    """Загрузка COPY в нескольких процессах (только PostgreSQL)."""
+    if connection.vendor != 'postgresql':
+        pytest.skip('COPY и общая для процессов база есть в PostgreSQL')
+    call_command('csvfullfillment', batch_size=10, workers=2, copy=True)
+    assert_loaded()
@@ -0,0 +1,138 @@
+import pytest
+from django.core.management import call_command
+
+
+@pytest.fixture
+def threshold(settings):
+    settings.DELETION_QUEUE = {
+        **settings.DELETION_QUEUE, 'THRESHOLD': 3, 'BATCH_SIZE': 2,
+    }
+
+
+@pytest.fixture
+def heavy(catalog, django_user_model):
+    """Автор с отзывами на два произведения и комментариями к ним."""
+    from reviews.models import Comment, Review, Title
+
+    title, review = catalog(titles=3, reviews=3, comments=3)
+    other = Title.objects.exclude(pk=title.pk).first()
+    author = review.author
+    second = Review.objects.create(
+        title=other, author=author, text='Отзыв', score=9,
+    )
+    for text in ('Первый', 'Второй', 'Третий'):
+        Comment.objects.create(review=second, author=author, text=text)
+    return author, title, other
+
+
+def run_worker():
+    call_command('deletionworker', once=True)
+
+
+@pytest.mark.django_db
+class TestDeferredDeletion:
+
+    def test_small_graph_deleted_at_once(self, admin_client, heavy):
+        from reviews.models import DeletionJob, Title
+
+        _, _, other = heavy
+        empty = Title.objects.exclude(pk=other.pk).filter(
+            review_count=0
+        ).first()
+        response = admin_client.delete(f'/api/v1/titles/{empty.pk}/')
+        assert response.status_code == 204
+        assert not Title.objects.filter(pk=empty.pk).exists()
+        assert not DeletionJob.objects.exists()
+
+    def test_user_deleted_in_background(self, admin_client, heavy,
+                                        threshold):
+        from reviews.models import DeletionJob, Review, Title
+
+        author, title, other = heavy
+        url = f'/api/v1/users/{author.username}/'
+        response = admin_client.delete(url)
+        assert response.status_code == 202, (
+            'Проверьте, что удаление большого графа ставится в очередь'
+        )
+        job = response.json()
+        assert job['status'] == 'pending' and job['total'] > 3
+        assert admin_client.delete(url).json()['id'] == job['id']
+        author.refresh_from_db()
+        assert not author.is_active
+        run_worker()
+        progress = admin_client.get(f'/api/v1/deletions/{job["id"]}/')
+        assert progress.json()['status'] == 'done'
+        assert progress.json()['progress'] == 1.0
+        assert not Review.objects.filter(author_id=author.pk).exists()
+        assert DeletionJob.objects.get().deleted == job['total']
+        assert admin_client.get(url).status_code == 404
+        assert not Title.objects.drifted_ratings().exists(), (
+            'Проверьте, что рейтинги произведений пересчитаны'
+        )
+        assert not Review.objects.drifted_comment_stats().exists()
+        other.refresh_from_db()
+        assert other.review_count == 0
+
+    def test_title_deleted_in_background(self, admin_client, heavy,
+                                         threshold):
+        from reviews.models import Comment, Review, Title
+
+        _, title, _ = heavy
+        response = admin_client.delete(f'/api/v1/titles/{title.pk}/')
+        assert response.status_code == 202
+        run_worker()
+        assert not Title.objects.filter(pk=title.pk).exists()
+        assert not Review.objects.filter(title_id=title.pk).exists()
+        assert not Comment.objects.filter(
+            review__title_id=title.pk
+        ).exists()
+
+    def test_title_hidden_while_queued(self, admin_client, user_client,
+                                       heavy, threshold):
+        from reviews.models import Review, TitleRanking
+
+        _, title, _ = heavy
+        review = Review.objects.filter(title=title).first()
+        url = f'/api/v1/titles/{title.pk}/'
+        assert admin_client.get(url).status_code == 200
+        assert admin_client.delete(url).status_code == 202
+        assert admin_client.get(url).status_code == 404, (
+            'Проверьте, что произведение в очереди на удаление скрыто'
+        )
+        assert title.pk not in [
+            item['id'] for item in
+            admin_client.get('/api/v1/titles/').json()['results']
+        ]
+        assert admin_client.patch(url, {'name': 'Новое'}).status_code == 404
+        assert not TitleRanking.objects.filter(title=title).exists()
+        response = user_client.post(
+            f'{url}reviews/', {'text': 'Отзыв', 'score': 5},
+        )
+        assert response.status_code == 404
+        response = user_client.post(
+            f'{url}reviews/{review.pk}/comments/', {'text': 'Комментарий'},
+        )
+        assert response.status_code == 404
+        run_worker()
+        assert not Review.objects.filter(title_id=title.pk).exists()
+
+    def test_failed_job_is_retried(self, heavy, threshold, monkeypatch):
+        from django.db import DatabaseError
+
+        from reviews.deletion import DeletionQueue, schedule_deletion
+        from reviews.models import DeletionJob
+
+        _, title, _ = heavy
+        job = schedule_deletion(title)
+
+        def broken(self, job):
+            raise DatabaseError('lock timeout')
+
+        monkeypatch.setattr(DeletionQueue, 'run', broken)
+        assert DeletionQueue().drain() == (0, 1)
+        job.refresh_from_db()
+        assert job.status == DeletionJob.PENDING
+        assert job.attempts == 1 and 'lock timeout' in job.last_error
+
+    def test_progress_admin_only(self, user_client):
+        assert user_client.get('/api/v1/deletions/').status_code == 403
@@ -27,3 +27,6 @@ class TestDockerfileCompose:
         assert re.search(r'image:\s+([a-zA-Z0-9]+)\/([a-zA-Z0-9_\.])+(\:[a-zA-Z0-9_-]+)?', docker_compose), (
             'Проверьте, что добавили сборку контейнера из образа на вашем DockerHub в файл docker-compose.yaml'
         )
+        assert re.search(r'image:\s+memcached:', docker_compose), (
+            'Проверьте, что в docker-compose.yaml добавлен общий кеш memcached'
+        )
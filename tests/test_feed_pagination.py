@@ -0,0 +1,43 @@
+import pytest
+
+
+@pytest.mark.django_db
+class TestFeedPagination:
+
+    def test_page_number_response_is_unchanged(self, client, catalog):
+        title, _ = catalog(reviews=15)
+        response = client.get(f'/api/v1/titles/{title.id}/reviews/')
+        data = response.json()
+        assert set(data) == {'count', 'next', 'previous', 'results'}, (
+            'Проверьте, что без `?pagination=cursor` ответ остается '
+            'постраничным'
+        )
+        assert data['count'] == 15
+
+    def test_cursor_walks_whole_feed(self, client, catalog,
+                                     django_assert_num_queries):
+        title, _ = catalog(reviews=25)
+        url = f'/api/v1/titles/{title.id}/reviews/?pagination=cursor'
+        seen = []
+        while url:
+            with django_assert_num_queries(2):
+                data = client.get(url).json()
+            assert 'count' not in data, (
+                'Проверьте, что в курсорном режиме не выполняется COUNT(*)'
+            )
+            seen.extend(item['id'] for item in data['results'])
+            url = data['next']
+        assert seen == list(
+            title.reviews.order_by('pub_date', 'id')
+            .values_list('id', flat=True)
+        )
+
+    def test_cursor_comments(self, client, catalog):
+        title, review = catalog(reviews=1, comments=12)
+        url = (f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/'
+               f'?pagination=cursor')
+        data = client.get(url).json()
+        assert len(data['results']) == 10
+        data = client.get(data['next']).json()
+        assert len(data['results']) == 2
+        assert data['next'] is None
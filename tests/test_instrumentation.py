@@ -0,0 +1,105 @@
+import asyncio
+import json
+import logging
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def instrumented(settings):
+    from api.instrumentation import registry
+
+    settings.INSTRUMENTATION = {
+        'ENABLED': True, 'SAMPLE_RATE': 1.0, 'SERVER_TIMING': True,
+    }
+    registry.clear()
+    yield
+    registry.clear()
+
+
+@pytest.mark.django_db
+class TestInstrumentation:
+    url = '/api/v1/titles/'
+
+    def test_disabled_by_default(self, client, catalog):
+        catalog(titles=2)
+        response = client.get(self.url)
+        assert 'Server-Timing' not in response, (
+            'Проверьте, что замеры выключены без INSTRUMENTATION_ENABLED'
+        )
+
+    def test_server_timing_and_log(self, instrumented, catalog, caplog):
+        catalog(titles=2)
+        client = APIClient()
+        with caplog.at_level(logging.INFO, logger='api.instrumentation'):
+            response = client.get(self.url)
+        timing = response['Server-Timing']
+        for name in ('db;dur=', 'serialize;dur=', 'auth;dur=', 'total;dur='):
+            assert name in timing
+        line = json.loads(caplog.records[-1].getMessage())
+        assert line['view'] == 'api:titles-list'
+        assert line['status'] == 200
+        assert line['queries'] == 3
+        assert line['bytes'] == len(response.content)
+
+    def test_metrics_endpoint(self, instrumented, admin, user, catalog):
+        catalog(titles=2)
+        APIClient().get(self.url)
+        client = APIClient()
+        client.force_authenticate(user)
+        assert client.get('/api/v1/metrics/').status_code == 403
+        client.force_authenticate(admin)
+        response = client.get('/api/v1/metrics/')
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain')
+        body = response.content.decode()
+        assert '# TYPE yamdb_request_duration_seconds histogram' in body
+        assert ('yamdb_request_queries_count{view="api:titles-list"} 1'
+                in body)
+
+    def test_sampling_off(self, settings):
+        from django.core.exceptions import MiddlewareNotUsed
+
+        from api.instrumentation import PerformanceMiddleware
+
+        settings.INSTRUMENTATION = {
+            'ENABLED': True, 'SAMPLE_RATE': 0, 'SERVER_TIMING': True,
+        }
+        with pytest.raises(MiddlewareNotUsed):
+            PerformanceMiddleware(lambda request: None)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_middleware_chain(instrumented, catalog, caplog):
+    from api.instrumentation import PerformanceMiddleware
+
+    async def get_response(request):
+        return None
+
+    assert asyncio.iscoroutinefunction(PerformanceMiddleware(get_response)), (
+        'Проверьте, что middleware встраивается в асинхронную цепочку'
+    )
+    catalog(titles=2)
+    with caplog.at_level(logging.INFO, logger='api.instrumentation'):
+        response = async_to_sync(AsyncClient().get)('/api/v1/titles/')
+    assert 'db;dur=' in response['Server-Timing']
+    line = json.loads(caplog.records[-1].getMessage())
+    assert line['view'] == 'api:titles-list'
+    assert line['queries'] == 3, (
+        'Проверьте, что под ASGI учитываются запросы из потоков вью'
+    )
+
+
+def test_duplicate_queries():
+    from api.instrumentation import RequestMetrics
+
+    metrics = RequestMetrics()
+    execute = lambda sql, params, many, context: None  # noqa: E731
+    for params in ((1,), (1,), (2,)):
+        metrics(execute, 'SELECT %s', params, False, {})
+    assert metrics.queries == 3
+    assert metrics.duplicates == 1
+    assert metrics.most_repeated() == ('SELECT %s', 2)
@@ -0,0 +1,131 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+
+def token_client(user):
+    from api.authentication import RoleAccessToken
+
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {RoleAccessToken.for_user(user)}'
+    )
+    return client
+
+
+def user_queries(context):
+    return [
+        query['sql'] for query in context.captured_queries
+        if 'FROM "users_user"' in query['sql']
+    ]
+
+
+@pytest.mark.django_db
+class TestJwtClaims:
+
+    def test_token_has_claims(self, client, user):
+        from django.contrib.auth.tokens import default_token_generator
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        response = client.post('/api/v1/auth/token/', {
+            'username': user.username,
+            'confirmation_code': default_token_generator.make_token(user),
+        })
+        token = AccessToken(response.json()['token'])
+        assert token['role'] == 'user'
+        assert token['username'] == user.username
+        assert token['token_version'] == 0
+        assert token['is_staff'] is False
+
+    def test_requests_skip_user_query(self, user, catalog):
+        title, review = catalog(titles=2, reviews=1)
+        client = token_client(user)
+        reviews = f'/api/v1/titles/{title.pk}/reviews/'
+        client.get(reviews)
+        with CaptureQueriesContext(connection) as context:
+            assert client.get(reviews).status_code == 200
+        assert user_queries(context) == [], (
+            'Проверьте, что чтение с токеном не загружает пользователя'
+        )
+        client.post(f'/api/v1/titles/{title.pk + 1}/reviews/',
+                    {'text': 'Первый', 'score': 5})
+        comments = f'{reviews}{review.pk}/comments/'
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(comments, {'text': 'Ответ'})
+        assert response.status_code == 201
+        assert response.json()['author'] == user.username
+        assert user_queries(context) == [], (
+            'Проверьте, что автор записи собирается из claims токена'
+        )
+
+    def test_me_loads_full_user(self, user, django_user_model):
+        client = token_client(user)
+        response = client.get('/api/v1/users/me/')
+        assert response.json()['email'] == user.email
+        django_user_model.objects.filter(pk=user.pk).update(bio='Новое')
+        assert client.get('/api/v1/users/me/').json()['bio'] == 'Новое', (
+            'Проверьте, что полная модель пользователя не кешируется'
+        )
+
+    def test_role_change_revokes_tokens(self, admin_client, user):
+        client = token_client(user)
+        assert client.get('/api/v1/users/me/').status_code == 200
+        response = admin_client.patch(
+            f'/api/v1/users/{user.username}/', {'role': 'moderator'}
+        )
+        assert response.status_code == 200
+        assert client.get('/api/v1/users/me/').status_code == 401, (
+            'Проверьте, что смена роли отзывает выданные токены'
+        )
+        user.refresh_from_db()
+        assert token_client(user).get('/api/v1/users/me/').status_code == 200
+
+    @pytest.mark.parametrize('changes', (
+        {'is_staff': True},
+        {'is_superuser': True},
+        {'username': 'Renamed'},
+    ))
+    def test_any_claim_change_revokes_tokens(self, user, changes):
+        client = token_client(user)
+        for name, value in changes.items():
+            setattr(user, name, value)
+        user.save(update_fields=tuple(changes))
+        assert client.get('/api/v1/users/me/').status_code == 401, (
+            'Проверьте, что изменение любого поля из claims отзывает токены'
+        )
+        assert token_client(user).get('/api/v1/users/me/').status_code == 200
+
+    def test_other_fields_keep_tokens(self, django_user_model, user):
+        client = token_client(user)
+        user = django_user_model.objects.get(pk=user.pk)
+        user.bio = 'Новое'
+        user.save()
+        assert user.token_version == 0
+        assert client.get('/api/v1/users/me/').status_code == 200
+
+    def test_legacy_token(self, user):
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}'
+        )
+        assert client.get('/api/v1/users/me/').status_code == 200
+
+    def test_claims_user_is_not_equal_to_other_models(
+            self, django_user_model, catalog):
+        from reviews.models import Review, Title
+
+        _, review = catalog(titles=2, reviews=1)
+        title = Title.objects.exclude(pk=review.title_id).first()
+        user = django_user_model.objects.create_user(
+            pk=10_000, username='Namesake', email='namesake@yamdb.fake',
+        )
+        Review.objects.create(
+            pk=user.pk, title=title, author=review.author, score=1,
+        )
+        url = f'/api/v1/titles/{title.pk}/reviews/{user.pk}/'
+        assert token_client(user).delete(url).status_code == 403, (
+            'Проверьте, что пользователь из токена не равен отзыву с тем же id'
+        )
@@ -0,0 +1,186 @@
+import pytest
+from django.core.management import call_command
+
+URL = '/api/v1/titles/top/'
+
+
+@pytest.fixture
+def board(django_user_model):
+    """Произведения с отзывами: оценки задаются списком для каждого."""
+    from reviews.models import Category, Genre, Review, Title
+
+    movie = Category.objects.create(name='Фильм', slug='film')
+    book = Category.objects.create(name='Книга', slug='book')
+    drama = Genre.objects.create(name='Драма', slug='drama')
+    comedy = Genre.objects.create(name='Комедия', slug='comedy')
+    authors = [
+        django_user_model.objects.create_user(
+            username=f'critic{i}', email=f'critic{i}@yamdb.fake',
+        )
+        for i in range(5)
+    ]
+
+    def create(name, scores, category=movie, genres=(drama,), year=2000):
+        title = Title.objects.create(name=name, year=year, category=category)
+        title.genre.set(genres)
+        for author, score in zip(authors, scores):
+            Review.objects.create(
+                title=title, author=author, text='Отзыв', score=score,
+            )
+        return title
+
+    titles = {
+        'good': create('Хороший', (9, 9, 9, 9)),
+        'best': create('Лучший', (10,), genres=(comedy,)),
+        'book': create('Книга', (9, 9), category=book, year=1990),
+        'bad': create('Плохой', (2, 2, 2, 2)),
+        'empty': create('Без отзывов', ()),
+    }
+    return titles
+
+
+def names(response):
+    assert response.status_code == 200
+    return [title['name'] for title in response.json()]
+
+
+@pytest.mark.django_db
+class TestLeaderboard:
+
+    def test_filters(self, client, board):
+        assert names(client.get(URL)) == [
+            'Лучший', 'Хороший', 'Книга', 'Плохой',
+        ]
+        assert names(client.get(URL, {'genre': 'drama'})) == [
+            'Хороший', 'Книга', 'Плохой',
+        ]
+        assert names(client.get(URL, {'category': 'film'})) == [
+            'Лучший', 'Хороший', 'Плохой',
+        ]
+        assert names(client.get(URL, {'year': 1990})) == ['Книга']
+        assert names(client.get(URL, {
+            'genre': 'drama', 'category': 'film', 'year': 2000,
+        })) == ['Хороший', 'Плохой']
+        assert names(client.get(URL, {'genre': 'missing'})) == []
+        assert names(client.get(URL, {'limit': 1})) == ['Лучший']
+
+    def test_invalid_limit(self, client, board):
+        assert client.get(URL, {'limit': 0}).status_code == 400
+        assert client.get(URL, {'limit': 101}).status_code == 400
+
+    @pytest.mark.parametrize('size', (1, 5, 15))
+    def test_queries_do_not_depend_on_catalog_size(
+        self, client, board, catalog, django_assert_num_queries, size
+    ):
+        catalog(titles=size, reviews=size)
+        with django_assert_num_queries(2):
+            assert len(names(client.get(URL, {'limit': 3}))) == 3
+
+    def test_review_changes_refresh_scores(self, client, board, user):
+        from reviews.models import Review
+
+        review = Review.objects.create(
+            title=board['empty'], author=user, text='Отзыв', score=1,
+        )
+        assert names(client.get(URL))[-1] == 'Без отзывов'
+        review.score = 10
+        review.save()
+        assert names(client.get(URL))[:2] == ['Лучший', 'Без отзывов']
+        Review.objects.filter(title=board['best']).delete()
+        assert 'Лучший' not in names(client.get(URL))
+        review.delete()
+        assert names(client.get(URL)) == ['Хороший', 'Книга', 'Плохой']
+
+    def test_review_write_queries(self, board, django_assert_num_queries):
+        from reviews.models import Review
+
+        review = Review.objects.filter(title=board['good']).first()
+        review.text = 'Новый текст'
+        with django_assert_num_queries(3):
+            review.save()
+        review.score = 1
+        with django_assert_num_queries(5):
+            review.save()
+
+    def test_refreshed_scores_match_rebuild(self, board, user, settings):
+        from reviews.models import Review, TitleRanking
+
+        settings.LEADERBOARD = {**settings.LEADERBOARD, 'MIN_VOTES': 3}
+        review = Review.objects.create(
+            title=board['good'], author=user, text='Отзыв', score=3,
+        )
+        call_command('rebuildaggregates', leaderboards=True)
+        review.title = board['empty']
+        review.score = 7
+        review.save()
+        expected = {
+            (row.title_id, row.genre_id): (row.review_count, row.score)
+            for row in TitleRanking.objects.build_rows(
+                TitleRanking.objects.ranked_titles()
+            )
+        }
+        refreshed = {
+            (title_id, genre_id): (review_count, score)
+            for title_id, genre_id, review_count, score in
+            TitleRanking.objects.values_list(
+                'title_id', 'genre_id', 'review_count', 'score',
+            )
+        }
+        assert refreshed.keys() == expected.keys()
+        for key, (review_count, score) in expected.items():
+            assert refreshed[key] == (review_count, pytest.approx(score))
+
+    def test_prior_is_shared_through_db(self, board, user, settings):
+        from api.cache import get_cache
+        from reviews.models import (RatingPrior, Review, TitleRanking,
+                                    weighted_score)
+
+        settings.LEADERBOARD = {**settings.LEADERBOARD, 'MIN_VOTES': 3}
+        call_command('rebuildaggregates', leaderboards=True)
+        prior = RatingPrior.objects.get().value
+        assert prior == pytest.approx(72 / 11)
+        get_cache().clear()
+        Review.objects.create(
+            title=board['bad'], author=user, text='Отзыв', score=10,
+        )
+        row = TitleRanking.objects.get(title=board['bad'], genre=None)
+        assert row.score == pytest.approx(weighted_score(5, 18, prior)), (
+            'Проверьте, что оценки обновляются с prior из базы'
+        )
+
+    def test_title_changes_rebuild_rows(self, client, board):
+        from reviews.models import Category, Genre
+
+        good = board['good']
+        good.genre.add(Genre.objects.get(slug='comedy'))
+        assert names(client.get(URL, {'genre': 'comedy'})) == [
+            'Лучший', 'Хороший',
+        ]
+        good.refresh_from_db()
+        good.category = Category.objects.get(slug='book')
+        good.save()
+        assert names(client.get(URL, {'category': 'book'})) == [
+            'Хороший', 'Книга',
+        ]
+        good.genre.clear()
+        assert names(client.get(URL, {'genre': 'drama'})) == [
+            'Книга', 'Плохой',
+        ]
+
+    def test_weighted_rating(self, client, board, settings):
+        settings.LEADERBOARD = {**settings.LEADERBOARD, 'MIN_VOTES': 3}
+        call_command('rebuildaggregates', leaderboards=True)
+        assert names(client.get(URL)) == [
+            'Хороший', 'Книга', 'Лучший', 'Плохой',
+        ]
+
+    def test_rebuild_command(self, client, board):
+        from reviews.models import TitleRanking
+
+        rows = TitleRanking.objects.count()
+        TitleRanking.objects.all().delete()
+        call_command('rebuildaggregates')
+        assert TitleRanking.objects.count() == rows
+        assert names(client.get(URL)) == [
+            'Лучший', 'Хороший', 'Книга', 'Плохой',
+        ]
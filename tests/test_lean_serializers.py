@@ -0,0 +1,83 @@
+import pytest
+from rest_framework.renderers import JSONRenderer
+
+
+@pytest.fixture
+def mixed(catalog, django_user_model):
+    """Каталог с пустыми связями: без категории, жанров и рейтинга."""
+    from reviews.models import Comment, Genre, Review, Title
+
+    title, review = catalog(titles=12, reviews=12, comments=12)
+    bare = Title.objects.create(name='Без связей', year=1990)
+    Review.objects.create(
+        title=bare, author=review.author, text='Отзыв', score=7,
+    )
+    Title.objects.create(name='Без отзывов', year=1991).genre.set(
+        Genre.objects.all()[:1]
+    )
+    Comment.objects.create(review=review, author=review.author, text='Ещё')
+    return title, review
+
+
+def render(data):
+    return JSONRenderer().render(data)
+
+
+@pytest.mark.django_db
+class TestLeanSerializers:
+
+    @pytest.mark.parametrize('serializer_name', (
+        'TitleSerializerGET', 'ReviewSerializer', 'CommentSerializer',
+    ))
+    def test_plan_matches_serializer(self, mixed, serializer_name):
+        from api import serializers
+        from api.lean import get_plan
+
+        serializer_class = getattr(serializers, serializer_name)
+        queryset = serializer_class.Meta.model.objects.order_by('pk')
+        plan = get_plan(serializer_class())
+        assert plan is not None
+        assert render(plan.serialize(plan.values(queryset))) == render(
+            serializer_class(queryset, many=True).data
+        ), 'Проверьте, что values()-сериализация совпадает с DRF'
+
+    def test_responses_are_identical(self, client, mixed, monkeypatch):
+        from api.cache import get_cache
+        from api.lean import LeanListMixin
+
+        title, review = mixed
+        reviews = f'/api/v1/titles/{title.pk}/reviews/'
+        urls = (
+            '/api/v1/titles/',
+            '/api/v1/titles/?page=2',
+            '/api/v1/titles/?ordering=-rating',
+            '/api/v1/titles/?genre=genre-0&year=2000',
+            '/api/v1/titles/?q=Произведение',
+            '/api/v1/titles/?histogram=true',
+            reviews,
+            f'{reviews}?ordering=-comment_count',
+            f'{reviews}?pagination=cursor',
+            f'{reviews}{review.pk}/comments/',
+            f'{reviews}{review.pk}/comments/?pagination=cursor',
+        )
+
+        def responses():
+            get_cache().clear()
+            return [client.get(url) for url in urls]
+
+        lean = responses()
+        monkeypatch.setattr(LeanListMixin, 'lean_list', False)
+        for url, expected, response in zip(urls, responses(), lean):
+            assert response.status_code == expected.status_code == 200
+            assert response.content == expected.content, url
+
+    def test_unsupported_fields_fall_back(self):
+        from api.lean import get_plan
+        from api.serializers import DeletionJobSerializer
+
+        assert get_plan(DeletionJobSerializer()) is None
+
+    def test_list_queries(self, client, mixed, django_assert_num_queries):
+        with django_assert_num_queries(3):
+            response = client.get('/api/v1/titles/')
+        assert len(response.json()['results']) == 10
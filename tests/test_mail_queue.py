@@ -0,0 +1,137 @@
+import smtplib
+
+import pytest
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+
+
+class CountingBackend(EmailBackend):
+    """Считает открытые соединения и не принимает адреса на fail.
+
+    На адресах broken бэкенд падает с исключением, не связанным с сетью.
+    """
+
+    opened = 0
+
+    def open(self):
+        CountingBackend.opened += 1
+        return True
+
+    def send_messages(self, messages):
+        for message in messages:
+            if message.to[0].startswith('fail'):
+                raise smtplib.SMTPRecipientsRefused({message.to[0]: ''})
+            if message.to[0].startswith('broken'):
+                raise ValueError('Сбой бэкенда')
+        return super().send_messages(messages)
+
+
+BACKEND = f'{__name__}.CountingBackend'
+
+
+@pytest.fixture
+def queue_settings(settings):
+    settings.MAIL_QUEUE = {
+        **settings.MAIL_QUEUE, 'MAX_ATTEMPTS': 2, 'RETRY_DELAY': 0,
+    }
+    CountingBackend.opened = 0
+
+
+@pytest.mark.django_db
+class TestMailQueue:
+    url = '/api/v1/auth/signup/'
+    data = {'username': 'newbie', 'email': 'newbie@yamdb.fake'}
+
+    def test_signup_only_enqueues(self, client):
+        from users.models import OutboundEmail
+
+        assert client.post(self.url, self.data).status_code == 200
+        assert client.post(self.url, self.data).status_code == 200
+        assert mail.outbox == [], 'Проверьте, что signup не отправляет почту'
+        email = OutboundEmail.objects.get()
+        assert email.recipient == 'newbie@yamdb.fake'
+        assert email.status == OutboundEmail.PENDING
+        call_command('mailworker', once=True)
+        assert len(mail.outbox) == 1, (
+            'Проверьте, что повторная регистрация не дублирует письмо'
+        )
+        assert mail.outbox[0].body == email.body
+        email.refresh_from_db()
+        assert email.status == OutboundEmail.SENT
+        client.post(self.url, self.data)
+        assert OutboundEmail.objects.count() == 1
+
+    def test_batches_share_connection(self, queue_settings):
+        from users.mail import MailQueue, enqueue_email
+
+        for number in range(5):
+            enqueue_email(f'user{number}@yamdb.fake', 'Тема', 'Текст')
+        assert MailQueue(batch_size=2, backend=BACKEND).drain() == (5, 3)
+        assert CountingBackend.opened == 3
+        assert len(mail.outbox) == 5
+
+    def test_retry_and_give_up(self, queue_settings):
+        from users.mail import MailQueue, enqueue_email, queue_stats
+        from users.models import OutboundEmail
+
+        failing, _ = enqueue_email('fail@yamdb.fake', 'Тема', 'Текст')
+        enqueue_email('ok@yamdb.fake', 'Тема', 'Текст')
+        sent, _ = MailQueue(backend=BACKEND).drain()
+        assert sent == 1
+        failing.refresh_from_db()
+        assert failing.status == OutboundEmail.FAILED
+        assert failing.attempts == 2
+        assert 'fail@yamdb.fake' in failing.last_error
+        depth, oldest = queue_stats()
+        assert depth == {'pending': 0, 'sent': 1, 'failed': 1}
+        assert oldest == 0
+
+    def test_failure_keeps_sent_emails(self, queue_settings):
+        from users.mail import MailQueue, enqueue_email
+        from users.models import OutboundEmail
+
+        first, _ = enqueue_email('first@yamdb.fake', 'Тема', 'Текст')
+        broken, _ = enqueue_email('broken@yamdb.fake', 'Тема', 'Текст')
+        last, _ = enqueue_email('last@yamdb.fake', 'Тема', 'Текст')
+        queue = MailQueue(backend=BACKEND)
+        assert queue.send(queue.claim()) == 1
+        statuses = dict(OutboundEmail.objects.values_list('pk', 'status'))
+        assert statuses[first.pk] == OutboundEmail.SENT, (
+            'Проверьте, что отправленное письмо не уйдет повторно'
+        )
+        broken.refresh_from_db()
+        assert broken.attempts == 1 and 'Сбой бэкенда' in broken.last_error
+        assert statuses[last.pk] == OutboundEmail.PENDING
+        assert len(mail.outbox) == 1
+
+    def test_backoff(self, settings):
+        from django.utils import timezone
+
+        from users.mail import MailQueue, enqueue_email
+
+        failing, _ = enqueue_email('fail@yamdb.fake', 'Тема', 'Текст')
+        MailQueue(backend=BACKEND).drain()
+        failing.refresh_from_db()
+        delay = (failing.next_attempt_at - timezone.now()).total_seconds()
+        assert failing.attempts == 1
+        assert 0 < delay <= settings.MAIL_QUEUE['RETRY_DELAY']
+
+    def test_file_backend(self, settings, tmp_path):
+        from users.mail import enqueue_email
+
+        settings.EMAIL_BACKEND = (
+            'django.core.mail.backends.filebased.EmailBackend'
+        )
+        settings.EMAIL_FILE_PATH = tmp_path
+        enqueue_email('user@yamdb.fake', 'Код подтверждения', '12345')
+        call_command('mailworker', once=True)
+        [log] = tmp_path.iterdir()
+        assert '12345' in log.read_text()
+
+    def test_queue_metrics(self, admin_client):
+        from users.mail import enqueue_email
+
+        enqueue_email('user@yamdb.fake', 'Тема', 'Текст')
+        body = admin_client.get('/api/v1/metrics/').content.decode()
+        assert 'yamdb_mail_queue_depth{status="pending"} 1' in body
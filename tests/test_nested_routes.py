@@ -0,0 +1,91 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def two_titles(catalog):
+    from reviews.models import Title
+
+    title, review = catalog(titles=2, reviews=1, comments=1)
+    other = Title.objects.exclude(pk=title.pk).first()
+    return title, other, review
+
+
+def title_lookups(context):
+    """Загрузки произведения целиком, без запросов хранимых рейтингов."""
+    return [
+        query['sql'] for query in context.captured_queries
+        if query['sql'].startswith('SELECT "reviews_title"."id", '
+                                   '"reviews_title"."name"')
+    ]
+
+
+@pytest.mark.django_db
+class TestNestedRoutes:
+
+    def test_comment_routes_check_title(self, admin_client, two_titles):
+        title, other, review = two_titles
+        comment = review.comments.first()
+        wrong = f'/api/v1/titles/{other.pk}/reviews/{review.pk}/comments/'
+        assert admin_client.get(wrong).status_code == 404, (
+            'Проверьте, что отзыв ищется в произведении из URL'
+        )
+        assert admin_client.get(f'{wrong}{comment.pk}/').status_code == 404
+        response = admin_client.post(wrong, {'text': 'Комментарий'})
+        assert response.status_code == 404
+        right = f'/api/v1/titles/{title.pk}/reviews/{review.pk}/comments/'
+        assert admin_client.get(right).status_code == 200
+
+    def test_review_create_loads_title_once(self, user_client, two_titles):
+        _, other, _ = two_titles
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.post(
+                f'/api/v1/titles/{other.pk}/reviews/',
+                {'text': 'Отзыв', 'score': 7},
+            )
+        assert response.status_code == 201
+        assert len(title_lookups(context)) == 1, (
+            'Проверьте, что произведение загружается один раз за запрос'
+        )
+
+    def test_duplicate_review(self, user_client, two_titles):
+        _, other, _ = two_titles
+        url = f'/api/v1/titles/{other.pk}/reviews/'
+        data = {'text': 'Отзыв', 'score': 7}
+        assert user_client.post(url, data).status_code == 201
+        response = user_client.post(url, data)
+        assert response.status_code == 400
+        assert 'non_field_errors' in response.json()
+        other.refresh_from_db()
+        assert other.review_count == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_review_posts(two_titles, user):
+    """Одновременные отзывы одного автора: один 201, остальные 400."""
+    _, other, _ = two_titles
+    url = f'/api/v1/titles/{other.pk}/reviews/'
+    writers = 8
+    barrier = threading.Barrier(writers)
+
+    def post(_):
+        client = APIClient()
+        client.force_authenticate(user)
+        try:
+            barrier.wait()
+            return client.post(url, {'text': 'Отзыв', 'score': 5}).status_code
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(writers) as pool:
+        statuses = sorted(pool.map(post, range(writers)))
+    assert statuses == [201] + [400] * (writers - 1), (
+        'Проверьте, что гонка отзывов не приводит к ошибке 500'
+    )
+    other.refresh_from_db()
+    assert other.review_count == 1
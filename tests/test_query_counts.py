@@ -0,0 +1,89 @@
+import pytest
+
+PAGE_SIZES = (1, 5, 10, 15)
+
+
+@pytest.mark.django_db
+class TestQueryCounts:
+    """Число запросов к БД не зависит от количества объектов на странице."""
+
+    @pytest.mark.parametrize('size', PAGE_SIZES)
+    @pytest.mark.parametrize('url, queries', (
+        ('/api/v1/categories/', 2),
+        ('/api/v1/genres/', 2),
+        ('/api/v1/titles/', 3),
+    ))
+    def test_catalog_list(self, client, catalog, django_assert_num_queries,
+                          size, url, queries):
+        catalog(titles=size, genres=size)
+        with django_assert_num_queries(queries):
+            response = client.get(url)
+        assert response.status_code == 200, (
+            f'Проверьте, что GET-запрос к `{url}` возвращает статус 200'
+        )
+
+    @pytest.mark.parametrize('size', PAGE_SIZES)
+    def test_title_detail(self, client, catalog, django_assert_num_queries,
+                          size):
+        title, _ = catalog(reviews=size, genres=size)
+        with django_assert_num_queries(2):
+            response = client.get(f'/api/v1/titles/{title.id}/')
+        assert response.status_code == 200
+
+    @pytest.mark.parametrize('size', PAGE_SIZES)
+    def test_review_list(self, client, catalog, django_assert_num_queries,
+                         size):
+        title, _ = catalog(reviews=size)
+        with django_assert_num_queries(3):
+            response = client.get(f'/api/v1/titles/{title.id}/reviews/')
+        assert response.status_code == 200
+        assert len(response.json()['results']) == min(size, 10)
+
+    @pytest.mark.parametrize('size', PAGE_SIZES)
+    def test_review_detail(self, client, catalog, django_assert_num_queries,
+                           size):
+        title, review = catalog(reviews=size)
+        url = f'/api/v1/titles/{title.id}/reviews/{review.id}/'
+        with django_assert_num_queries(2):
+            response = client.get(url)
+        assert response.status_code == 200
+
+    @pytest.mark.parametrize('size', PAGE_SIZES)
+    def test_comment_list(self, client, catalog, django_assert_num_queries,
+                          size):
+        title, review = catalog(reviews=1, comments=size)
+        url = f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/'
+        with django_assert_num_queries(3):
+            response = client.get(url)
+        assert response.status_code == 200
+        assert len(response.json()['results']) == min(size, 10)
+
+    @pytest.mark.parametrize('size', PAGE_SIZES)
+    def test_comment_detail(self, client, catalog, django_assert_num_queries,
+                            size):
+        title, review = catalog(reviews=1, comments=size)
+        comment = review.comments.first()
+        url = (f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/'
+               f'{comment.id}/')
+        with django_assert_num_queries(2):
+            response = client.get(url)
+        assert response.status_code == 200
+
+    @pytest.mark.parametrize('size', PAGE_SIZES)
+    def test_user_list(self, admin_client, catalog,
+                       django_assert_num_queries, size):
+        catalog(authors=size)
+        with django_assert_num_queries(2):
+            response = admin_client.get('/api/v1/users/')
+        assert response.status_code == 200
+
+    def test_user_detail(self, admin_client, admin,
+                         django_assert_num_queries):
+        with django_assert_num_queries(1):
+            response = admin_client.get(f'/api/v1/users/{admin.username}/')
+        assert response.status_code == 200
+
+    def test_user_me(self, admin_client, django_assert_num_queries):
+        with django_assert_num_queries(0):
+            response = admin_client.get('/api/v1/users/me/')
+        assert response.status_code == 200
@@ -0,0 +1,104 @@
+import json
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# Таблицы меньше этого числа строк можно читать целиком.
+ROW_THRESHOLD = 20
+SEED_SIZE = 30
+
+
+def table_sizes():
+    sizes = {}
+    with connection.cursor() as cursor:
+        for table in connection.introspection.table_names(cursor):
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}'
+            )
+            sizes[table] = cursor.fetchone()[0]
+    return sizes
+
+
+def sqlite_seq_scans(cursor, sql):
+    cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+    for row in cursor.fetchall():
+        words = row[-1].split()
+        if words[0] == 'SCAN' and 'USING' not in words:
+            yield words[1]
+
+
+def postgresql_seq_scans(cursor, sql):
+    cursor.execute('SET LOCAL enable_seqscan = off')
+    cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    nodes = [plan[0]['Plan']]
+    while nodes:
+        node = nodes.pop()
+        if node['Node Type'] == 'Seq Scan':
+            yield node['Relation Name']
+        nodes.extend(node.get('Plans', ()))
+
+
+def seq_scans(sql):
+    """Таблицы, которые запрос читает последовательным сканированием."""
+    explain = {
+        'sqlite': sqlite_seq_scans,
+        'postgresql': postgresql_seq_scans,
+    }[connection.vendor]
+    with connection.cursor() as cursor:
+        return set(explain(cursor, sql))
+
+
+@pytest.mark.django_db
+class TestQueryPlans:
+    """Запросы эндпоинтов не читают большие таблицы целиком."""
+
+    @pytest.fixture
+    def urls(self, catalog):
+        title, review = catalog(
+            titles=SEED_SIZE, reviews=SEED_SIZE, comments=SEED_SIZE,
+        )
+        comment = review.comments.first()
+        reviews = f'/api/v1/titles/{title.id}/reviews/'
+        comments = f'{reviews}{review.id}/comments/'
+        return (
+            '/api/v1/titles/',
+            '/api/v1/titles/?genre=genre-0',
+            '/api/v1/titles/?category=movie',
+            '/api/v1/titles/?year=2000',
+            f'/api/v1/titles/?name={title.name}',
+            '/api/v1/titles/?ordering=rating',
+            '/api/v1/titles/?ordering=-rating',
+            '/api/v1/titles/?ordering=-year',
+            '/api/v1/titles/?ordering=-name',
+            '/api/v1/titles/?ordering=-review_count',
+            f'/api/v1/titles/{title.id}/',
+            reviews,
+            f'{reviews}?pagination=cursor',
+            f'{reviews}?ordering=-comment_count',
+            f'{reviews}{review.id}/',
+            comments,
+            f'{comments}?pagination=cursor',
+            f'{comments}{comment.id}/',
+            '/api/v1/users/',
+            f'/api/v1/users/{review.author.username}/',
+        )
+
+    def test_no_seq_scans(self, admin_client, urls):
+        sizes = table_sizes()
+        failures = []
+        for url in urls:
+            with CaptureQueriesContext(connection) as context:
+                response = admin_client.get(url)
+            assert response.status_code == 200, url
+            for query in context.captured_queries:
+                for table in seq_scans(query['sql']):
+                    if sizes.get(table, 0) > ROW_THRESHOLD:
+                        failures.append(f'{url}: {table}: {query["sql"]}')
+        assert not failures, (
+            'Проверьте индексы: запросы читают большие таблицы целиком\n'
+            + '\n'.join(failures)
+        )
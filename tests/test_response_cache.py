@@ -0,0 +1,88 @@
+import pytest
+
+
+@pytest.mark.django_db
+class TestResponseCache:
+
+    @pytest.mark.parametrize('url', (
+        '/api/v1/categories/', '/api/v1/genres/', '/api/v1/titles/',
+    ))
+    def test_repeated_get_skips_db(self, client, catalog,
+                                   django_assert_num_queries, url):
+        catalog(titles=3)
+        first = client.get(url)
+        with django_assert_num_queries(0):
+            second = client.get(url)
+        assert second.json() == first.json(), (
+            f'Проверьте, что закешированный ответ `{url}` совпадает с исходным'
+        )
+        assert second['ETag'] == first['ETag']
+
+    def test_etag_not_modified(self, client, catalog,
+                               django_assert_num_queries):
+        catalog(titles=3)
+        etag = client.get('/api/v1/titles/')['ETag']
+        with django_assert_num_queries(0):
+            response = client.get('/api/v1/titles/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+
+    @pytest.mark.parametrize('header, status', (
+        ('{etag}', 304),
+        ('W/{etag}', 304),
+        ('"other", {etag}', 304),
+        ('*', 304),
+        ('"other"', 200),
+        ('"{key}x"', 200),
+        ('"x{key}"', 200),
+        ('"other{etag}"', 200),
+    ))
+    def test_if_none_match_parsing(self, client, catalog, header, status):
+        catalog(titles=1)
+        etag = client.get('/api/v1/titles/')['ETag']
+        header = header.format(etag=etag, key=etag.strip('"'))
+        response = client.get('/api/v1/titles/', HTTP_IF_NONE_MATCH=header)
+        assert response.status_code == status, (
+            'Проверьте, что If-None-Match сравнивается по entity-tag целиком'
+        )
+
+    def test_query_params_are_part_of_key(self, client, catalog):
+        catalog(titles=3)
+        assert client.get('/api/v1/titles/?year=2000').json()['count'] == 3
+        assert client.get('/api/v1/titles/?year=1999').json()['count'] == 0
+
+    def test_write_invalidates(self, client, admin_client, catalog):
+        title, _ = catalog(titles=3)
+        etag = client.get('/api/v1/titles/')['ETag']
+        admin_client.patch(f'/api/v1/titles/{title.id}/', {'name': 'Новое'})
+        response = client.get('/api/v1/titles/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        names = [item['name'] for item in response.json()['results']]
+        assert 'Новое' in names
+
+    def test_review_invalidates_rating(self, client, catalog, user):
+        from reviews.models import Review
+
+        title, _ = catalog(reviews=1)
+        url = f'/api/v1/titles/{title.id}/'
+        assert client.get(url).json()['rating'] == 5
+        Review.objects.create(title=title, author=user, text='.', score=1)
+        assert client.get(url).json()['rating'] == 3
+
+    def test_unversioned_models_keep_fast_delete(
+        self, django_assert_num_queries
+    ):
+        from django.db.models.signals import post_delete
+
+        from reviews.models import DeletionJob
+        from users.models import OutboundEmail
+
+        for model in (OutboundEmail, DeletionJob):
+            assert not post_delete.has_listeners(model), (
+                f'Проверьте, что приемники кеша не слушают {model.__name__}'
+            )
+        OutboundEmail.objects.bulk_create(
+            OutboundEmail(recipient='a@yamdb.fake', subject='s', body='b')
+            for _ in range(5)
+        )
+        with django_assert_num_queries(1):
+            OutboundEmail.objects.all().delete()
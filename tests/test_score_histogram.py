@@ -0,0 +1,100 @@
+import pytest
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+
+
+@pytest.fixture
+def scored(django_user_model):
+    """Два произведения: у первого оценки 3, 3 и 8, второе без отзывов."""
+    from reviews.models import Review, Title
+
+    first = Title.objects.create(name='Первое', year=2000)
+    second = Title.objects.create(name='Второе', year=2000)
+    for number, score in enumerate((3, 3, 8)):
+        author = django_user_model.objects.create_user(
+            username=f'critic{number}', email=f'critic{number}@yamdb.fake',
+        )
+        Review.objects.create(
+            title=first, author=author, text='Отзыв', score=score,
+        )
+    return first, second
+
+
+def histogram(title):
+    title.refresh_from_db()
+    return {
+        score: count
+        for score, count in title.score_histogram.items() if count
+    }
+
+
+@pytest.mark.django_db
+class TestScoreHistogram:
+
+    def test_review_changes(self, scored):
+        from reviews.models import Review
+
+        first, second = scored
+        assert histogram(first) == {3: 2, 8: 1}
+        review = Review.objects.filter(title=first, score=3).first()
+        review.score = 10
+        review.save()
+        assert histogram(first) == {3: 1, 8: 1, 10: 1}
+        review.title = second
+        review.save()
+        assert histogram(first) == {3: 1, 8: 1}
+        assert histogram(second) == {10: 1}
+        review.delete()
+        assert histogram(second) == {}
+        first.delete()
+        assert not Review.objects.exists()
+
+    def test_endpoint_reads_title_only(self, client, scored):
+        first, _ = scored
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(f'/api/v1/titles/{first.pk}/histogram/')
+        assert response.status_code == 200
+        assert response.json() == {
+            'id': first.pk,
+            'review_count': 3,
+            'histogram': {
+                str(score): {3: 2, 8: 1}.get(score, 0)
+                for score in range(1, 11)
+            },
+        }
+        assert not [
+            query for query in context.captured_queries
+            if 'reviews_review' in query['sql']
+        ], 'Проверьте, что гистограмма не читает таблицу отзывов'
+        assert client.get('/api/v1/titles/0/histogram/').status_code == 404
+
+    def test_optional_field(self, client, scored):
+        first, _ = scored
+        url = f'/api/v1/titles/{first.pk}/'
+        assert 'histogram' not in client.get(url).json()
+        data = client.get(url, {'histogram': 'true'}).json()
+        assert data['histogram']['3'] == 2
+        listed = client.get('/api/v1/titles/', {'histogram': 'true'}).json()
+        assert all('histogram' in title for title in listed['results'])
+
+    def test_rebuild_command(self, scored):
+        from reviews.models import HISTOGRAM_FIELDS, Title
+
+        first, _ = scored
+        Title.objects.update(**{field: 7 for field in HISTOGRAM_FIELDS})
+        assert Title.objects.drifted_ratings().count() == 2
+        call_command('rebuildaggregates')
+        assert not Title.objects.drifted_ratings().exists()
+        assert histogram(first) == {3: 2, 8: 1}
+
+    def test_score_bounds(self, scored):
+        from reviews.models import Review, Title
+
+        first, _ = scored
+        with pytest.raises(ValueError):
+            Title.objects.filter(pk=first.pk).apply_review_delta(
+                1, 11, added=11
+            )
+        with pytest.raises(IntegrityError):
+            Review.objects.filter(title=first).update(score=0)
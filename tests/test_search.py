@@ -0,0 +1,80 @@
+import pytest
+
+
+@pytest.mark.django_db
+class TestSearch:
+
+    @pytest.fixture
+    def titles(self):
+        from reviews.models import Title
+
+        for name in ('Крестный отец', 'Отец солдата', 'Побег из Шоушенка',
+                     'Отцы и дети'):
+            Title.objects.create(name=name, year=1990)
+
+    def test_title_substring(self, client, titles):
+        response = client.get('/api/v1/titles/', {'q': 'отец'})
+        names = [item['name'] for item in response.json()['results']]
+        assert set(names) == {'Крестный отец', 'Отец солдата'}, (
+            'Проверьте, что `?q=` ищет произведения по подстроке'
+        )
+        assert names[0] == 'Отец солдата', (
+            'Проверьте, что результаты поиска ранжируются по сходству'
+        )
+
+    def test_title_typo(self, client, titles):
+        response = client.get('/api/v1/titles/', {'q': 'шоушенко'})
+        names = [item['name'] for item in response.json()['results']]
+        assert names == ['Побег из Шоушенка']
+
+    def test_index_follows_writes(self, client, titles):
+        from reviews.models import Title
+
+        assert client.get('/api/v1/titles/', {'q': 'матрица'}).json()[
+            'count'] == 0
+        Title.objects.create(name='Матрица', year=1999)
+        assert client.get('/api/v1/titles/', {'q': 'матрица'}).json()[
+            'count'] == 1
+
+    def test_catalog_and_users(self, client, admin_client, catalog):
+        catalog(authors=2)
+        response = client.get('/api/v1/genres/', {'search': 'анр 1'})
+        assert [item['slug'] for item in response.json()['results']] == [
+            'genre-1'
+        ]
+        response = client.get('/api/v1/categories/', {'search': 'фил'})
+        assert response.json()['count'] == 1
+        response = admin_client.get('/api/v1/users/', {'search': 'author1'})
+        assert response.json()['results'][0]['username'] == 'author1'
+
+    def test_index_rebuilt_only_for_searched_fields(self, user):
+        from api.search import inverted_indexes
+        from users.models import User
+
+        index = inverted_indexes.get(User, 'username')
+        user.revoke_tokens()
+        user.is_active = False
+        user.save(update_fields=('is_active',))
+        assert inverted_indexes.get(User, 'username') is index, (
+            'Проверьте, что сохранение других полей не перестраивает индекс'
+        )
+        user.username = 'Renamed'
+        user.save(update_fields=('username',))
+        index = inverted_indexes.get(User, 'username')
+        assert index.search('renamed', 0.3)
+        User.objects.create_user(username='Newcomer', email='new@yamdb.fake')
+        assert inverted_indexes.get(User, 'username') is not index
+
+    def test_truncated_results_are_marked(self, client, titles, settings):
+        from django.db import connection
+
+        if connection.vendor == 'postgresql':
+            pytest.skip('На PostgreSQL выдача поиска не ограничена')
+        settings.SEARCH = {**settings.SEARCH, 'MAX_RESULTS': 1}
+        data = client.get('/api/v1/titles/', {'q': 'отец'}).json()
+        assert data['truncated'] is True, (
+            'Проверьте, что обрезанная выдача поиска отмечена в ответе'
+        )
+        assert data['count'] == 1
+        data = client.get('/api/v1/titles/', {'q': 'шоушенко'}).json()
+        assert 'truncated' not in data
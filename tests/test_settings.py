@@ -9,3 +9,6 @@ class TestSettings:
         assert settings.DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql', (
             'Проверьте, что используете базу данных postgresql'
         )
+        assert 'locmem' not in settings.CACHES['default']['BACKEND'], (
+            'Проверьте, что по умолчанию кеш общий для всех процессов'
+        )
@@ -0,0 +1,125 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from rest_framework.settings import api_settings
+
+
+@pytest.fixture
+def rates(settings):
+    settings.REST_FRAMEWORK = {
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': {
+            'auth_ip': '4/min', 'auth_username': '2/min',
+            'auth_email': '2/min',
+        },
+    }
+    api_settings.reload()
+    yield
+    api_settings.reload()
+
+
+@pytest.mark.django_db
+class TestAuthThrottling:
+    url = '/api/v1/auth/token/'
+
+    def post(self, client, username, ip='10.0.0.1'):
+        return client.post(
+            self.url, {'username': username, 'confirmation_code': 'x'},
+            REMOTE_ADDR=ip,
+        )
+
+    def test_username_limit(self, client, rates):
+        assert self.post(client, 'victim').status_code == 404
+        assert self.post(client, 'Victim', '10.0.0.2').status_code == 404
+        response = self.post(client, 'VICTIM ', '10.0.0.3')
+        assert response.status_code == 429, (
+            'Проверьте, что попытки на один username ограничены с разных IP'
+        )
+        assert 0 < int(response['Retry-After']) <= 60
+        assert self.post(client, 'other', '10.0.0.3').status_code == 404
+
+    def test_ip_limit(self, client, rates):
+        for number in range(4):
+            assert self.post(client, f'user{number}').status_code == 404
+        response = self.post(client, 'user5')
+        assert response.status_code == 429, (
+            'Проверьте, что попытки с одного IP ограничены'
+        )
+        assert 'Retry-After' in response
+        assert self.post(client, 'user5', '10.0.0.9').status_code == 404
+
+    def test_forwarded_for_ignored_without_proxies(self, client, rates):
+        assert api_settings.NUM_PROXIES is None
+        for number in range(5):
+            response = client.post(
+                self.url,
+                {'username': f'user{number}', 'confirmation_code': 'x'},
+                REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR=f'1.1.1.{number}',
+            )
+        assert response.status_code == 429, (
+            'Проверьте, что без NUM_PROXIES X-Forwarded-For не учитывается'
+        )
+
+    def test_signup_email_limit(self, client, rates):
+        url = '/api/v1/auth/signup/'
+        for number in range(2):
+            client.post(url, {
+                'username': f'spam{number}', 'email': 'target@yamdb.fake',
+            }, REMOTE_ADDR=f'10.0.1.{number}')
+        response = client.post(url, {
+            'username': 'spam9', 'email': 'Target@yamdb.fake',
+        }, REMOTE_ADDR='10.0.1.9')
+        assert response.status_code == 429
+
+    def test_actions_counted_separately(self, client, rates):
+        for _ in range(2):
+            self.post(client, 'victim')
+        response = client.post('/api/v1/auth/signup/', {
+            'username': 'victim', 'email': 'victim@yamdb.fake',
+        }, REMOTE_ADDR='10.0.0.1')
+        assert response.status_code == 200
+
+
+class TestStores:
+
+    @pytest.mark.parametrize('store_path', (
+        'api.throttling.LocalBucketStore',
+        'api.throttling.CacheWindowStore',
+    ))
+    def test_concurrent_hits_respect_limit(self, store_path):
+        from django.utils.module_loading import import_string
+
+        store = import_string(store_path)(timer=lambda: 1000.0)
+        with ThreadPoolExecutor(16) as pool:
+            results = list(pool.map(
+                lambda _: store.hit('stress', 25, 60)[0], range(400)
+            ))
+        assert results.count(True) == 25, (
+            'Проверьте, что параллельные запросы не превышают лимит'
+        )
+
+    def test_bucket_refills(self):
+        from api.throttling import LocalBucketStore
+
+        now = [0.0]
+        store = LocalBucketStore(timer=lambda: now[0])
+        assert store.hit('key', 2, 60) == (True, 0)
+        assert store.hit('key', 2, 60) == (True, 0)
+        allowed, wait = store.hit('key', 2, 60)
+        assert not allowed and wait == pytest.approx(30)
+        now[0] = 30.0
+        assert store.hit('key', 2, 60)[0]
+        assert not store.hit('key', 2, 60)[0]
+
+    def test_window_slides(self):
+        from api.throttling import CacheWindowStore
+
+        now = [120.0]
+        store = CacheWindowStore(timer=lambda: now[0])
+        for _ in range(2):
+            assert store.hit('slide', 2, 60)[0]
+        assert not store.hit('slide', 2, 60)[0]
+        now[0] = 210.0
+        allowed, wait = store.hit('slide', 2, 60)
+        assert allowed, 'Половина прошлого окна уже не учитывается'
+        assert not store.hit('slide', 2, 60)[0]
@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+
+def read_lines(response):
+    content = b''.join(response.streaming_content).decode()
+    return [json.loads(line) for line in content.splitlines()]
+
+
+@pytest.mark.django_db
+class TestTitleExport:
+    url = '/api/v1/titles/export/'
+
+    def test_streams_all_titles(self, admin_client, catalog, monkeypatch,
+                                django_assert_num_queries):
+        from api.views import TitleViewSet
+
+        catalog(titles=7, reviews=1)
+        monkeypatch.setattr(TitleViewSet, 'export_chunk_size', 3)
+        response = admin_client.get(self.url)
+        assert response['Content-Type'] == 'application/x-ndjson'
+        # По два запроса (произведения и жанры) на каждую из трех
+        # пачек и пустой запрос в конце.
+        with django_assert_num_queries(7):
+            titles = read_lines(response)
+        assert len(titles) == 7
+        assert titles[0]['rating'] == 5
+        assert set(titles[0]) == {
+            'id', 'name', 'year', 'rating', 'description', 'genre',
+            'category',
+        }
+
+    def test_filters(self, admin_client, catalog):
+        catalog(titles=3)
+        response = admin_client.get(self.url, {'year': 1999})
+        assert read_lines(response) == []
+
+    def test_accepts_ndjson(self, admin_client, catalog):
+        catalog()
+        response = admin_client.get(
+            self.url, HTTP_ACCEPT='application/x-ndjson'
+        )
+        assert response.status_code == 200
+
+    def test_admin_only(self, client, user_client):
+        assert client.get(self.url).status_code == 401
+        assert user_client.get(self.url).status_code == 403
@@ -0,0 +1,70 @@
+import pytest
+
+URL = '/api/v1/titles/'
+
+
+@pytest.fixture
+def titles(django_user_model):
+    from reviews.models import Review, Title
+
+    authors = [
+        django_user_model.objects.create_user(
+            username=f'critic{i}', email=f'critic{i}@yamdb.fake',
+        )
+        for i in range(3)
+    ]
+    created = {}
+    for name, year, scores in (
+        ('Альфа', 2001, (7, 9)),
+        ('Бета', 1999, (8,)),
+        ('Гамма', 2001, ()),
+        ('Дельта', 1999, (8, 8, 8)),
+    ):
+        title = Title.objects.create(name=name, year=year)
+        for author, score in zip(authors, scores):
+            Review.objects.create(
+                title=title, author=author, text='Отзыв', score=score,
+            )
+        created[name] = title
+    return created
+
+
+def names(client, ordering):
+    response = client.get(URL, {'ordering': ordering})
+    assert response.status_code == 200
+    return [title['name'] for title in response.json()['results']]
+
+
+@pytest.mark.django_db
+class TestTitleOrdering:
+
+    def test_default_order_by_name(self, client, titles):
+        assert names(client, '') == ['Альфа', 'Бета', 'Гамма', 'Дельта']
+
+    @pytest.mark.parametrize('ordering, expected', (
+        ('rating', ['Альфа', 'Бета', 'Дельта', 'Гамма']),
+        ('-rating', ['Дельта', 'Бета', 'Альфа', 'Гамма']),
+        ('year', ['Бета', 'Дельта', 'Альфа', 'Гамма']),
+        ('-year', ['Гамма', 'Альфа', 'Дельта', 'Бета']),
+        ('-name', ['Дельта', 'Гамма', 'Бета', 'Альфа']),
+        ('-review_count', ['Дельта', 'Альфа', 'Бета', 'Гамма']),
+        ('year,-rating', ['Дельта', 'Бета', 'Альфа', 'Гамма']),
+    ))
+    def test_ordering(self, client, titles, ordering, expected):
+        assert names(client, ordering) == expected, (
+            'Проверьте, что равные значения упорядочены по id, '
+            'а произведения без оценок идут последними'
+        )
+
+    def test_unknown_field_is_ignored(self, client, titles):
+        assert names(client, 'description') == names(client, '')
+
+    def test_pages_do_not_overlap(self, client, titles, monkeypatch):
+        from rest_framework.pagination import PageNumberPagination
+
+        monkeypatch.setattr(PageNumberPagination, 'page_size', 2)
+        seen = []
+        for page in (1, 2):
+            response = client.get(URL, {'ordering': '-rating', 'page': page})
+            seen += [title['id'] for title in response.json()['results']]
+        assert len(set(seen)) == len(seen) == 4